@@ -0,0 +1,33 @@
+use std::fs;
+use std::path::Path;
+
+/// Hashes the engine's sources into ENGINE_FINGERPRINT, which the python side keys its result
+/// cache on: any edit to the rust code or its dependencies gives a new fingerprint, so cached
+/// units never outlive the engine that computed them.
+fn main() {
+    let mut files = vec![Path::new("Cargo.toml").to_path_buf()];
+    if Path::new("Cargo.lock").exists() {
+        files.push(Path::new("Cargo.lock").to_path_buf());
+    }
+    let mut sources: Vec<_> = fs::read_dir("src")
+        .expect("src directory")
+        .filter_map(|entry| entry.ok().map(|entry| entry.path()))
+        .filter(|path| path.extension().map_or(false, |extension| extension == "rs"))
+        .collect();
+    sources.sort();
+    files.extend(sources);
+
+    // FNV-1a, stable across toolchains unlike the std hasher
+    let mut hash: u64 = 0xcbf29ce484222325;
+    for path in &files {
+        println!("cargo:rerun-if-changed={}", path.display());
+        let name = path.to_string_lossy().replace('\\', "/");
+        let contents = fs::read(path).expect("readable engine source");
+        for byte in name.bytes().chain([0]).chain(contents).chain([0]) {
+            hash ^= byte as u64;
+            hash = hash.wrapping_mul(0x100000001b3);
+        }
+    }
+    println!("cargo:rerun-if-changed=src");
+    println!("cargo:rustc-env=ENGINE_FINGERPRINT={}-{:016x}", env!("CARGO_PKG_VERSION"), hash);
+}
@@ -0,0 +1,211 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from statistics import NormalDist
+
+import placement_optimization_sim
+from simulation import ENGINES, VARIANCE_REDUCTIONS, Simulation, create_number_line
+from sweep import SweepExecutor
+
+# Timing harness for the figures in optimization_log.md, run from this directory with
+# `python -m benchmark`. Each run writes its timings as JSON; passing an earlier file as
+# --baseline flags every benchmark that got slower than the tolerance allows. No baseline is
+# shipped, as timings only compare on the machine that recorded them.
+
+# The "standard test" of optimization_log.md
+STANDARD_TEST = {'n_values': range(1, 51), 'sig_fig': 3, 'iterations': 1000, 'repetitions': 3}
+# A shortened standard test for quick checks
+QUICK_TEST = {'n_values': range(1, 11), 'sig_fig': 2, 'iterations': 200, 'repetitions': 2}
+# Slowdown over the baseline's best time tolerated before a benchmark counts as regressed
+DEFAULT_TOLERANCE = 0.15
+# Family-wise false alarm rate of the distribution checks, split across every check
+DISTRIBUTION_ALPHA = 1e-3
+DISTRIBUTION_N_VALUES = (1, 2, 5, 20)
+DISTRIBUTION_POSITIONS = (1.0, 1.5, 2.0)
+
+
+def time_call(function, repeat):
+    # Wall time of each of repeat calls, in seconds
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        seconds.append(time.perf_counter() - start)
+    return {'seconds': seconds, 'best': min(seconds), 'median': statistics.median(seconds)}
+
+
+def standard_test(engine, workers, seed, test=STANDARD_TEST):
+    def run():
+        SweepExecutor(workers).run(test['n_values'], test['sig_fig'], test['iterations'],
+                                   test['repetitions'], engine, seed)
+    return run
+
+
+def micro_benchmarks(engine, seed, n_value=20, iterations=1000):
+    # Per-call costs of the layers a sweep is built from, from a single draw up to a full funnel
+    number_line = create_number_line(n_value, engine, seed=seed)
+    simulation = Simulation(number_line, iterations, 1, 3)
+
+    def regenerate_data():
+        for _ in range(1000):
+            number_line.regenerate_data()
+
+    return {
+        'regenerate_data_x1000': regenerate_data,
+        '_gather': simulation._gather,
+        '_funnel_to_p_value': simulation._funnel_to_p_value,
+    }
+
+
+def run_benchmarks(engines=ENGINES, workers=(1,), repeat=3, seed=0, test=STANDARD_TEST, standard=True):
+    results = {}
+    for engine in engines:
+        for name, function in micro_benchmarks(engine, seed).items():
+            results[f"{name}/{engine}"] = time_call(function, repeat)
+        if not standard:
+            continue
+        for worker_count in workers:
+            results[f"standard/{engine}/workers={worker_count}"] = time_call(
+                standard_test(engine, worker_count, seed, test), repeat)
+    return results
+
+
+def check_distributions(iterations=20000, seed=0, alpha=DISTRIBUTION_ALPHA):
+    # Each sampling engine's mean traversal against the analytic expectation, under every variance
+    # reduction, a z-test per (engine, reduction, n, position) with a Bonferroni split of alpha
+    samplers = [engine for engine in ENGINES if engine != 'analytic']
+    test_count = len(samplers) * len(VARIANCE_REDUCTIONS) * len(DISTRIBUTION_N_VALUES) * \
+        len(DISTRIBUTION_POSITIONS)
+    critical_z = NormalDist().inv_cdf(1 - alpha / (2 * test_count))
+    checks = []
+    for n_value in DISTRIBUTION_N_VALUES:
+        expected = create_number_line(n_value, 'analytic').mean_traversals(
+            list(DISTRIBUTION_POSITIONS), 1)
+        for engine in samplers:
+            for reduction in VARIANCE_REDUCTIONS:
+                number_line = create_number_line(n_value, engine, seed=seed)
+                number_line.set_variance_reduction(reduction)
+                means, variances = number_line.traversal_moments(
+                    list(DISTRIBUTION_POSITIONS), iterations, False)
+                for position, mean, variance, target in zip(DISTRIBUTION_POSITIONS, means, variances, expected):
+                    # Some reduced estimators are exact at a position, leaving only rounding error
+                    standard_error = max((variance / iterations) ** 0.5, 1e-12)
+                    z_score = float((mean - target) / standard_error)
+                    checks.append({'engine': engine, 'variance_reduction': reduction,
+                                   'n': n_value, 'position': position,
+                                   'mean': float(mean), 'expected': float(target),
+                                   'z': z_score, 'passed': bool(abs(z_score) <= critical_z)})
+    return checks
+
+
+def variance_reduction_report(iterations=20000, seed=0, n_values=DISTRIBUTION_N_VALUES):
+    # Raw over reduced per-draw variance at each n's optimum, for every reduction and sampler
+    report = []
+    for n_value in n_values:
+        optimum = create_number_line(n_value, 'analytic').optimal_position()
+        for engine in ENGINES:
+            if engine == 'analytic':
+                continue
+            for reduction in VARIANCE_REDUCTIONS[1:]:
+                number_line = create_number_line(n_value, engine, seed=seed)
+                number_line.set_variance_reduction(reduction)
+                factor = number_line.variance_reduction_factors([optimum], iterations)[0]
+                report.append({'engine': engine, 'n': n_value, 'variance_reduction': reduction,
+                               'factor': float(factor)})
+    return report
+
+
+def compare_with_baseline(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    # Benchmarks whose best time exceeds the baseline's by more than the tolerance, as
+    # (name, baseline best, current best, ratio). Benchmarks missing from either side are skipped.
+    regressions = []
+    for name, timing in results.items():
+        if name not in baseline:
+            continue
+        ratio = timing['best'] / baseline[name]['best']
+        if ratio > 1 + tolerance:
+            regressions.append((name, baseline[name]['best'], timing['best'], ratio))
+    return regressions
+
+
+def _environment():
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'engine_version': placement_optimization_sim.__version__,
+        'gmt-timestamp': time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmark", description="Time the simulation and flag regressions.")
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=list(ENGINES))
+    parser.add_argument("--workers", nargs="+", type=int, default=[1],
+                        help="worker counts the standard test runs with")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="timed calls per benchmark, the best one being compared")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--quick", action="store_true",
+                        help="shorten the standard test to n 1..10 at 2 significant figures")
+    parser.add_argument("--skip-standard", action="store_true")
+    parser.add_argument("--skip-distributions", action="store_true",
+                        help="skip the distribution checks and the variance reduction report")
+    parser.add_argument("--output", default="./benchmarks/latest.json")
+    parser.add_argument("--baseline", default=None,
+                        help="results file of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+    test = QUICK_TEST if args.quick else STANDARD_TEST
+    results = run_benchmarks(args.engines, args.workers, args.repeat,
+                             args.seed, test, not args.skip_standard)
+    checks = [] if args.skip_distributions else check_distributions(seed=args.seed)
+    reductions = [] if args.skip_distributions else variance_reduction_report(seed=args.seed)
+
+    report = {
+        'environment': _environment(),
+        'standard_test': {**test, 'n_values': [test['n_values'].start, test['n_values'].stop - 1]},
+        'benchmarks': results,
+        'distribution_checks': checks,
+        'variance_reduction': reductions,
+    }
+    directory = os.path.dirname(args.output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=4)
+
+    for name, timing in results.items():
+        print(f"{name:<45} best {timing['best']:.4f}s  median {timing['median']:.4f}s")
+    for entry in reductions:
+        print(f"Variance reduction {entry['variance_reduction']:<27} {entry['engine']:<17} "
+              f"n={entry['n']:<3} {entry['factor']:.2f}x")
+    failed_checks = [check for check in checks if not check['passed']]
+    for check in failed_checks:
+        print(f"Distribution mismatch: {check['engine']} ({check['variance_reduction']}) "
+              f"n={check['n']} p={check['position']} "
+              f"mean {check['mean']:.5f} vs {check['expected']:.5f} (z={check['z']:.2f})")
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            regressions = compare_with_baseline(
+                results, json.load(f)['benchmarks'], args.tolerance)
+        for name, baseline_best, best, ratio in regressions:
+            print(f"Regression: {name} {baseline_best:.4f}s -> {best:.4f}s ({ratio - 1:+.0%})")
+    print(f"Results written to {args.output}")
+    return 1 if regressions or failed_checks else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+import argparse
+import math
+import os
+import sys
+
+from placement_optimization_sim import AnalyticNumberLine
+
+# Regenerates src/optimum_table.rs, the optimal starting positions NumberLine.lookup_optimal_position
+# answers from, run from this directory with `python -m build_optimum_table` and the extension
+# rebuilt afterwards. Positions are measured from the nearest end of the unit interval.
+#
+# The table holds the exact optimum of every n up to TABLE_LENGTH. Past it the p^n and (2p)^n terms
+# of the slope have vanished, leaving 2(1 - p)^n = 1, so the optimum is p = 1 - 2^(-1/n). The
+# model's error is measured against the exact optimum for every n up to DENSE_CHECK_LIMIT and at
+# CHECKS_PER_OCTAVE points per doubling from there to CHECK_LIMIT, past which lookups fall back to
+# simulating.
+
+TABLE_LENGTH = 256
+DENSE_CHECK_LIMIT = 4096
+CHECK_LIMIT = 2 ** 20
+CHECKS_PER_OCTAVE = 8
+# Bisection runs the exact optimum down to adjacent floats, leaving rounding in the slope as the
+# only error, well under machine epsilon on positions no larger than 1/2
+TABLE_ERROR = sys.float_info.epsilon
+OUTPUT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "optimum_table.rs")
+
+
+def exact_unit_optimum(n_value):
+    # The segment [-1, 0] puts the optimum's distance from the end at minus its position, exactly
+    return -AnalyticNumberLine(-1.0, 0.0, -0.5, n_value).optimal_position()
+
+
+def asymptotic_unit_optimum(n_value):
+    # 1 - 2^(-1/n) without the cancellation of subtracting from 1, as the rust side computes it
+    return -math.expm1(-math.log(2) / n_value)
+
+
+def check_points(table_length=TABLE_LENGTH, dense_limit=DENSE_CHECK_LIMIT, limit=CHECK_LIMIT):
+    points = list(range(table_length + 1, dense_limit + 1))
+    n_value = dense_limit
+    while n_value < limit:
+        n_value = min(round(n_value * 2 ** (1 / CHECKS_PER_OCTAVE)), limit)
+        points.append(n_value)
+    return points
+
+
+def asymptotic_error(points):
+    # Largest deviation of the model from the exact optimum, plus the exact optimum's own error
+    deviation = max(abs(asymptotic_unit_optimum(n) - exact_unit_optimum(n)) for n in points)
+    return deviation + TABLE_ERROR
+
+
+def render_table(table, model_error, check_limit=CHECK_LIMIT):
+    rows = [f"    {value!r}," for value in table]
+    return "\n".join([
+        "// Generated by one-dimensional/build_optimum_table.py, do not edit by hand",
+        "",
+        "/// Distance of the optimal starting position from the nearest end of the unit interval, for n = 1, 2, ...",
+        f"pub const OPTIMUM_TABLE: [f64; {len(table)}] = [",
+        *rows,
+        "];",
+        "",
+        "/// Bound on the absolute error of every table entry",
+        f"pub const TABLE_ERROR: f64 = {TABLE_ERROR!r};",
+        "",
+        "/// Bound on the absolute error of 1 - 2^(-1/n) past the table, as measured up to ASYMPTOTIC_CHECK_LIMIT",
+        f"pub const ASYMPTOTIC_ERROR: f64 = {model_error!r};",
+        "",
+        "/// Largest n the asymptotic model was checked against, lookups past it falling back to simulating",
+        f"pub const ASYMPTOTIC_CHECK_LIMIT: usize = {check_limit};",
+        "",
+    ])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m build_optimum_table", description="Regenerate the optimum lookup table.")
+    parser.add_argument("--output", default=OUTPUT_PATH)
+    args = parser.parse_args(argv)
+
+    table = [exact_unit_optimum(n) for n in range(1, TABLE_LENGTH + 1)]
+    model_error = asymptotic_error(check_points())
+    with open(args.output, 'w') as f:
+        f.write(render_table(table, model_error))
+    print(f"Wrote {TABLE_LENGTH} optima to {args.output}, "
+          f"asymptotic model within {model_error:.3g} up to n={CHECK_LIMIT}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+import placement_optimization_sim
+
+# Bump when a change on the python side (search, gathering) alters what a unit returns
+CACHE_FORMAT = 4
+# Hash of the rust sources the extension was built from (see build.rs), so rebuilding the engine
+# after any change to it invalidates every entry it made
+ENGINE_VERSION = getattr(placement_optimization_sim, '__engine_fingerprint__',
+                         getattr(placement_optimization_sim, '__version__', 'unknown'))
+# Default bound on the total size of the entry files
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+# Persistent store of finished (n_value, repetition) units, one small JSON file per entry named
+# by the sha256 of everything that determines its result. Entries are evicted least recently
+# used first once their total size passes max_bytes, file mtimes recording use across sessions.
+class ResultCache:
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+        # key -> entry size, oldest use first
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        listing = []
+        for filename in os.listdir(directory):
+            if filename.endswith('.json'):
+                stat = os.stat(os.path.join(directory, filename))
+                listing.append((stat.st_mtime_ns, filename[:-5], stat.st_size))
+        for _, key, size in sorted(listing):
+            self.entries[key] = size
+            self.total_bytes += size
+
+    def unit_key(self, n_value, repetition, sig_fig, iterations, engine, seed, simulation_options, geometry='line'):
+        # Unseeded sampling runs are never reproduced, so they are not cached. Options that do
+        # not serialise, such as a custom search object, make a unit uncacheable too.
+        if seed is None and engine != 'analytic':
+            return None
+        parameters = {
+            'format': CACHE_FORMAT,
+            'engine_version': ENGINE_VERSION,
+            'n_value': n_value,
+            'repetition': repetition,
+            'sig_fig': sig_fig,
+            'iterations': iterations,
+            'engine': engine,
+            'geometry': geometry,
+            'seed': seed,
+            'options': simulation_options,
+        }
+        try:
+            canonical = json.dumps(parameters, sort_keys=True)
+        except TypeError:
+            return None
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    def get(self, key):
+        entry = self.lookup(key)
+        return None if entry is None else entry[0]
+
+    def lookup(self, key):
+        # The entry's (value, estimate), estimate being the unit's fitted (distance,
+        # standard_error) or None
+        if key not in self.entries:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'r') as f:
+                entry = json.load(f)
+            value = entry['value']
+        except (OSError, ValueError, KeyError):
+            self._forget(key)
+            return None
+        os.utime(path)
+        self.entries.move_to_end(key)
+        estimate = entry.get('estimate')
+        return value, None if estimate is None else tuple(estimate)
+
+    def put(self, key, value, estimate=None):
+        entry = {'value': value}
+        if estimate is not None:
+            entry['estimate'] = list(estimate)
+        data = json.dumps(entry)
+        with open(self._path(key), 'w') as f:
+            f.write(data)
+        if key in self.entries:
+            self.total_bytes -= self.entries[key]
+        self.entries[key] = len(data)
+        self.entries.move_to_end(key)
+        self.total_bytes += len(data)
+        self._evict()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and self.entries:
+            key = next(iter(self.entries))
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+            self._forget(key)
+
+    def _forget(self, key):
+        self.total_bytes -= self.entries.pop(key)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.json')
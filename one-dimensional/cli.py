@@ -0,0 +1,145 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+from search import SEARCH_STRATEGIES
+from simulation import ENGINES, GEOMETRIES, VARIANCE_REDUCTIONS
+import instrumentation
+from sweep import SweepExecutor
+from distributed import NO_WORKER_TIMEOUT_SECONDS, SweepCoordinator, parse_address
+from cache import DEFAULT_MAX_BYTES, ResultCache
+from results import EXPORT_FORMATS, ResultStore, read_checkpoint
+
+# Headless entry point, run from this directory with `python -m cli`. Only the simulation core is
+# imported, so sweeps run on machines without a display.
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="python -m cli", description="Run a placement optimization sweep without the GUI.")
+    parser.add_argument("--n-from", type=int, default=1,
+                        help="first n value of the sweep")
+    parser.add_argument("--n-to", type=int, default=1,
+                        help="last n value of the sweep, inclusive")
+    parser.add_argument("--sig-figs", type=int, default=3)
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--repetitions", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--coordinate", default=None, metavar="HOST:PORT",
+                        help="serve the units to workers started with `python -m distributed HOST:PORT` "
+                             "instead of running them here, port 0 picking a free one")
+    parser.add_argument("--unit-timeout", type=float, default=None,
+                        help="seconds before a unit held by an unresponsive worker is handed out again")
+    parser.add_argument("--worker-timeout", type=float, default=NO_WORKER_TIMEOUT_SECONDS,
+                        help="seconds units wait with no worker connected before the sweep fails")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="defaults to a fresh random seed, recorded in the output")
+    parser.add_argument("--engine", choices=ENGINES, default=ENGINES[0])
+    parser.add_argument("--geometry", choices=GEOMETRIES, default=GEOMETRIES[0],
+                        help="the square samples by brute force and runs fastest with --common-random-numbers")
+    parser.add_argument("--search", choices=list(SEARCH_STRATEGIES), default='grid')
+    parser.add_argument("--common-random-numbers", action="store_true")
+    parser.add_argument("--adaptive", action="store_true")
+    parser.add_argument("--variance-reduction", choices=VARIANCE_REDUCTIONS, default='none',
+                        help="reuse each draw's reflection and regress out the line's range, "
+                             "cutting the iterations a given precision needs")
+    parser.add_argument("--warm-start", action="store_true",
+                        help="run n values in order, seeding each search from the previous optima")
+    parser.add_argument("--output", default="./exports",
+                        help="directory the results file is written to")
+    parser.add_argument("--cache", default=None,
+                        help="directory of cached units reused across runs with the same parameters")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_MAX_BYTES // 2**20,
+                        help="cache size in MiB before the least recently used units are evicted")
+    parser.add_argument("--format", choices=list(EXPORT_FORMATS), default='binary',
+                        help="binary archives load memory-mapped, json suits other tools")
+    parser.add_argument("--checkpoint", default=None,
+                        help="JSON Lines file each finished unit is appended to; "
+                             "rerunning with the same file resumes the sweep")
+    parser.add_argument("--trace", default=None,
+                        help="write timing spans and counters here, as JSON Lines for a .jsonl "
+                             "path and as a Chrome trace otherwise")
+    args = parser.parse_args(argv)
+    if args.n_from > args.n_to:
+        parser.error("--n-from must not be greater than --n-to")
+    if args.geometry == 'square' and (args.engine != 'brute_force' or args.warm_start
+                                      or args.search == 'golden_section'):
+        parser.error("the square needs the brute_force engine, without --warm-start or golden_section")
+    if args.geometry == 'square' and 'control_variate' in args.variance_reduction:
+        parser.error("the square has no control variate")
+    return args
+
+
+def _build_metadata(args, seed):
+    # Same keys as UserInterface._lock_metadata, so the GUI can import CLI runs
+    return {
+        'n_left_bound': args.n_from,
+        'n_right_bound': args.n_to,
+        'sig_fig': args.sig_figs,
+        'iterations': args.iterations,
+        'repetitions': args.repetitions,
+        'engine': args.engine,
+        'geometry': args.geometry,
+        'workers': args.workers,
+        'seed': seed,
+        'search': args.search,
+        'common_random_numbers': args.common_random_numbers,
+        'adaptive': args.adaptive,
+        'variance_reduction': args.variance_reduction,
+        'warm_start': args.warm_start,
+        'gmt-timestamp': time.gmtime()
+    }
+
+
+def _resumed_seed(checkpoint):
+    # A resumed sweep must keep drawing from the seed the checkpoint was started with
+    if checkpoint and os.path.exists(checkpoint):
+        seed = read_checkpoint(checkpoint)[0].get('seed')
+        if seed is not None:
+            return seed
+    return random.getrandbits(64)
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+    seed = args.seed if args.seed is not None else _resumed_seed(args.checkpoint)
+    metadata = _build_metadata(args, seed)
+    os.makedirs(args.output, exist_ok=True)
+
+    if args.trace:
+        instrumentation.enable(args.trace)
+    store = ResultStore(args.checkpoint, metadata) if args.checkpoint else None
+    start_time = time.perf_counter()
+    cache = ResultCache(args.cache, args.cache_size * 2**20) if args.cache else None
+    coordinator = None
+    if args.coordinate:
+        coordinator = SweepCoordinator(*parse_address(args.coordinate), unit_timeout=args.unit_timeout,
+                                       no_worker_timeout=args.worker_timeout)
+        host, port = coordinator.address
+        print(f"Serving units on {host}:{port}", flush=True)
+    executor = SweepExecutor(args.workers, store=store, cache=cache, executor=coordinator)
+    try:
+        dataset = executor.run(
+            range(args.n_from, args.n_to + 1), args.sig_figs, args.iterations, args.repetitions,
+            args.engine, seed, args.warm_start, args.geometry, search=args.search,
+            common_random_numbers=args.common_random_numbers, adaptive=args.adaptive,
+            variance_reduction=args.variance_reduction)
+    finally:
+        if store is not None:
+            store.close()
+        if args.trace:
+            instrumentation.disable()
+    elapsed = time.perf_counter() - start_time
+
+    filename = EXPORT_FORMATS[args.format](args.output, metadata, dataset)
+    print(f"Sweep n={args.n_from}..{args.n_to} completed in {elapsed:.2f}s")
+    print(f"Results written to {os.path.join(args.output, filename)}")
+    if args.trace:
+        print(f"Trace written to {args.trace}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,287 @@
+import argparse
+import collections
+import inspect
+import json
+import socket
+import socketserver
+import sys
+import threading
+import time
+from concurrent.futures import Executor, Future
+
+from sweep import _run_unit
+
+# Spreads a sweep's units over worker processes on any number of machines. SweepCoordinator is a
+# concurrent.futures.Executor, so SweepExecutor(executor=SweepCoordinator(...)) keeps its stores,
+# caches, warm starts and cancellation while the units run wherever workers connect from.
+#
+# Workers connect over TCP and speak newline-delimited JSON, one object per line:
+#   worker -> coordinator  {"type": "ready"}
+#   coordinator -> worker  {"type": "unit", "unit_id": 3, "unit": {"n_value": 4, "repetition": 0, ...}}
+#   worker -> coordinator  {"type": "result", "unit_id": 3, "value": 0.412, "estimate": [0.405, 0.003],
+#                           "seconds": 1.7}
+#                          {"type": "error", "unit_id": 3, "message": "..."}
+#   coordinator -> worker  {"type": "done"} once the sweep is over
+# Units carry _run_unit's arguments by name. A worker holds one unit at a time and asks for the
+# next by answering. Units of a worker that
+# disconnects, or that overruns unit_timeout, go back to the front of the queue; a late answer
+# for a unit already finished elsewhere is ignored. Seeds travel with the units, so results
+# match a local sweep bit for bit. Once units have waited no_worker_timeout seconds without a
+# single worker connected, every unit still outstanding fails, so neither the sweep nor shutdown
+# waits forever on workers that are never coming.
+
+# How often idle connections wake up to requeue overdue units
+POLL_SECONDS = 0.2
+# How long a worker keeps retrying to reach a coordinator that is not listening yet
+CONNECT_TIMEOUT_SECONDS = 10.0
+# How long outstanding units wait with no worker connected before they fail
+NO_WORKER_TIMEOUT_SECONDS = 300.0
+
+
+def _send(stream, message):
+    stream.write(json.dumps(message).encode() + b'\n')
+    stream.flush()
+
+
+def _receive(stream):
+    # None once the other side has gone
+    line = stream.readline()
+    return json.loads(line) if line else None
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        coordinator = self.server.coordinator
+        worker = object()
+        coordinator._connect()
+        try:
+            if _receive(self.rfile) is None:
+                return
+            while True:
+                unit = coordinator._next_unit(worker)
+                if unit is None:
+                    _send(self.wfile, {'type': 'done'})
+                    return
+                unit_id, arguments = unit
+                _send(self.wfile, {'type': 'unit', 'unit_id': unit_id, 'unit': arguments})
+                reply = _receive(self.rfile)
+                if reply is None:
+                    return
+                if reply['type'] == 'result':
+                    coordinator._complete(worker, reply['unit_id'], reply['value'],
+                                          reply.get('estimate'), reply['seconds'])
+                else:
+                    coordinator._fail(worker, reply['unit_id'], reply.get('message', 'unit failed'))
+        except (OSError, ValueError, KeyError):
+            # A broken connection or garbled message loses the worker, not the sweep
+            pass
+        finally:
+            coordinator._release(worker)
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def service_actions(self):
+        # Runs between polls of serve_forever, every half second or so
+        self.coordinator._check_workers()
+
+
+class SweepCoordinator(Executor):
+    # Serves units to workers from host:port, port 0 picking a free one (see address)
+    def __init__(self, host='127.0.0.1', port=0, unit_timeout=None, no_worker_timeout=NO_WORKER_TIMEOUT_SECONDS):
+        self.unit_timeout = unit_timeout
+        self.no_worker_timeout = no_worker_timeout
+        self._condition = threading.Condition()
+        self._queue = collections.deque()
+        self._units = {}
+        # unit_id -> (worker, deadline) for every unit out with a worker
+        self._assigned = {}
+        self._next_id = 0
+        self._closed = False
+        # Connected workers, and since when none has been while units were outstanding
+        self._workers = 0
+        self._idle_since = time.monotonic()
+        self._server = _Server((host, port), _Handler)
+        self._server.coordinator = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    @property
+    def address(self):
+        return self._server.server_address[:2]
+
+    def submit(self, fn, /, *args, **kwargs):
+        # Only sweep units can travel, their arguments as a JSON object keyed by parameter name
+        if fn is not _run_unit:
+            raise ValueError("SweepCoordinator only runs sweep units")
+        try:
+            arguments = inspect.signature(_run_unit).bind(*args, **kwargs).arguments
+            arguments = json.loads(json.dumps(arguments))
+        except TypeError as err:
+            raise ValueError(f"Invalid unit arguments: {err}") from None
+        future = Future()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("cannot submit units after shutdown")
+            unit_id = self._next_id
+            self._next_id += 1
+            self._units[unit_id] = (arguments, future)
+            self._queue.append(unit_id)
+            self._condition.notify_all()
+        return future
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        with self._condition:
+            self._closed = True
+            if cancel_futures:
+                for _, future in self._units.values():
+                    future.cancel()
+            self._condition.notify_all()
+        if wait:
+            # Running units finish first, and idle workers are told the sweep is done
+            for _, future in list(self._units.values()):
+                if not future.cancelled():
+                    future.exception()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _next_unit(self, worker):
+        # Blocks until a unit is free for the worker, None once the coordinator shuts down
+        with self._condition:
+            while True:
+                self._requeue_overdue()
+                while self._queue:
+                    unit_id = self._queue.popleft()
+                    arguments, future = self._units[unit_id]
+                    if future.done() or not (future.running() or future.set_running_or_notify_cancel()):
+                        continue
+                    deadline = time.monotonic() + self.unit_timeout if self.unit_timeout else None
+                    self._assigned[unit_id] = (worker, deadline)
+                    return unit_id, arguments
+                if self._closed:
+                    return None
+                self._condition.wait(POLL_SECONDS)
+
+    def _requeue_overdue(self):
+        now = time.monotonic()
+        for unit_id, (worker, deadline) in list(self._assigned.items()):
+            if deadline is not None and now > deadline:
+                del self._assigned[unit_id]
+                self._queue.appendleft(unit_id)
+
+    def _holds(self, worker, unit_id):
+        # Whether the unit is still assigned to the worker, rather than handed on after a timeout
+        return self._assigned.get(unit_id, (None,))[0] is worker
+
+    def _complete(self, worker, unit_id, value, estimate, seconds):
+        # Resolves like _run_unit returns, to the value, its estimate and the seconds the worker
+        # took. Seeded units give the same answer wherever they run, so a late result is as good
+        # as any, but only the unit's current holder gives up the assignment.
+        with self._condition:
+            if self._holds(worker, unit_id):
+                del self._assigned[unit_id]
+            future = self._units[unit_id][1]
+            if not future.done():
+                future.set_result(
+                    (value, None if estimate is None else tuple(estimate), seconds))
+            self._condition.notify_all()
+
+    def _fail(self, worker, unit_id, message):
+        # A late failure from a worker whose unit was handed on says nothing about the new run
+        with self._condition:
+            if not self._holds(worker, unit_id):
+                return
+            del self._assigned[unit_id]
+            future = self._units[unit_id][1]
+            if not future.done():
+                future.set_exception(RuntimeError(f"Worker failed a unit: {message}"))
+            self._condition.notify_all()
+
+    def _connect(self):
+        with self._condition:
+            self._workers += 1
+
+    def _check_workers(self):
+        # Fails every outstanding unit once none has had a worker for no_worker_timeout seconds
+        with self._condition:
+            outstanding = [future for _, future in self._units.values() if not future.done()]
+            if self._workers or not outstanding:
+                self._idle_since = time.monotonic()
+                return
+            idle = time.monotonic() - self._idle_since
+            if self.no_worker_timeout is None or idle < self.no_worker_timeout:
+                return
+            error = RuntimeError(
+                f"No worker connected for {idle:.0f}s, {len(outstanding)} units left unrun")
+            for future in outstanding:
+                future.set_exception(error)
+            self._queue.clear()
+            self._condition.notify_all()
+
+    def _release(self, worker):
+        # Puts a lost worker's unfinished unit back at the front of the queue
+        with self._condition:
+            self._workers -= 1
+            for unit_id, (holder, _) in list(self._assigned.items()):
+                if holder is worker:
+                    del self._assigned[unit_id]
+                    if not self._units[unit_id][1].done():
+                        self._queue.appendleft(unit_id)
+            self._condition.notify_all()
+
+
+def run_worker(host, port, threads=0, connect_timeout=CONNECT_TIMEOUT_SECONDS):
+    # Runs units from the coordinator at host:port until it reports the sweep done, returning how
+    # many were completed. threads sets the rust batch threads of every unit, 0 using every core.
+    deadline = time.monotonic() + connect_timeout
+    while True:
+        try:
+            connection = socket.create_connection((host, port))
+            break
+        except ConnectionRefusedError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(POLL_SECONDS)
+
+    completed = 0
+    with connection, connection.makefile('rb') as reader, connection.makefile('wb') as writer:
+        _send(writer, {'type': 'ready'})
+        while True:
+            message = _receive(reader)
+            if message is None or message['type'] == 'done':
+                return completed
+            unit_id, arguments = message['unit_id'], message['unit']
+            # Units arrive with the pool's single thread, the worker's own setting replaces it
+            arguments['threads'] = threads
+            try:
+                value, estimate, seconds = _run_unit(**arguments)
+            except Exception as err:
+                _send(writer, {'type': 'error', 'unit_id': unit_id, 'message': str(err)})
+                continue
+            _send(writer, {'type': 'result', 'unit_id': unit_id, 'value': value,
+                           'estimate': estimate, 'seconds': seconds})
+            completed += 1
+
+
+def parse_address(address):
+    host, _, port = address.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m distributed", description="Run sweep units for a coordinator.")
+    parser.add_argument("address", help="HOST:PORT of the coordinator, e.g. from cli --coordinate")
+    parser.add_argument("--threads", type=int, default=0,
+                        help="rust batch threads per unit, 0 using every core")
+    args = parser.parse_args(argv)
+    host, port = parse_address(args.address)
+    completed = run_worker(host, port, args.threads)
+    print(f"Worker finished after {completed} units")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+import atexit
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+# Span and counter tracing for finding where a sweep spends its time without a profiler. Tracing
+# is off until enabled, every span then costing one shared no-op context manager, so hot paths
+# can stay instrumented. Events are buffered in memory and streamed to disk every FLUSH_EVENTS
+# and on flush, so long traces take bounded memory, either as JSON Lines or as a Chrome trace in
+# the JSON array format (load it at chrome://tracing or ui.perfetto.dev). The array is closed on
+# disable; both viewers also load a trace cut short without its closing bracket.
+#
+# Setting TRAVERSAL_TRACE to a path enables tracing at import, the format following the
+# extension: .jsonl for JSON Lines, anything else for a Chrome trace. Units run in pooled worker
+# processes are not traced, only the process that enabled tracing is.
+
+TRACE_ENVIRONMENT_VARIABLE = "TRAVERSAL_TRACE"
+TRACE_FORMATS = ('chrome', 'jsonl')
+# Buffered events written out at once when the buffer grows past this
+FLUSH_EVENTS = 10000
+
+_DISABLED = nullcontext()
+
+
+class _Span:
+    __slots__ = ('tracer', 'name', 'args', 'start')
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.tracer._record_span(self.name, self.start,
+                                 time.perf_counter_ns() - self.start, self.args)
+        return False
+
+
+class Tracer:
+    def __init__(self):
+        self.enabled = False
+        self.path = None
+        self.format = 'chrome'
+        self.events = []
+        # Whether the trace file has been started, and how many events it holds
+        self.started = False
+        self.written = 0
+        self.counters = {}
+        # Nanosecond totals and call counts per span name, kept for summary()
+        self.totals = {}
+        self.origin = time.perf_counter_ns()
+        # Forked workers inherit an enabled tracer, so only the process that enabled it records
+        self.pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def enable(self, path=None, format=None):
+        # Without a path, only the totals are kept in memory for summary()
+        self._finish()
+        with self._lock:
+            self.path = path
+            self.format = format or _format_for(path)
+            if self.format not in TRACE_FORMATS:
+                raise ValueError(f"Unknown trace format: {self.format}")
+            self.events = []
+            self.started = False
+            self.written = 0
+            self.counters = {}
+            self.totals = {}
+            self.origin = time.perf_counter_ns()
+            self.pid = os.getpid()
+            self.enabled = True
+
+    def disable(self):
+        # Writes out the buffer and completes the file, summary() keeping the totals until tracing
+        # is re-enabled
+        self._finish()
+        with self._lock:
+            self.enabled = False
+            self.path = None
+            self.events = []
+
+    def span(self, name, **args):
+        # with tracer.span('gather', candidates=11): ...
+        if not self.enabled or os.getpid() != self.pid:
+            return _DISABLED
+        return _Span(self, name, args)
+
+    def count(self, name, amount=1):
+        if not self.enabled or os.getpid() != self.pid:
+            return
+        with self._lock:
+            value = self.counters.get(name, 0) + amount
+            self.counters[name] = value
+            self._append({'name': name, 'ph': 'C', 'ts': self._timestamp(time.perf_counter_ns()),
+                          'pid': os.getpid(), 'tid': threading.get_ident(), 'args': {name: value}})
+
+    def instant(self, name, **args):
+        if not self.enabled or os.getpid() != self.pid:
+            return
+        with self._lock:
+            self._append({'name': name, 'ph': 'i', 's': 'p',
+                          'ts': self._timestamp(time.perf_counter_ns()),
+                          'pid': os.getpid(), 'tid': threading.get_ident(), 'args': args})
+
+    def summary(self):
+        # {span name: (calls, total seconds)} since tracing was enabled
+        with self._lock:
+            return {name: (calls, total / 1e9) for name, (calls, total) in self.totals.items()}
+
+    def flush(self):
+        with self._lock:
+            if self.path is None or os.getpid() != self.pid:
+                return
+            self._write_events()
+
+    def _record_span(self, name, start, duration, args):
+        with self._lock:
+            calls, total = self.totals.get(name, (0, 0))
+            self.totals[name] = (calls + 1, total + duration)
+            self._append({'name': name, 'ph': 'X', 'ts': self._timestamp(start),
+                          'dur': duration / 1000, 'pid': os.getpid(),
+                          'tid': threading.get_ident(), 'args': args})
+
+    def _finish(self):
+        # Flushes and closes a Chrome trace's array, leaving a complete JSON document
+        with self._lock:
+            if self.path is None or os.getpid() != self.pid:
+                return
+            self._write_events()
+            if self.format == 'chrome':
+                with open(self.path, 'a') as f:
+                    f.write('\n]\n')
+
+    def _append(self, event):
+        # Called with the lock held
+        if self.path is None:
+            return
+        self.events.append(event)
+        if len(self.events) >= FLUSH_EVENTS:
+            self._write_events()
+
+    def _write_events(self):
+        # Appends the buffered events to the file and empties the buffer, called with the lock
+        # held. Each trace starts its file afresh, a Chrome trace with the opening bracket of its
+        # array, as timestamps from an earlier run count from a different origin.
+        if self.format == 'jsonl':
+            lines = [json.dumps(event) + '\n' for event in self.events]
+        else:
+            lines = [(',\n' if self.written + idx else '\n') + json.dumps(event)
+                     for idx, event in enumerate(self.events)]
+            if not self.started:
+                lines.insert(0, '[')
+        with open(self.path, 'a' if self.started else 'w') as f:
+            f.writelines(lines)
+        self.started = True
+        self.written += len(self.events)
+        self.events = []
+
+    def _timestamp(self, nanoseconds):
+        # Chrome traces count microseconds
+        return (nanoseconds - self.origin) / 1000
+
+
+def _format_for(path):
+    return 'jsonl' if path is not None and path.endswith('.jsonl') else 'chrome'
+
+
+# The process-wide tracer every module reports to
+TRACER = Tracer()
+span = TRACER.span
+count = TRACER.count
+instant = TRACER.instant
+enable = TRACER.enable
+disable = TRACER.disable
+
+if os.environ.get(TRACE_ENVIRONMENT_VARIABLE):
+    enable(os.environ[TRACE_ENVIRONMENT_VARIABLE])
+atexit.register(TRACER.disable)
@@ -0,0 +1,250 @@
+import json
+import os
+import struct
+import time
+import uuid
+from collections.abc import Sequence
+
+import numpy as np
+
+# Binary layout: MAGIC, the header length as a little-endian u64, a JSON header holding the
+# metadata and each array's offset and shape, then raw little-endian float64 arrays, each
+# starting on an ALIGNMENT boundary so they can be memory-mapped in place.
+BINARY_EXTENSION = "simbin"
+MAGIC = b"TSIMBIN1"
+ALIGNMENT = 64
+
+
+def _unique_filename(extension):
+    timestamp = time.strftime("%Y-%m-%d_%H%M%S")
+    unique_id = uuid.uuid4()
+    return f"simulation__{timestamp}__{unique_id}.{extension}"
+
+
+def export_json(directory, metadata, dataset):
+    # Sanitize and validate the directory path
+    if not os.path.isdir(directory):
+        raise ValueError("Invalid directory path")
+
+    filename = _unique_filename("json")
+    path = os.path.join(directory, filename)
+
+    data = {
+        'meta': metadata,
+        'dataset': [list(subset) for subset in dataset]
+    }
+    json_data = json.dumps(data, indent=4)
+
+    with open(path, 'x') as f:
+        f.write(json_data)
+    return filename
+
+
+def import_json(path):
+    with open(path, 'r') as f:
+        data = json.load(f)
+    return data.get('meta', {}), data.get('dataset', [])
+
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def _padded_array(dataset):
+    # Ragged [n][repetition] lists become one row per n value, NaN filling the missing repetitions
+    width = max((len(subset) for subset in dataset), default=0)
+    array = np.full((len(dataset), width), np.nan)
+    for idx, subset in enumerate(dataset):
+        array[idx, :len(subset)] = subset
+    return array
+
+
+def export_binary(directory, metadata, dataset):
+    if not os.path.isdir(directory):
+        raise ValueError("Invalid directory path")
+
+    arrays = {'dataset': _padded_array(dataset)}
+
+    # Offsets count from the end of the header, whose own length depends on them
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        layout[name] = {'offset': offset, 'shape': list(array.shape)}
+        offset = _aligned(offset + array.nbytes)
+    header = json.dumps({'meta': metadata, 'arrays': layout}).encode()
+    data_start = _aligned(len(MAGIC) + 8 + len(header))
+
+    filename = _unique_filename(BINARY_EXTENSION)
+    with open(os.path.join(directory, filename), 'xb') as f:
+        f.write(MAGIC + struct.pack('<Q', len(header)) + header)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name]['offset'])
+            f.write(np.ascontiguousarray(array, dtype='<f8').tobytes())
+    return filename
+
+
+def map_binary(path):
+    # Returns the metadata and a read-only memory map per array, nothing being read until used
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError("Not a simulation binary file")
+        (header_length,) = struct.unpack('<Q', f.read(8))
+        header = json.loads(f.read(header_length))
+    data_start = _aligned(len(MAGIC) + 8 + header_length)
+
+    columns = {}
+    for name, layout in header['arrays'].items():
+        shape = tuple(layout['shape'])
+        if 0 in shape:
+            columns[name] = np.empty(shape)
+        else:
+            columns[name] = np.memmap(path, dtype='<f8', mode='r',
+                                      offset=data_start + layout['offset'], shape=shape)
+    return header['meta'], columns
+
+
+# The [n][repetition] dataset over a memory-mapped array, each row read from disk on access
+class MappedDataset(Sequence):
+    def __init__(self, array):
+        self.array = array
+
+    def __len__(self):
+        return len(self.array)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        row = np.asarray(self.array[idx])
+        return row[~np.isnan(row)].tolist()
+
+
+def import_binary(path):
+    metadata, columns = map_binary(path)
+    return metadata, MappedDataset(columns['dataset'])
+
+
+EXPORT_FORMATS = {
+    'binary': export_binary,
+    'json': export_json,
+}
+
+
+def import_results(path):
+    # Picks the reader by extension: binary archives, JSON exports or JSON Lines checkpoints
+    if path.endswith("." + BINARY_EXTENSION):
+        return import_binary(path)
+    if path.endswith(".jsonl"):
+        return import_checkpoint(path)
+    return import_json(path)
+
+
+# Metadata that must match for a checkpoint to be resumed, as it changes what each unit computes.
+# The n range and repetition count may differ, overlapping units being reused.
+RESUME_KEYS = ('sig_fig', 'iterations', 'engine', 'seed',
+               'search', 'common_random_numbers', 'adaptive', 'warm_start', 'geometry',
+               'variance_reduction')
+
+
+# Append-only JSON Lines checkpoint of a sweep: a header line holding the run metadata, then one
+# line per finished (n_value, repetition) unit, flushed as soon as the unit completes. Units record
+# the seconds they took to compute, which a resumed sweep plans the rest of its units from, and
+# their fitted (distance, standard_error) estimate when they have one.
+class ResultStore:
+    def __init__(self, path, metadata):
+        self.path = path
+        self.metadata = metadata
+        self.completed = {}
+        self.seconds = {}
+        self.estimates = {}
+
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            stored_metadata, self.completed, self.seconds, self.estimates = _read_checkpoint_records(
+                path)
+            mismatched = [key for key in RESUME_KEYS
+                          if stored_metadata.get(key) != metadata.get(key)]
+            if mismatched:
+                raise ValueError(
+                    f"Checkpoint was written with different {', '.join(mismatched)}")
+            self.file = open(path, 'a')
+        else:
+            self.file = open(path, 'w')
+            self._write_line({'meta': metadata})
+
+    def record(self, n_value, repetition, value, seconds=None, estimate=None):
+        self.completed[(n_value, repetition)] = value
+        record = {'n': n_value, 'repetition': repetition, 'value': value}
+        if seconds is not None:
+            self.seconds[(n_value, repetition)] = seconds
+            record['seconds'] = seconds
+        if estimate is not None:
+            self.estimates[(n_value, repetition)] = tuple(estimate)
+            record['estimate'] = list(estimate)
+        self._write_line(record)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _write_line(self, record):
+        self.file.write(json.dumps(record) + '\n')
+        self.file.flush()
+
+
+def new_checkpoint_path(directory):
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, _unique_filename("jsonl"))
+
+
+def read_checkpoint(path):
+    # Returns the header metadata and {(n_value, repetition): value}. A line cut short by a
+    # crash mid-write is skipped, its unit simply running again on resume.
+    metadata, completed, _, _ = _read_checkpoint_records(path)
+    return metadata, completed
+
+
+def _read_checkpoint_records(path):
+    # read_checkpoint's results plus {(n_value, repetition): seconds} for the units that were timed
+    # and {(n_value, repetition): (distance, standard_error)} for those with a fitted estimate
+    metadata = {}
+    completed = {}
+    seconds = {}
+    estimates = {}
+    with open(path, 'r') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if 'meta' in record:
+                metadata = record['meta']
+            else:
+                key = (record['n'], record['repetition'])
+                completed[key] = record['value']
+                if 'seconds' in record:
+                    seconds[key] = record['seconds']
+                if 'estimate' in record:
+                    estimates[key] = tuple(record['estimate'])
+    return metadata, completed, seconds, estimates
+
+
+def import_checkpoint(path):
+    # Lays the finished units out like an exported dataset, one list per n value of the run. The
+    # header holds the range of the run that created the checkpoint, which a resume can extend,
+    # so the range and repetition count cover every stored unit as well and the returned metadata
+    # says so.
+    metadata, completed = read_checkpoint(path)
+    n_left_bound = min([metadata.get('n_left_bound', 1)] + [n_value for n_value, _ in completed])
+    n_right_bound = max([metadata.get('n_right_bound', 0)] + [n_value for n_value, _ in completed])
+    repetitions = max([metadata.get('repetitions', 0)] + [repetition + 1 for _, repetition in completed])
+    if completed:
+        metadata = dict(metadata, n_left_bound=n_left_bound, n_right_bound=n_right_bound,
+                        repetitions=repetitions)
+    n_values = range(n_left_bound, n_right_bound + 1)
+    dataset = [[completed[(n_value, repetition)] for repetition in range(repetitions)
+                if (n_value, repetition) in completed] for n_value in n_values]
+    return metadata, dataset
@@ -0,0 +1,128 @@
+import functools
+import math
+import time
+from collections import namedtuple
+
+from simulation import create_field
+
+# Orders a sweep's units by estimated cost and turns finished units into a time-based ETA. Units
+# of one sweep share everything but n, so only the relative cost of each n matters: the pool and
+# coordinator start the costliest units first, leaving the cheap ones to fill in around the
+# stragglers at the end. unit_cost is only a prior: CostModel rescales it to the seconds units
+# actually took, in this run or in the checkpoint it resumes, and the seconds each unit of cost
+# takes are calibrated from the units already finished in the run.
+
+# Fixed work per draw on the line, in points: the call, sorting out the extremes, the traversals
+DRAW_OVERHEAD_POINTS = 8
+# Bounds on the fitted exponent of the measured cost, keeping a few noisy timings of similar units
+# from extrapolating wildly to far larger n
+FIT_EXPONENT_RANGE = (0.5, 2.0)
+
+
+@functools.lru_cache(maxsize=None)
+def square_exact_limit():
+    # Point counts the square solves exactly, as set on the fields sweeps create
+    return create_field(1, geometry='square').get_exact_limit()
+
+
+def unit_cost(n_value, sig_fig, iterations, engine='brute_force', geometry='line'):
+    # Relative cost of one unit: the draws of every funnel level times the work of each draw
+    if engine == 'analytic':
+        return float(sig_fig)
+    draws = iterations * sig_fig
+    if geometry == 'square':
+        if n_value <= square_exact_limit():
+            # Held-Karp fills a 2^n * n table at n per entry
+            return draws * (n_value * n_value * 2 ** n_value + DRAW_OVERHEAD_POINTS)
+        # Nearest neighbour and 2-opt from every point
+        return draws * (n_value ** 3 + DRAW_OVERHEAD_POINTS)
+    if engine == 'order_statistics':
+        # The extremes are drawn directly, whatever n is
+        return draws * DRAW_OVERHEAD_POINTS
+    return draws * (n_value + DRAW_OVERHEAD_POINTS)
+
+
+# Seconds per unit of one sweep, by n. Measured n values cost the mean of their timings; the rest
+# are extrapolated from unit_cost through seconds = scale * cost^exponent, fitted by least squares
+# on logs once units of two different costs have been timed and a plain scale before that. Until
+# anything is timed, estimates are unit_cost itself.
+class CostModel:
+    def __init__(self, sig_fig, iterations, engine='brute_force', geometry='line'):
+        self.parameters = (sig_fig, iterations, engine, geometry)
+        # n_value -> (timed units, their total seconds)
+        self.timings = {}
+        self._fit = None
+
+    def observe(self, n_value, seconds):
+        count, total = self.timings.get(n_value, (0, 0.0))
+        self.timings[n_value] = (count + 1, total + seconds)
+        self._fit = None
+
+    def estimate(self, n_value):
+        if n_value in self.timings:
+            count, total = self.timings[n_value]
+            return total / count
+        cost = unit_cost(n_value, *self.parameters)
+        if not self.timings:
+            return cost
+        scale, exponent = self._fitted()
+        return scale * cost ** exponent
+
+    def _fitted(self):
+        if self._fit is None:
+            points = [(math.log(unit_cost(n_value, *self.parameters)), math.log(max(total / count, 1e-9)))
+                      for n_value, (count, total) in self.timings.items()]
+            mean_x = sum(x for x, _ in points) / len(points)
+            mean_y = sum(y for _, y in points) / len(points)
+            spread = sum((x - mean_x) ** 2 for x, _ in points)
+            exponent = 1.0
+            if spread > 1e-12:
+                exponent = sum((x - mean_x) * (y - mean_y) for x, y in points) / spread
+                exponent = min(max(exponent, FIT_EXPONENT_RANGE[0]), FIT_EXPONENT_RANGE[1])
+            self._fit = (math.exp(mean_y - exponent * mean_x), exponent)
+        return self._fit
+
+
+def longest_first(units, costs):
+    # Stable, so units of equal cost keep their order
+    return sorted(units, key=lambda unit: -costs[unit])
+
+
+# What a sweep's progress_callback receives as each unit finishes. fraction is the share of the
+# sweep's estimated time done rather than of its units; eta is None until a unit has been computed.
+SweepProgress = namedtuple('SweepProgress', ['completed', 'total', 'fraction', 'elapsed', 'eta'])
+
+
+class ProgressTracker:
+    def __init__(self, costs):
+        self.costs = costs
+        self.finished = set()
+        # The units this run computed, which alone say how fast it goes
+        self.computed = set()
+        self._totals()
+        self.start = time.perf_counter()
+
+    def reprice(self, costs):
+        # Swaps in fresh estimates, e.g. once a cost model has seen more timings
+        self.costs = costs
+        self._totals()
+
+    def finish(self, unit, computed=True):
+        # Units resumed from a store or cache count towards the fraction but not the rate
+        cost = self.costs[unit]
+        self.finished.add(unit)
+        self.finished_cost += cost
+        if computed:
+            self.computed.add(unit)
+            self.computed_cost += cost
+        elapsed = time.perf_counter() - self.start
+        eta = None
+        if self.computed_cost > 0:
+            eta = (self.total_cost - self.finished_cost) * elapsed / self.computed_cost
+        fraction = self.finished_cost / self.total_cost if self.total_cost else 1.0
+        return SweepProgress(len(self.finished), len(self.costs), fraction, elapsed, eta)
+
+    def _totals(self):
+        self.total_cost = sum(self.costs.values())
+        self.finished_cost = sum(self.costs[unit] for unit in self.finished)
+        self.computed_cost = sum(self.costs[unit] for unit in self.computed)
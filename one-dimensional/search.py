@@ -0,0 +1,86 @@
+import math
+
+# 1 / golden ratio, the fraction of the bracket kept at each golden-section step
+INVERSE_PHI = (math.sqrt(5) - 1) / 2
+
+
+class GridSearch:
+    # The original funnel: a 0.1 step scan, then a ±step grid around the best at each finer level
+    def search(self, simulation):
+        return simulation._funnel_to_p_value()
+
+
+class GoldenSectionSearch:
+    # Shrinks the bracket by the golden ratio until it is narrower than the last significant figure.
+    # Both interior points are scored on the same point sets, so each step costs a single batch
+    # and its comparison is not swamped by sampling noise.
+    def search(self, simulation):
+        if simulation._dimensions() > 1:
+            raise ValueError("Golden-section search only handles one-dimensional fields")
+        left_bound, right_bound, _ = simulation._starting_bracket()
+        tolerance = 10 ** -simulation.significant_figures / 2
+        while True:
+            p_value = self._shrink(
+                simulation, left_bound, right_bound, tolerance)
+            # The rounded midpoint can sit up to a whole last figure inside the edge
+            widened = simulation._widened_bracket(
+                p_value, left_bound, right_bound, 2 * tolerance)
+            if widened is None:
+                return p_value
+            left_bound, right_bound, _ = simulation._snapped_bracket(*widened)
+
+    def _shrink(self, simulation, left_bound, right_bound, tolerance):
+        while right_bound - left_bound > tolerance:
+            span = right_bound - left_bound
+            lower = right_bound - INVERSE_PHI * span
+            upper = left_bound + INVERSE_PHI * span
+            lower_traversal, upper_traversal = simulation._gather_shared([
+                lower, upper])
+            if lower_traversal <= upper_traversal:
+                right_bound = upper
+            else:
+                left_bound = lower
+        return round((left_bound + right_bound) / 2, simulation.significant_figures)
+
+
+class SuccessiveHalvingSearch:
+    # Walks the same levels as the grid funnel, but races each level's candidates: every round
+    # scores the survivors on a shared batch, keeps the better half and doubles the batch, so only
+    # the last couple of candidates ever see the full iteration count.
+    def search(self, simulation):
+        return simulation._funnel_to_p_value(lambda candidates: self._race(simulation, candidates))
+
+    def _race(self, simulation, candidates):
+        rounds = max(1, math.ceil(math.log2(len(candidates))))
+        totals = [0.0] * len(candidates)
+        counts = [0] * len(candidates)
+        survivors = list(range(len(candidates)))
+
+        for round_idx in range(rounds):
+            # Budgets double each round, ending at the full iteration count
+            budget = max(1, simulation.iterations >> (rounds - 1 - round_idx))
+            traversals = simulation._gather_shared(
+                [candidates[idx] for idx in survivors], budget)
+            for idx, traversal in zip(survivors, traversals):
+                totals[idx] += traversal * budget
+                counts[idx] += budget
+            survivors.sort(key=lambda idx: totals[idx] / counts[idx])
+            survivors = survivors[:max(1, math.ceil(len(survivors) / 2))]
+
+        return candidates[survivors[0]]
+
+
+SEARCH_STRATEGIES = {
+    'grid': GridSearch,
+    'golden_section': GoldenSectionSearch,
+    'successive_halving': SuccessiveHalvingSearch,
+}
+
+
+def create_search_strategy(search):
+    # Accepts a strategy name or an object with a search(simulation) method
+    if not isinstance(search, str):
+        return search
+    if search not in SEARCH_STRATEGIES:
+        raise ValueError(f"Unknown search strategy: {search}")
+    return SEARCH_STRATEGIES[search]()
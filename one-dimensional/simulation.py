@@ -1,56 +1,316 @@
-import statistics
+import itertools
+import math
+from statistics import NormalDist
 
+from placement_optimization_sim import NumberLine, AnalyticNumberLine, Square2D
 
+from instrumentation import count, span
+from search import create_search_strategy
+from stats import RunningStats, TraversalCurve
+
+# Monte Carlo samplers first, the exact engine last
+ENGINES = ('brute_force', 'order_statistics', 'analytic')
+# Fields points are scattered over, the line first
+GEOMETRIES = ('line', 'square')
+# Variance reductions of the sampling engines: antithetic pairs average each draw with its
+# reflection through the centre, the control variate regresses out the line's range, whose
+# expectation (n - 1) / (n + 1) * length is known. The square has no control variate.
+VARIANCE_REDUCTIONS = ('none', 'antithetic', 'control_variate', 'antithetic_control_variate')
+# A warm-started funnel skips every level whose grid would put more candidates than this in the bracket
+WARM_START_CANDIDATES = 20
+
+
+# threads=0 spreads batches over every core, 1 keeps them on the calling thread.
+# The analytic engine draws nothing, so it ignores both threads and seed.
+def create_number_line(n_value, engine='brute_force', threads=0, seed=None):
+    if engine == 'analytic':
+        return AnalyticNumberLine(
+            start=0.0, end=2.0, starting_position=1.0, number_of_points=n_value)
+    return NumberLine(start=0.0, end=2.0, starting_position=1.0,
+                      number_of_points=n_value, sampler=engine, threads=threads, seed=seed)
+
+
+# The square [0, 2]^2 starts from its center and only samples by brute force, small point sets
+# being solved exactly and larger ones heuristically
+def create_field(n_value, engine='brute_force', threads=0, seed=None, geometry='line'):
+    if geometry == 'line':
+        return create_number_line(n_value, engine, threads, seed)
+    if geometry != 'square':
+        raise ValueError(f"Unknown geometry: {geometry}")
+    if engine != 'brute_force':
+        raise ValueError(f"The square has no {engine} engine")
+    return Square2D(start=0.0, end=2.0, starting_position=(1.0, 1.0),
+                    number_of_points=n_value, threads=threads, seed=seed)
+
+
+# Searches any field: a line's positions are floats and a square's are (x, y) tuples, every
+# candidate grid spanning from the starting position to the far end along each axis
 class Simulation:
-    def __init__(self, number_line, iterations=1, repetitions=1, significant_figures=1, progress_callback=None):
+    def __init__(self, number_line, iterations=1, repetitions=1, significant_figures=1, progress_callback=None, common_random_numbers=False, search='grid', adaptive=False, batch_size=None, confidence=0.95, bracket=None, variance_reduction=None):
         self.number_line = number_line
         self.iterations = iterations
         self.repetitions = repetitions
         self.significant_figures = significant_figures
         self.optimal_p_values = []
         self.progress_callback = progress_callback
+        # Scores every candidate against the same point sets, cutting the noise in the argmin
+        self.common_random_numbers = common_random_numbers
+        # A name from search.SEARCH_STRATEGIES or any object with a search(simulation) method
+        self.search_strategy = create_search_strategy(search)
+        # Adaptive gathering samples each candidate in batches and stops early once its mean is
+        # precise enough or clearly worse than the best, iterations becoming a per-candidate cap
+        self.adaptive = adaptive
+        self.batch_size = batch_size or max(1, iterations // 16)
+        self.z_score = NormalDist().inv_cdf(0.5 + confidence / 2)
+        # Traversals evaluated across all candidates, whichever gathering mode is used
+        self.samples_used = 0
+        # Per repetition, every candidate the grid funnel scored and the optimum fitted to them
+        # as (position, nominal standard error), None where no fit was possible
+        self.traversal_curves = []
+        self.optimum_estimates = []
+        self._scored_levels = []
+        # A (left, right) range of p values expected to hold the optimum, e.g. from the previous n
+        # of a sweep. Searches start inside it, widening it whenever the optimum lands on its edge.
+        self.bracket = bracket
+        if bracket is not None and self._dimensions() > 1:
+            raise ValueError("Warm-start brackets only apply to one-dimensional fields")
+        # One of VARIANCE_REDUCTIONS, set on the field and applied to every batch it draws
+        if variance_reduction is not None:
+            self.number_line.set_variance_reduction(variance_reduction)
 
     def run(self):
         for _ in range(self.repetitions):
-            p_val = self._funnel_to_p_value()
+            self._scored_levels = []
+            with span('search', strategy=type(self.search_strategy).__name__):
+                p_val = self.search_strategy.search(self)
             self.optimal_p_values.append(p_val)
+            self._record_curve()
             if self.progress_callback:
                 self.progress_callback()
 
     def _gather(self):
-        dataset = []
-        for _ in range(self.iterations):
-            dataset.append(self.number_line.regenerate_data())
-        return statistics.mean(dataset)
+        with span('rust.mean_traversal', iterations=self.iterations):
+            traversal = self.number_line.mean_traversal(self.iterations)
+        count('samples_drawn', self.iterations)
+        return traversal
+
+    def _gather_shared(self, p_values, iterations=None):
+        # Every candidate is scored on the same point sets, as paired comparisons need
+        iterations = iterations or self.iterations
+        with span('rust.traversal_curve', candidates=len(p_values), iterations=iterations):
+            traversals = self.number_line.traversal_curve(p_values, iterations)
+        self._count_samples(len(p_values), iterations * len(p_values))
+        return traversals.tolist()
+
+    def _gather_moments(self, p_values):
+        # Means, sample variances and sample counts of every candidate from a single pass
+        if self.adaptive:
+            running_stats = self._adaptive_stats(p_values)
+            return ([stats.mean for stats in running_stats],
+                    [stats.variance() for stats in running_stats],
+                    [stats.count for stats in running_stats])
+        with span('rust.traversal_moments', candidates=len(p_values), iterations=self.iterations):
+            means, variances = self.number_line.traversal_moments(
+                p_values, self.iterations, self.common_random_numbers)
+        self._count_samples(len(p_values), self.iterations * len(p_values))
+        return means.tolist(), variances.tolist(), [self.iterations] * len(p_values)
+
+    def _adaptive_stats(self, p_values):
+        running_stats = [RunningStats() for _ in p_values]
+        active = list(range(len(p_values)))
+        tolerance = self._tolerance()
+
+        # Under common random numbers, batch mean differences from the leader, the active candidate
+        # with the lowest mean before the batch, restarted whenever the leader changes
+        differences = [RunningStats() for _ in p_values]
+        leader = None
+
+        while active:
+            # Active candidates always share a sample count, having been drawn together
+            batch = min(self.batch_size,
+                        self.iterations - running_stats[active[0]].count)
+            with span('rust.traversal_moments', candidates=len(active), iterations=batch):
+                means, variances = self.number_line.traversal_moments(
+                    [p_values[idx] for idx in active], batch, self.common_random_numbers)
+            for idx, mean, variance in zip(active, means, variances):
+                running_stats[idx].merge(batch, mean, variance)
+            self.samples_used += batch * len(active)
+            count('samples_drawn', batch * len(active))
+            if self.common_random_numbers and leader in active:
+                leader_mean = means[active.index(leader)]
+                for idx, mean in zip(active, means):
+                    differences[idx].push(mean - leader_mean)
+
+            best = min(running_stats, key=lambda stats: stats.mean)
+            best_upper = best.mean + self.z_score * best.standard_error()
+            active = [idx for idx in active
+                      if not self._is_settled(running_stats[idx], best_upper, tolerance)
+                      and not self._is_separated(differences[idx])]
+            if active:
+                next_leader = min(active, key=lambda idx: running_stats[idx].mean)
+                if next_leader != leader:
+                    differences = [RunningStats() for _ in p_values]
+                    leader = next_leader
+
+        count('candidates_evaluated', len(p_values))
+        return running_stats
+
+    def _count_samples(self, candidates, samples):
+        self.samples_used += samples
+        count('samples_drawn', samples)
+        count('candidates_evaluated', candidates)
+
+    def _is_settled(self, stats, best_upper, tolerance):
+        half_width = self.z_score * stats.standard_error()
+        return (stats.count >= self.iterations
+                or half_width <= tolerance
+                or stats.mean - half_width > best_upper)
+
+    def _is_separated(self, difference):
+        # Paired differences need two batches for a variance and settle a candidate once their
+        # interval lies wholly above zero
+        return (difference.count >= 2
+                and difference.mean - self.z_score * difference.standard_error() > 0)
+
+    def _tolerance(self):
+        # Half a unit in the last significant figure of the mean traversal
+        return 0.5 * 10 ** -self.significant_figures
+
+    def _dimensions(self):
+        return self.number_line.get_dimensions()
+
+    def _coordinates(self, position):
+        return position if isinstance(position, tuple) else (position,)
+
+    def _search_region(self):
+        # (left, right) bounds along every axis
+        end = float(self.number_line.get_end())
+        return [(float(start), end) for start in self._coordinates(self.number_line.get_starting_position())]
+
+    def _search_bounds(self):
+        # The bounds of a one-dimensional search
+        return self._search_region()[0]
+
+    def _starting_bracket(self):
+        # The range and funnel level a search starts from, the whole search at the coarsest level
+        # unless a warm-start bracket narrows it
+        if self.bracket is None:
+            return (*self._search_bounds(), 1)
+        return self._snapped_bracket(*self.bracket)
+
+    def _snapped_bracket(self, low, high):
+        # Snaps a range outward onto the grid of the coarsest level that keeps it within
+        # WARM_START_CANDIDATES, returning the snapped range and that level
+        left_bound, right_bound = self._search_bounds()
+        low = min(max(low, left_bound), right_bound)
+        high = min(max(high, low), right_bound)
+        level = 1
+        while level < self.significant_figures and (high - low) * 10 ** (level + 1) <= WARM_START_CANDIDATES:
+            level += 1
+        step = 10.0 ** -level
+        low = left_bound + math.floor((low - left_bound) / step + 1e-9) * step
+        high = left_bound + math.ceil((high - left_bound) / step - 1e-9) * step
+        # A single point leaves nothing to compare against, so it gains a neighbour
+        if high - low < step / 2:
+            if low - step >= left_bound - step / 2:
+                low -= step
+            else:
+                high += step
+        return max(low, left_bound), min(high, right_bound), level
+
+    def _widened_bracket(self, p_value, left_bound, right_bound, margin):
+        # None while the optimum sits inside the bracket or against a bound of the whole search,
+        # otherwise the bracket recentred on it at twice the width
+        search_left, search_right = self._search_bounds()
+        on_left_edge = p_value - left_bound <= margin and left_bound > search_left
+        on_right_edge = right_bound - p_value <= margin and right_bound < search_right
+        if self.bracket is None or not (on_left_edge or on_right_edge):
+            return None
+        width = max(right_bound - left_bound, 2 * margin)
+        return max(p_value - width, search_left), min(p_value + width, search_right)
+
+    def _lowest_mean(self, p_values):
+        traversal_distances, variances, counts = self._gather_moments(p_values)
+        self._scored_levels.append(TraversalCurve(
+            p_values, traversal_distances, variances, counts))
+        return self._find_optimal_p(traversal_distances, p_values)
+
+    def _record_curve(self):
+        # Searches that never score a whole grid, like golden section, leave no curve
+        if not self._scored_levels:
+            self.traversal_curves.append(None)
+            self.optimum_estimates.append(None)
+            return
+        curve = TraversalCurve.concatenate(self._scored_levels)
+        self.traversal_curves.append(curve)
+        estimate = curve.fit_optimum()
+        if estimate is not None:
+            # A vertex past the bound of the search is the bound, as on the symmetric line at n <= 2
+            left_bound, right_bound = self._search_bounds()
+            estimate = (min(max(estimate[0], left_bound), right_bound), estimate[1])
+        self.optimum_estimates.append(estimate)
 
     # ! Definite Bottleneck
-    def _funnel_to_p_value(self):
-        left_bound = float(self.number_line.get_starting_position())
-        right_bound = float(self.number_line.get_end())
-        step = 1
-        # ! Space for data structure improvement here, lists may not be best
-        traversal_distances = []
-        tested_p_values = []
-
-        for _ in range(self.significant_figures):
-            traversal_distances.clear()
-            tested_p_values.clear()
-            step /= 10
-            j = left_bound
-            while j <= right_bound:
-                self.number_line.set_starting_position(j)
-                traversal = self._gather()
-                traversal_distances.append(traversal)
-                tested_p_values.append(j)
-                j += float(step)
-
-            optimal_p_val = self._find_optimal_p(
-                traversal_distances, tested_p_values)
-            end = self.number_line.get_end()
-            left_bound = min(optimal_p_val - step, end)
-            right_bound = min(optimal_p_val + step, end)
-
-        return self._find_optimal_p(traversal_distances, tested_p_values)
+    def _funnel_to_p_value(self, select=None):
+        # select(p_values) picks each level's best candidate, by default the lowest mean traversal
+        select = select or self._lowest_mean
+        region = self._search_region()
+        if self.bracket is None:
+            bounds, level = region, 1
+        else:
+            left_bound, right_bound, level = self._starting_bracket()
+            bounds = [(left_bound, right_bound)]
+        bracketing = self.bracket is not None
+
+        while True:
+            step = 10.0 ** -level
+            # ! Space for data structure improvement here, lists may not be best
+            tested_p_values = self._candidate_positions(bounds, step)
+            with span('funnel_level', level=level, candidates=len(tested_p_values)):
+                optimal_p_val = select(tested_p_values)
+
+            # A warm start that missed the optimum rescans a wider bracket before refining
+            widened = self._widened_bracket(
+                optimal_p_val, *bounds[0], step / 2) if bracketing else None
+            if widened is not None:
+                left_bound, right_bound, level = self._snapped_bracket(
+                    *widened)
+                bounds = [(left_bound, right_bound)]
+                continue
+            bracketing = False
+
+            if level >= self.significant_figures:
+                return optimal_p_val
+            level += 1
+            # Refinement stays inside the region, so an optimum at the centre refines one side only
+            bounds = [(max(coordinate - step, start), min(coordinate + step, end))
+                      for coordinate, (start, end) in zip(self._coordinates(optimal_p_val), region)]
+
+    def _candidate_positions(self, bounds, step):
+        # Floats along a single axis, the grid of (x, y, ...) tuples otherwise
+        axes = [self._candidate_p_values(left_bound, right_bound, step)
+                for left_bound, right_bound in bounds]
+        # The line's grid already spans only its upper half, which is all folding would leave
+        if len(axes) == 1:
+            return axes[0]
+        grid = list(itertools.product(*axes))
+        # Mirror images of a candidate score the same, so each is folded onto the field's fundamental
+        # region and scored once, e.g. the triangle x >= y of the square's upper quadrant
+        canonical = {}
+        for position in self.number_line.canonical_positions(grid):
+            key = tuple(round(coordinate, 12)
+                        for coordinate in self._coordinates(position))
+            canonical.setdefault(key, position)
+        return list(canonical.values())
+
+    def _candidate_p_values(self, left_bound, right_bound, step):
+        p_values = []
+        j = left_bound
+        # Tolerates the drift of repeated float addition at the right bound
+        while j <= right_bound + step * 1e-9:
+            p_values.append(j)
+            j += float(step)
+        return p_values
 
     def _find_optimal_p(self, traversal_distances, tested_p_values):
         minimum_traversal = min(traversal_distances)
@@ -0,0 +1,129 @@
+import math
+
+import numpy as np
+
+
+# Welford running mean and variance, mergeable with summaries of whole batches
+class RunningStats:
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def push(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def merge(self, count, mean, variance):
+        # Chan et al. combination with a batch summarised by its count, mean and sample variance
+        if count == 0:
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += variance * (count - 1) + delta * delta * self.count * count / total
+        self.count = total
+
+    def variance(self):
+        if self.count < 2:
+            return 0.0
+        return self.m2 / (self.count - 1)
+
+    def stdev(self):
+        return math.sqrt(self.variance())
+
+    def standard_error(self):
+        if self.count == 0:
+            return math.inf
+        return math.sqrt(self.variance() / self.count)
+
+
+def pooled_estimate(estimates):
+    # Mean of independent (value, standard_error) estimates and the standard error of that mean,
+    # None without any
+    if not estimates:
+        return None
+    values = [value for value, _ in estimates]
+    variance = sum(error * error for _, error in estimates)
+    return sum(values) / len(values), math.sqrt(variance) / len(estimates)
+
+
+# Quadratic fits use the candidates around the best one up to the nearest whose mean rises above
+# the best by this many standard errors, or by this fraction of the best mean for exact curves,
+# so flat curves are fitted over wide windows and sharp ones over narrow windows
+FIT_RISE_STANDARD_ERRORS = 8
+FIT_RISE_FRACTION = 1e-3
+# Widest window a fit uses, either side of the best candidate
+FIT_HALF_WIDTH = 0.2
+
+
+# Every candidate a search scored, as arrays of positions, mean traversals, sample variances and
+# sample counts
+class TraversalCurve:
+    def __init__(self, positions, means, variances, counts):
+        self.positions = np.asarray(positions, dtype=float)
+        self.means = np.asarray(means, dtype=float)
+        self.variances = np.asarray(variances, dtype=float)
+        self.counts = np.asarray(counts, dtype=float)
+
+    @classmethod
+    def concatenate(cls, curves):
+        return cls(*(np.concatenate([getattr(curve, name) for curve in curves])
+                     for name in ('positions', 'means', 'variances', 'counts')))
+
+    def __len__(self):
+        return len(self.means)
+
+    def best_position(self):
+        return self.positions[np.argmin(self.means)]
+
+    def fit_optimum(self):
+        # Vertex of a weighted least squares parabola through the candidates around the best one,
+        # with its standard error by the delta method. Means are weighted by counts / variance,
+        # treating every candidate's error as independent, which candidates scored on common random
+        # numbers or refined over the same draws are not: the error is a nominal scale for the
+        # vertex, not a calibrated interval. None when positions have more than one coordinate or
+        # the fit is not a minimum within its window.
+        if self.positions.ndim != 1:
+            return None
+        best = self.best_position()
+        offsets = self.positions - best
+        half_width = self._fit_half_width(offsets)
+        window = np.abs(offsets) < half_width + 1e-12
+        if len(np.unique(offsets[window])) < 3:
+            return None
+        design = np.vander(offsets[window], 3, increasing=True)
+        variances = self.variances[window]
+        if np.all(variances <= 0):
+            # Exact means, as the analytic engine gives
+            weights = np.ones_like(variances)
+        else:
+            floor = variances[variances > 0].min()
+            weights = self.counts[window] / np.maximum(variances, floor)
+        try:
+            covariance = np.linalg.inv(design.T @ (design * weights[:, None]))
+        except np.linalg.LinAlgError:
+            return None
+        _, slope, curvature = covariance @ (design.T @ (weights * self.means[window]))
+        if curvature <= 0:
+            return None
+        vertex = -slope / (2 * curvature)
+        if abs(vertex) > half_width:
+            return None
+        if np.all(variances <= 0):
+            return float(best + vertex), 0.0
+        gradient = np.array([0.0, -1 / (2 * curvature), slope / (2 * curvature ** 2)])
+        standard_error = math.sqrt(max(gradient @ covariance @ gradient, 0.0))
+        return float(best + vertex), standard_error
+
+    def _fit_half_width(self, offsets):
+        best_mean = self.means.min()
+        if np.any(self.variances > 0):
+            standard_error = math.sqrt(np.median(self.variances / self.counts))
+            rise = FIT_RISE_STANDARD_ERRORS * standard_error
+        else:
+            rise = FIT_RISE_FRACTION * best_mean
+        risen = np.abs(offsets[self.means > best_mean + rise])
+        return min(risen.min(), FIT_HALF_WIDTH) if len(risen) else FIT_HALF_WIDTH
@@ -0,0 +1,259 @@
+import hashlib
+import math
+import statistics
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from instrumentation import span
+from scheduler import CostModel, ProgressTracker, longest_first
+from simulation import Simulation, create_field
+
+# How often a pooled sweep wakes up to check for cancellation while units are running
+CANCEL_POLL_SECONDS = 0.1
+
+
+def derive_seed(seed, *keys):
+    # Stable across processes and platforms, unlike hash()
+    if seed is None:
+        return None
+    label = ':'.join(str(key) for key in (seed, *keys))
+    digest = hashlib.blake2b(label.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+# simulation_options are forwarded to Simulation, e.g. search or common_random_numbers
+def run_simulation_for_n(n_value, sig_fig, iterations, repetitions, engine='brute_force', progress_callback=None, threads=0, seed=None, geometry='line', **simulation_options):
+    distances_from_center, _ = estimate_optima_for_n(
+        n_value, sig_fig, iterations, repetitions, engine, progress_callback, threads, seed,
+        geometry, **simulation_options)
+    return distances_from_center
+
+
+def estimate_optima_for_n(n_value, sig_fig, iterations, repetitions, engine='brute_force', progress_callback=None, threads=0, seed=None, geometry='line', **simulation_options):
+    # run_simulation_for_n's distances alongside, per repetition, the distance of the optimum
+    # fitted to the search's traversal curve and its nominal standard error, as a (distance,
+    # standard_error) pair, or None where no fit was possible
+    number_line = create_field(n_value, engine, threads, seed, geometry)
+    center = number_line.get_starting_position()
+    simulation = Simulation(
+        number_line, iterations, repetitions, sig_fig, progress_callback, **simulation_options)
+    simulation.run()
+    distances_from_center = [_distance(x, center)
+                             for x in simulation.optimal_p_values]
+    estimates = [None if estimate is None else (_distance(estimate[0], center), estimate[1])
+                 for estimate in simulation.optimum_estimates]
+    return distances_from_center, estimates
+
+
+def optimal_position_for_n(n_value, tolerance=None, sig_fig=3, iterations=1000, repetitions=3, engine='brute_force', seed=None, geometry='line', **simulation_options):
+    # The optimal starting position in the upper half of the field and a bound on its error, as
+    # (position, error). Lines answer from the precomputed table in src/optimum_table.rs whenever it
+    # is within tolerance, by default whenever it has an answer at all, its error then being within
+    # placement_optimization_sim.OPTIMUM_LOOKUP_ERROR of the line's length. Anything else is
+    # simulated, the error then being the standard error of the repetitions, or half the last
+    # figure searched when that is larger.
+    field = create_field(n_value, engine, seed=seed, geometry=geometry)
+    lookup = getattr(field, 'lookup_optimal_position', None)
+    if lookup is not None:
+        found = lookup(tolerance)
+        if found is not None:
+            return found
+    simulation = Simulation(field, iterations, repetitions, sig_fig, **simulation_options)
+    simulation.run()
+    positions = np.array(simulation.optimal_p_values, dtype=float)
+    error = 0.5 * 10 ** -sig_fig
+    if repetitions > 1:
+        error = max(error, float(np.max(positions.std(axis=0, ddof=1))) / math.sqrt(repetitions))
+    position = positions.mean(axis=0)
+    return (tuple(position.tolist()) if position.ndim else float(position)), error
+
+
+def _distance(position, center):
+    if isinstance(position, tuple):
+        return math.dist(position, center)
+    return abs(position - center)
+
+
+def _run_unit(n_value, repetition, sig_fig, iterations, engine, geometry, threads, seed, simulation_options):
+    # Module level so worker processes can unpickle it. Returns the unit's distance from the
+    # center, its fitted estimate as estimate_optima_for_n gives it and the seconds it took, which
+    # the sweep's cost model learns from.
+    unit_seed = derive_seed(seed, n_value, repetition)
+    start = time.perf_counter()
+    with span('unit', n=n_value, repetition=repetition):
+        distances, estimates = estimate_optima_for_n(n_value, sig_fig, iterations, 1, engine, threads=threads, seed=unit_seed, geometry=geometry, **simulation_options)
+    return distances[0], estimates[0], time.perf_counter() - start
+
+
+def warm_start_bracket(distances, previous_distances, sig_fig):
+    # The p range for the next n of a sweep: this n's optima padded by twice their spread and one
+    # last figure, stretched by how far they moved from the previous n. Distances map back onto
+    # the upper half of the line, where every search runs.
+    finished = [value for value in distances if value is not None]
+    if not finished:
+        return None
+    margin = 2 * statistics.pstdev(finished) + 10 ** -sig_fig
+    drift = 0.0
+    previous = [value for value in previous_distances or [] if value is not None]
+    if previous:
+        drift = statistics.mean(finished) - statistics.mean(previous)
+    return (1 + min(finished) + min(drift, 0.0) - margin,
+            1 + max(finished) + max(drift, 0.0) + margin)
+
+
+# Runs each (n_value, repetition) pair as an independent work unit, farmed out to a process pool
+# when more than one worker is requested. Results land in the same [n][repetition] layout either way,
+# and each unit draws from a seed derived from (seed, n_value, repetition), so a seeded sweep gives
+# bit-identical results whatever the worker count.
+#
+# Pooled units start costliest first, see scheduler.py, and progress_callback(progress) receives a
+# scheduler.SweepProgress with the share of the estimated time done and an ETA after every unit.
+# Estimates come from the seconds units took, both in this run and in a resumed store.
+# result_callback(idx, repetition, value, estimate) fires as each unit finishes, estimate being the
+# unit's fitted (distance, standard_error) or None, and estimates holds them in the superset's
+# layout once the sweep ends. Setting cancel_event stops
+# the sweep once the running units finish, leaving None for every unit that never ran. Given a
+# results.ResultStore, units it already holds are skipped and every new result is appended to it.
+# A cache.ResultCache likewise serves units computed by any earlier run with the same parameters.
+#
+# With warm_start, n values run in order and each searches a bracket seeded from the optima found
+# for the one before, skipping the coarse scans of the full interval.
+#
+# Passing executor, e.g. a distributed.SweepCoordinator, farms the units out to it in place of the
+# process pool, whatever the worker count. The sweep shuts it down when it ends.
+class SweepExecutor:
+    def __init__(self, workers=1, progress_callback=None, result_callback=None, cancel_event=None, store=None, cache=None, executor=None):
+        self.workers = workers
+        self.executor = executor
+        self.progress_callback = progress_callback
+        self.result_callback = result_callback
+        self.cancel_event = cancel_event
+        self.store = store
+        self.cache = cache
+        self.estimates = []
+        self._cache_keys = {}
+
+    def run(self, n_values, sig_fig, iterations, repetitions, engine='brute_force', seed=None, warm_start=False, geometry='line', **simulation_options):
+        if warm_start and geometry != 'line':
+            raise ValueError("Warm starts only apply to the line")
+        n_values = list(n_values)
+        superset = [[None] * repetitions for _ in n_values]
+        self.estimates = [[None] * repetitions for _ in n_values]
+        units = [(idx, repetition) for idx in range(len(n_values))
+                 for repetition in range(repetitions)]
+        # Warm starting runs one n value at a time, each searching a bracket built from the last
+        groups = [[unit for unit in units if unit[0] == idx] for idx in range(len(n_values))
+                  ] if warm_start else [units]
+        self._cost_model = CostModel(sig_fig, iterations, engine, geometry)
+        if self.store is not None:
+            for (n_value, _), seconds in self.store.seconds.items():
+                self._cost_model.observe(n_value, seconds)
+        self._costs = self._estimated_costs(n_values, units)
+        self._progress = ProgressTracker(self._costs)
+
+        # Each process already occupies a core, so its rust batches stay single threaded
+        executor = self.executor
+        if executor is None and self.workers > 1:
+            executor = ProcessPoolExecutor(max_workers=self.workers)
+        try:
+            options = simulation_options
+            for group in groups:
+                if self._is_cancelled():
+                    break
+                self._run_group(superset, n_values, group, executor,
+                                (sig_fig, iterations, engine, geometry, seed), options)
+                if warm_start:
+                    idx = group[0][0]
+                    bracket = warm_start_bracket(
+                        superset[idx], superset[idx - 1] if idx > 0 else None, sig_fig)
+                    options = dict(simulation_options, bracket=bracket)
+        finally:
+            # Queued units are dropped, running ones finish in the background when cancelled
+            if executor is not None:
+                executor.shutdown(wait=not self._is_cancelled(),
+                                  cancel_futures=True)
+        return superset
+
+    def _run_group(self, superset, n_values, units, executor, parameters, options):
+        sig_fig, iterations, engine, geometry, seed = parameters
+        if self.cache is not None:
+            self._cache_keys = {
+                (idx, repetition): self.cache.unit_key(
+                    n_values[idx], repetition, sig_fig, iterations, engine, seed, options, geometry)
+                for idx, repetition in units}
+        units = self._resume(superset, n_values, units)
+
+        if executor is None:
+            for idx, repetition in units:
+                if self._is_cancelled():
+                    break
+                value, estimate, seconds = _run_unit(
+                    n_values[idx], repetition, sig_fig, iterations, engine, geometry, 0, seed, options)
+                self._record(superset, n_values, idx, repetition, value, estimate, seconds=seconds)
+            return
+
+        # Dicts keep insertion order, so the costliest units are submitted first
+        futures = {
+            executor.submit(_run_unit, n_values[idx], repetition, sig_fig, iterations, engine, geometry, 1, seed, options): (idx, repetition)
+            for idx, repetition in longest_first(units, self._costs)
+        }
+        pending = set(futures)
+        while pending and not self._is_cancelled():
+            done, pending = wait(
+                pending, timeout=CANCEL_POLL_SECONDS, return_when=FIRST_COMPLETED)
+            for future in done:
+                idx, repetition = futures[future]
+                value, estimate, seconds = future.result()
+                self._record(superset, n_values, idx, repetition, value, estimate, seconds=seconds)
+
+    def _estimated_costs(self, n_values, units):
+        return {(idx, repetition): self._cost_model.estimate(n_values[idx])
+                for idx, repetition in units}
+
+    def _is_cancelled(self):
+        return self.cancel_event is not None and self.cancel_event.is_set()
+
+    def _resume(self, superset, n_values, units):
+        # Fills in units the store or cache already hold and returns the ones left to run
+        remaining = []
+        for idx, repetition in units:
+            key = (n_values[idx], repetition)
+            if self.store is not None and key in self.store.completed:
+                self._record(superset, n_values, idx, repetition, self.store.completed[key],
+                             self.store.estimates.get(key), persist=False, computed=False)
+                continue
+            entry = self._cached(idx, repetition)
+            if entry is not None:
+                self._record(superset, n_values, idx, repetition, *entry, computed=False)
+            else:
+                remaining.append((idx, repetition))
+        return remaining
+
+    def _cached(self, idx, repetition):
+        cache_key = self._cache_keys.get((idx, repetition))
+        if cache_key is None:
+            return None
+        return self.cache.lookup(cache_key)
+
+    def _record(self, superset, n_values, idx, repetition, value, estimate=None, persist=True, computed=True, seconds=None):
+        superset[idx][repetition] = value
+        self.estimates[idx][repetition] = estimate
+        if persist and self.store is not None:
+            self.store.record(n_values[idx], repetition, value, seconds, estimate)
+        if seconds is not None:
+            # The first timing of an n reshapes the model, so the rest of the sweep is repriced
+            first_timing = n_values[idx] not in self._cost_model.timings
+            self._cost_model.observe(n_values[idx], seconds)
+            if first_timing:
+                self._costs = self._estimated_costs(n_values, self._costs)
+                self._progress.reprice(self._costs)
+        cache_key = self._cache_keys.get((idx, repetition))
+        if persist and cache_key is not None and cache_key not in self.cache:
+            self.cache.put(cache_key, value, estimate)
+        if self.result_callback:
+            self.result_callback(idx, repetition, value, estimate)
+        progress = self._progress.finish((idx, repetition), computed)
+        if self.progress_callback:
+            self.progress_callback(progress)
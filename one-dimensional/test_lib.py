@@ -1,15 +1,281 @@
 import os
+import sys
 import json
+import math
+import re
 import time
+import statistics
+import threading
+import socket
+import subprocess
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 
+import numpy as np
 import pytest
 import tkinter as tk
 
-from simulation import Simulation
+from search import SEARCH_STRATEGIES, create_search_strategy
+from simulation import Simulation, ENGINES, GEOMETRIES, create_field, create_number_line
+from stats import RunningStats, TraversalCurve, pooled_estimate
+from cache import ResultCache
+from scheduler import CostModel, ProgressTracker, SweepProgress, longest_first, square_exact_limit, unit_cost
+from sweep import (SweepExecutor, _run_unit, derive_seed, optimal_position_for_n, run_simulation_for_n,
+                   warm_start_bracket)
+from results import (ResultStore, MappedDataset, export_binary, export_json, import_binary,
+                     import_json, import_checkpoint, import_results, map_binary, read_checkpoint)
+import cli
+import instrumentation
+from distributed import SweepCoordinator, run_worker, _receive, _send
+import benchmark
+import build_optimum_table
 from ui import UserInterface
-from utils import ProgramTimer, ProgressBar
-from placement_optimization_sim import NumberLine
+from utils import OptimaPlot, ProgramTimer, ProgressBar, ReportTarget, format_duration
+from placement_optimization_sim import NumberLine, AnalyticNumberLine, Square2D, OPTIMUM_LOOKUP_ERROR
+
+
+class TestNumberLine:
+    def test_mean_traversal(self):
+        number_line = NumberLine(0, 2, 1, 3)
+        assert 0 <= number_line.mean_traversal(100) <= 3
+
+    def test_mean_traversal_rejects_zero_iterations(self):
+        number_line = NumberLine(0, 2, 1, 3)
+        with pytest.raises(ValueError):
+            number_line.mean_traversal(0)
+
+    def test_mean_traversals(self):
+        number_line = NumberLine(0, 2, 1, 3)
+        traversals = number_line.mean_traversals([1.0, 1.5, 2.0], 100)
+        assert len(traversals) == 3
+        assert all(0 <= traversal <= 3 for traversal in traversals)
+
+    def test_traversal_curve(self):
+        number_line = NumberLine(0, 2, 1, 3)
+        traversals = number_line.traversal_curve([1.0, 1.5, 2.0], 100)
+        assert len(traversals) == 3
+        assert all(0 <= traversal <= 3 for traversal in traversals)
+
+    def test_traversal_curve_shares_point_sets(self):
+        # With a single point, the traversal from either end of the segment sums to its length
+        number_line = NumberLine(0, 2, 1, 1)
+        left, right = number_line.traversal_curve([0.0, 2.0], 50)
+        assert left + right == pytest.approx(2.0)
+
+    def test_thread_settings(self):
+        number_line = NumberLine(0, 2, 1, 3, threads=1)
+        assert number_line.get_threads() == 1
+        number_line.set_threads(2)
+        assert number_line.get_threads() == 2
+        assert 0 <= number_line.mean_traversal(10000) <= 3
+
+    def test_parallel_batches_match_serial(self):
+        serial = NumberLine(0, 2, 1, 4, threads=1)
+        parallel = NumberLine(0, 2, 1, 4, threads=0)
+        expected = serial.traversal_curve([1.0, 2.0], 100000)
+        actual = parallel.traversal_curve([1.0, 2.0], 100000)
+        for e, a in zip(expected, actual):
+            assert a == pytest.approx(e, abs=0.01)
+
+    def test_seed_reproducible(self):
+        first = NumberLine(0, 2, 1, 5, seed=42)
+        second = NumberLine(0, 2, 1, 5, seed=42)
+        assert first.get_seed() == 42
+        assert first.mean_traversal(5000) == second.mean_traversal(5000)
+        assert list(first.traversal_curve([1.0, 2.0], 5000)) == list(
+            second.traversal_curve([1.0, 2.0], 5000))
+
+    def test_seed_independent_of_threads(self):
+        serial = NumberLine(0, 2, 1, 5, threads=1, seed=7)
+        parallel = NumberLine(0, 2, 1, 5, threads=4, seed=7)
+        assert list(serial.mean_traversals([1.0, 1.5], 20000)) == list(
+            parallel.mean_traversals([1.0, 1.5], 20000))
+
+    def test_successive_batches_differ(self):
+        number_line = NumberLine(0, 2, 1, 5, seed=3)
+        assert number_line.mean_traversal(100) != number_line.mean_traversal(100)
+        number_line.set_seed(3)
+        replay = NumberLine(0, 2, 1, 5, seed=3)
+        assert number_line.mean_traversal(100) == replay.mean_traversal(100)
+
+    @pytest.mark.parametrize("shared", [True, False])
+    def test_traversal_moments(self, shared):
+        number_line = NumberLine(0, 2, 1, 3, seed=5)
+        means, variances = number_line.traversal_moments(
+            [1.0, 2.0], 20000, shared)
+        assert len(means) == len(variances) == 2
+        assert all(0 < variance < 1 for variance in variances)
+        # With n=3 on [0, 2], E = 2 * 3 / 4 from an end
+        assert means[1] == pytest.approx(1.5, abs=0.02)
+
+    def test_sampler_selection(self):
+        number_line = NumberLine(0, 2, 1, 3, sampler="order_statistics")
+        assert number_line.get_sampler() == "order_statistics"
+        number_line.set_sampler("brute_force")
+        assert number_line.get_sampler() == "brute_force"
+        with pytest.raises(ValueError):
+            number_line.set_sampler("unknown")
+
+    @pytest.mark.parametrize("n", [1, 2, 5, 40])
+    def test_order_statistics_matches_brute_force(self, n):
+        positions = [0.0, 0.5, 1.0, 1.5, 2.0]
+        brute_force = NumberLine(0, 2, 1, n, sampler="brute_force")
+        order_statistics = NumberLine(0, 2, 1, n, sampler="order_statistics")
+        expected = brute_force.mean_traversals(positions, 200000)
+        actual = order_statistics.mean_traversals(positions, 200000)
+        # Traversal standard deviation is below 1, so 200k samples put each mean well within 0.01
+        for e, a in zip(expected, actual):
+            assert a == pytest.approx(e, abs=0.01)
+
+    def test_order_statistics_stays_in_bounds(self):
+        number_line = NumberLine(0, 2, 1, 1000, sampler="order_statistics")
+        for _ in range(100):
+            assert 0 <= number_line.regenerate_data() <= 3
+
+    def test_variance_reduction_setting(self):
+        number_line = NumberLine(0, 2, 1, 3, variance_reduction="antithetic")
+        assert number_line.get_variance_reduction() == "antithetic"
+        number_line.set_variance_reduction("none")
+        assert number_line.get_variance_reduction() == "none"
+        with pytest.raises(ValueError):
+            number_line.set_variance_reduction("quasi_random")
+
+    @pytest.mark.parametrize("reduction", ["antithetic", "control_variate", "antithetic_control_variate"])
+    def test_reduced_means_stay_unbiased(self, reduction):
+        positions = [1.0, 1.5, 1.8]
+        expected = AnalyticNumberLine(0, 2, 1, 5).mean_traversals(positions, 1)
+        number_line = NumberLine(0, 2, 1, 5, seed=9, variance_reduction=reduction)
+        for mean, target in zip(number_line.mean_traversals(positions, 20000), expected):
+            assert mean == pytest.approx(target, abs=0.01)
+
+    def test_variance_reduction_factors(self):
+        # At the optimum for n = 5 the control variate alone cuts the variance several times over
+        position = AnalyticNumberLine(0, 2, 1, 5).optimal_position()
+        factors = {}
+        for reduction in ["none", "antithetic", "control_variate", "antithetic_control_variate"]:
+            number_line = NumberLine(0, 2, 1, 5, seed=2, variance_reduction=reduction)
+            factors[reduction] = number_line.variance_reduction_factors([position], 20000)[0]
+        assert factors["none"] == pytest.approx(1.0)
+        assert factors["antithetic"] >= 1.0
+        assert factors["control_variate"] > 3.0
+        assert factors["antithetic_control_variate"] > factors["control_variate"]
+
+
+class TestAnalyticNumberLine:
+    def test_expected_traversal_single_point(self):
+        # One point: the expected distance to a uniform point on [0, 2] from p
+        number_line = AnalyticNumberLine(0, 2, 1, 1)
+        for p in [0.0, 0.5, 1.0, 1.5]:
+            assert number_line.expected_traversal(p) == pytest.approx(
+                (p ** 2 + (2 - p) ** 2) / 4)
+
+    def test_expected_traversal_from_end(self):
+        # From an end, the traversal runs to the far extreme, E = 2 * n / (n + 1)
+        number_line = AnalyticNumberLine(0, 2, 1, 4)
+        assert number_line.expected_traversal(2.0) == pytest.approx(1.6)
+
+    @pytest.mark.parametrize("n", [2, 3, 10])
+    def test_matches_monte_carlo(self, n):
+        positions = [1.0, 1.3, 1.7, 2.0]
+        analytic = AnalyticNumberLine(0, 2, 1, n)
+        sampled = NumberLine(0, 2, 1, n, sampler="order_statistics")
+        expected = analytic.mean_traversals(positions, 1)
+        actual = sampled.mean_traversals(positions, 200000)
+        for e, a in zip(expected, actual):
+            assert a == pytest.approx(e, abs=0.01)
+
+    def test_optimal_position(self):
+        assert AnalyticNumberLine(0, 2, 1, 2).optimal_position() == 1.0
+        # For n=3 the slope 1 + 2p^3 - 2q^3 - 8p^3 vanishes at p = sqrt(3/2) - 1
+        expected = 2 - 2 * (1.5 ** 0.5 - 1)
+        assert AnalyticNumberLine(0, 2, 1, 3).optimal_position() == pytest.approx(
+            expected, abs=1e-12)
+
+    @pytest.mark.parametrize("n_value", [1, 3, 7, 256, 257, 1000, 50000])
+    def test_lookup_matches_exact_optimum(self, n_value):
+        number_line = AnalyticNumberLine(0, 2, 1, n_value)
+        position, error = number_line.lookup_optimal_position()
+        # The line is two long, and rounding onto it adds half an ulp of the position
+        assert error <= 2 * OPTIMUM_LOOKUP_ERROR + sys.float_info.epsilon
+        assert abs(position - number_line.optimal_position()) <= error + 1e-15
+
+    def test_lookup_outside_table(self):
+        # Past the checked range, or tighter than any stated error, the optimum must be simulated
+        assert AnalyticNumberLine(0, 2, 1, 2 ** 21).lookup_optimal_position() is None
+        assert AnalyticNumberLine(0, 2, 1, 5).lookup_optimal_position(1e-20) is None
+        assert AnalyticNumberLine(0, 2, 1, 5).lookup_optimal_position(2 * OPTIMUM_LOOKUP_ERROR) is not None
+
+    def test_simulation_with_analytic_engine(self):
+        number_line = AnalyticNumberLine(0, 2, 1, 3)
+        simulation = Simulation(number_line, 1, 2, 3)
+        simulation.run()
+        expected = number_line.optimal_position()
+        for p_val in simulation.optimal_p_values:
+            assert p_val == pytest.approx(expected, abs=0.002)
+
+
+class TestSquare2D:
+    def test_single_point_from_center(self):
+        # One point: the mean distance from the center of [0, 2]^2 to a uniform point, about 0.7652
+        square = Square2D(0, 2, (1, 1), 1, seed=3)
+        assert square.mean_traversal(20000) == pytest.approx(0.7652, abs=0.02)
+
+    def test_heuristic_never_beats_exact(self):
+        # Same seed, same draws: the exact path is never longer than the heuristic one
+        exact = Square2D(0, 2, (1, 1), 6, seed=8)
+        heuristic = Square2D(0, 2, (1, 1), 6, exact_limit=0, seed=8)
+        positions = [(1.0, 1.0), (1.5, 1.2), (2.0, 2.0)]
+        exact_means = exact.traversal_curve(positions, 200)
+        heuristic_means = heuristic.traversal_curve(positions, 200)
+        for exact_mean, heuristic_mean in zip(exact_means, heuristic_means):
+            assert exact_mean <= heuristic_mean + 1e-12
+
+    def test_seeded_batches_repeat(self):
+        positions = [(1.0, 1.0), (1.4, 1.9)]
+        first = Square2D(0, 2, (1, 1), 4, seed=2).traversal_curve(positions, 100)
+        second = Square2D(0, 2, (1, 1), 4, seed=2).traversal_curve(positions, 100)
+        assert list(first) == list(second)
+
+    def test_traversal_moments(self):
+        square = Square2D(0, 2, (1, 1), 3, seed=1)
+        means, variances = square.traversal_moments([(1.0, 1.0), (2.0, 2.0)], 100)
+        assert len(means) == len(variances) == 2
+        assert all(variance > 0 for variance in variances)
+
+    def test_exact_limit(self):
+        square = Square2D(0, 2, (1, 1), 3)
+        assert square.get_exact_limit() == 8
+        square.set_exact_limit(0)
+        assert square.get_exact_limit() == 0
+        with pytest.raises(ValueError):
+            square.set_exact_limit(64)
+
+    def test_canonical_positions(self):
+        square = Square2D(0, 2, (1, 1), 3)
+        canonical = square.canonical_positions([(0.5, 1.8), (1.8, 0.5), (0.2, 0.5), (1.7, 1.3)])
+        assert canonical[0] == pytest.approx((1.8, 1.5))
+        assert canonical[1] == pytest.approx((1.8, 1.5))
+        assert canonical[2] == pytest.approx((1.8, 1.5))
+        assert canonical[3] == (1.7, 1.3)
+
+    def test_symmetric_positions_match(self):
+        # Shared draws are uniform over the square, so mirror images only differ by sampling noise
+        square = Square2D(0, 2, (1, 1), 4, seed=5)
+        means = square.traversal_curve([(1.6, 1.2), (1.2, 1.6), (0.4, 0.8)], 20000)
+        assert means[1] == pytest.approx(means[0], abs=0.02)
+        assert means[2] == pytest.approx(means[0], abs=0.02)
+
+    def test_variance_reduction(self):
+        square = Square2D(0, 2, (1, 1), 3, variance_reduction="antithetic")
+        assert square.get_variance_reduction() == "antithetic"
+        with pytest.raises(ValueError):
+            square.set_variance_reduction("control_variate")
+
+    def test_geometry(self):
+        square = Square2D(0, 2, (1, 1), 3)
+        assert square.get_dimensions() == 2
+        assert square.get_starting_position() == (1, 1)
+        assert square.get_end() == 2
 
 
 class TestSimulation:
@@ -25,6 +291,161 @@ class TestSimulation:
         traversal = simulation._gather()
         assert 0 <= traversal <= 3
 
+    def test_gather_moments(self):
+        number_line = NumberLine(0, 2, 1, 3)
+        simulation = Simulation(number_line, 10, 1, 1)
+        means, variances, counts = simulation._gather_moments([1.0, 2.0])
+        assert len(means) == len(variances) == 2
+        assert counts == [10, 10]
+
+    def test_gather_shared(self):
+        number_line = NumberLine(0, 2, 1, 3)
+        simulation = Simulation(
+            number_line, 10, 1, 1, common_random_numbers=True)
+        traversals = simulation._gather_shared([1.0, 2.0])
+        assert len(traversals) == 2
+        assert simulation.samples_used == 20
+
+    def test_run_common_random_numbers(self):
+        number_line = NumberLine(0, 2, 1, 3)
+        simulation = Simulation(
+            number_line, 100, 2, 2, common_random_numbers=True)
+        simulation.run()
+        assert len(simulation.optimal_p_values) == 2
+
+    def test_candidate_p_values(self):
+        number_line = NumberLine(0, 2, 1, 3)
+        simulation = Simulation(number_line, 1, 1, 1)
+        p_values = simulation._candidate_p_values(1.0, 2.0, 0.1)
+        assert p_values[0] == 1.0
+        assert len(p_values) in (10, 11)
+
+    def test_adaptive_gather(self):
+        number_line = NumberLine(0, 2, 1, 10, seed=4)
+        simulation = Simulation(number_line, 20000, 1, 2,
+                                common_random_numbers=True, adaptive=True)
+        means, _, counts = simulation._gather_moments([1.0, 1.5, 1.9, 2.0])
+        assert len(means) == 4
+        assert simulation.samples_used == sum(counts)
+        assert 0 < simulation.samples_used <= 4 * 20000
+
+    def test_adaptive_stops_early(self):
+        # Exact means have zero variance, so every candidate settles after its first batch
+        number_line = AnalyticNumberLine(0, 2, 1, 5)
+        simulation = Simulation(number_line, 1600, 1, 3,
+                                adaptive=True, batch_size=100)
+        simulation.run()
+        fixed = Simulation(number_line, 1600, 1, 3)
+        fixed.run()
+        assert simulation.samples_used * 16 == fixed.samples_used
+        assert simulation.optimal_p_values == fixed.optimal_p_values
+
+    def test_adaptive_drops_clearly_worse_candidates(self):
+        number_line = NumberLine(0, 2, 1, 20, seed=9)
+        simulation = Simulation(number_line, 50000, 1, 1,
+                                common_random_numbers=True, adaptive=True, batch_size=1000)
+        simulation._gather_moments([1.0, 1.95])
+        # The center is far worse than the near-optimal point for n=20, so it retires early
+        assert simulation.samples_used < 2 * 50000
+
+    def test_adaptive_retires_paired_worse_candidate(self):
+        # Shared draws move both means together, so only their paired difference can separate
+        class SharedNoise:
+            def __init__(self):
+                self.rng = np.random.default_rng(3)
+
+            def get_dimensions(self):
+                return 1
+
+            def traversal_moments(self, p_values, iterations, shared):
+                noise = self.rng.normal(0, 1)
+                return np.array([noise + p for p in p_values]), np.full(len(p_values), 1e4)
+
+        simulation = Simulation(SharedNoise(), 10000, 1, 3, common_random_numbers=True,
+                                adaptive=True, batch_size=100)
+        means, _, counts = simulation._gather_moments([0.0, 0.01])
+        assert counts == [10000, 300]
+        assert means[0] < means[1]
+
+    def test_create_number_line(self):
+        for engine in ENGINES:
+            number_line = create_number_line(3, engine)
+            assert number_line.get_end() == 2.0
+
+    def test_create_field(self):
+        for geometry, dimensions in zip(GEOMETRIES, (1, 2)):
+            assert create_field(3, geometry=geometry).get_dimensions() == dimensions
+        with pytest.raises(ValueError):
+            create_field(3, 'analytic', geometry='square')
+        with pytest.raises(ValueError):
+            create_field(3, geometry='cube')
+
+    def test_variance_reduction_option(self):
+        number_line = NumberLine(0, 2, 1, 5, seed=1)
+        simulation = Simulation(number_line, 200, 1, 2, variance_reduction='control_variate')
+        assert number_line.get_variance_reduction() == 'control_variate'
+        simulation.run()
+        assert 1.0 <= simulation.optimal_p_values[0] <= 2.0
+
+    def test_fitted_optimum(self):
+        number_line = AnalyticNumberLine(0, 2, 1, 10)
+        simulation = Simulation(number_line, 1, 2, 3)
+        simulation.run()
+        assert len(simulation.traversal_curves) == len(simulation.optimum_estimates) == 2
+        optimum, standard_error = simulation.optimum_estimates[0]
+        assert optimum == pytest.approx(number_line.optimal_position(), abs=0.002)
+        assert standard_error == 0.0
+        # Every level of the funnel contributes its candidates to the curve
+        assert len(simulation.traversal_curves[0]) > 21
+
+    def test_sampled_optimum_error(self):
+        simulation = Simulation(NumberLine(0, 2, 1, 10, seed=4), 2000, 1, 3)
+        simulation.run()
+        optimum, standard_error = simulation.optimum_estimates[0]
+        assert 0 < standard_error < 0.025
+        assert 1.0 <= optimum <= 2.0
+
+    def test_golden_section_leaves_no_curve(self):
+        simulation = Simulation(AnalyticNumberLine(0, 2, 1, 5), 1, 1, 2, search='golden_section')
+        simulation.run()
+        assert simulation.traversal_curves == [None]
+        assert simulation.optimum_estimates == [None]
+
+    def test_square_search_grid(self):
+        square = Square2D(0, 2, (1, 1), 2, seed=6)
+        simulation = Simulation(square, 50, 1, 1, common_random_numbers=True)
+        candidates = simulation._candidate_positions(
+            simulation._search_region(), 0.1)
+        # The 11 x 11 quadrant folds onto the triangle x >= y, diagonal included
+        assert len(candidates) == 66
+        assert all(x >= y for x, y in candidates)
+        simulation.run()
+        x, y = simulation.optimal_p_values[0]
+        assert 1.0 <= y <= x <= 2.0
+
+    def test_line_search_grid_is_not_folded(self):
+        simulation = Simulation(AnalyticNumberLine(0, 2, 1, 5), 1, 1, 1)
+        assert simulation._candidate_positions([(1.0, 2.0)], 0.1) == simulation._candidate_p_values(
+            1.0, 2.0, 0.1)
+
+    def test_line_refinement_stays_in_upper_half(self):
+        # The optimum of two points is the centre, whose refinement scans only its upper side
+        simulation = Simulation(AnalyticNumberLine(0, 2, 1, 2), 1, 1, 2)
+        scanned = []
+
+        def select(p_values):
+            scanned.append(p_values)
+            return p_values[0]
+        assert simulation._funnel_to_p_value(select) == 1.0
+        assert min(scanned[1]) == 1.0 and max(scanned[1]) == pytest.approx(1.1)
+
+    def test_one_dimensional_only_options(self):
+        square = Square2D(0, 2, (1, 1), 2)
+        with pytest.raises(ValueError):
+            Simulation(square, 10, 1, 1, bracket=(1.0, 1.5))
+        with pytest.raises(ValueError):
+            Simulation(square, 10, 1, 1, search='golden_section').run()
+
     def test_find_optimal_p(self):
         number_line = NumberLine(0, 2, 1, 3)
         simulation = Simulation(number_line, 1, 1, 1)
@@ -39,6 +460,839 @@ class TestSimulation:
         assert (simulation._funnel_to_p_value() *
                 1) % 10 >= 1
 
+    def test_warm_start_matches_cold_search(self):
+        number_line = AnalyticNumberLine(0, 2, 1, 5)
+        cold = Simulation(number_line, 1, 1, 3)
+        cold.run()
+        warm = Simulation(number_line, 1, 1, 3, bracket=(1.73, 1.75))
+        warm.run()
+        assert warm.optimal_p_values == pytest.approx(cold.optimal_p_values)
+        assert warm.samples_used < cold.samples_used
+
+    @pytest.mark.parametrize("bracket", [(1.2, 1.25), (1.9, 2.5), (1.0, 1.0)])
+    def test_warm_start_widens_missed_bracket(self, bracket):
+        number_line = AnalyticNumberLine(0, 2, 1, 5)
+        simulation = Simulation(number_line, 1, 1, 3, bracket=bracket)
+        assert simulation._funnel_to_p_value() == pytest.approx(1.741)
+
+    def test_snapped_bracket(self):
+        number_line = AnalyticNumberLine(0, 2, 1, 5)
+        simulation = Simulation(number_line, 1, 1, 3)
+        left_bound, right_bound, level = simulation._snapped_bracket(
+            1.7412, 1.7488)
+        assert level == 3
+        assert (left_bound, right_bound) == pytest.approx((1.741, 1.749))
+        # Brackets past the end are clipped, keeping a neighbour to compare against
+        assert simulation._snapped_bracket(2.1, 2.2) == pytest.approx(
+            (1.999, 2.0, 3))
+
+
+class TestTraversalCurve:
+    def test_exact_parabola(self):
+        positions = np.linspace(1.0, 2.0, 11)
+        curve = TraversalCurve(positions, (positions - 1.33) ** 2 + 1, np.zeros(11), np.ones(11))
+        optimum, standard_error = curve.fit_optimum()
+        assert optimum == pytest.approx(1.33)
+        assert standard_error == 0.0
+
+    def test_noisy_parabola_error(self):
+        rng = np.random.default_rng(2)
+        positions = np.linspace(1.0, 2.0, 21)
+        means = (positions - 1.5) ** 2 + rng.normal(0, 0.001, 21)
+        curve = TraversalCurve(positions, means, np.full(21, 0.1), np.full(21, 1e5))
+        optimum, standard_error = curve.fit_optimum()
+        assert 0 < standard_error < 0.025
+        assert abs(optimum - 1.5) <= 3 * standard_error
+
+    def test_no_fit_without_minimum(self):
+        positions = np.linspace(1.0, 2.0, 11)
+        falling = TraversalCurve(positions, -positions, np.zeros(11), np.ones(11))
+        assert falling.fit_optimum() is None
+        square = TraversalCurve([(1.0, 1.0), (1.1, 1.0), (1.2, 1.0)], [3.0, 2.0, 3.0],
+                                np.zeros(3), np.ones(3))
+        assert square.fit_optimum() is None
+
+
+class TestRunningStats:
+    def test_pooled_estimate(self):
+        assert pooled_estimate([]) is None
+        mean, error = pooled_estimate([(1.0, 0.3), (2.0, 0.4)])
+        assert mean == pytest.approx(1.5)
+        # The errors of independent fits add in quadrature before averaging
+        assert error == pytest.approx(0.25)
+
+    def test_push(self):
+        values = [1.0, 4.0, 2.5, 3.0, 7.5]
+        stats = RunningStats()
+        for value in values:
+            stats.push(value)
+        assert stats.mean == pytest.approx(statistics.mean(values))
+        assert stats.variance() == pytest.approx(statistics.variance(values))
+
+    def test_merge(self):
+        first, second = [1.0, 4.0, 2.5], [3.0, 7.5, 0.5, 2.0]
+        stats = RunningStats()
+        stats.merge(len(first), statistics.mean(first),
+                    statistics.variance(first))
+        stats.merge(len(second), statistics.mean(second),
+                    statistics.variance(second))
+        assert stats.count == 7
+        assert stats.mean == pytest.approx(statistics.mean(first + second))
+        assert stats.variance() == pytest.approx(
+            statistics.variance(first + second))
+
+    def test_empty(self):
+        stats = RunningStats()
+        assert stats.variance() == 0.0
+        assert stats.standard_error() == float('inf')
+
+
+class TestSearch:
+    @pytest.mark.parametrize("search", list(SEARCH_STRATEGIES))
+    def test_finds_analytic_optimum(self, search):
+        number_line = AnalyticNumberLine(0, 2, 1, 5)
+        simulation = Simulation(number_line, 1000, 1, 3, search=search)
+        simulation.run()
+        assert simulation.optimal_p_values[0] == pytest.approx(
+            number_line.optimal_position(), abs=0.002)
+
+    @pytest.mark.parametrize("search", list(SEARCH_STRATEGIES))
+    def test_monte_carlo_search(self, search):
+        number_line = NumberLine(0, 2, 1, 5, seed=1)
+        simulation = Simulation(number_line, 2000, 2, 2, search=search)
+        simulation.run()
+        assert all(1 <= p_val <= 2 for p_val in simulation.optimal_p_values)
+
+    def test_unknown_strategy(self):
+        with pytest.raises(ValueError):
+            create_search_strategy("unknown")
+
+    def test_custom_strategy(self):
+        class FixedSearch:
+            def search(self, simulation):
+                return 1.5
+
+        number_line = NumberLine(0, 2, 1, 3)
+        simulation = Simulation(number_line, 1, 1, 1, search=FixedSearch())
+        simulation.run()
+        assert simulation.optimal_p_values == [1.5]
+
+
+class TestSweepExecutor:
+    def test_run_simulation_for_n(self):
+        distances = run_simulation_for_n(3, 1, 10, 2)
+        assert len(distances) == 2
+
+    def test_serial_layout(self):
+        progress = []
+        executor = SweepExecutor(1, progress.append)
+        superset = executor.run(range(1, 4), 1, 10, 2)
+        assert len(superset) == 3
+        assert all(len(subset) == 2 for subset in superset)
+        assert [p.completed for p in progress] == list(range(1, 7))
+        assert all(p.total == 6 for p in progress)
+        # The fraction grows with the time each n costs, not one unit at a time
+        fractions = [p.fraction for p in progress]
+        assert fractions == sorted(fractions) and fractions[-1] == pytest.approx(1.0)
+        assert fractions[1] < 2 / 6
+        assert progress[-1].eta == pytest.approx(0.0)
+
+    def test_optimal_position_for_n_uses_table(self):
+        position, error = optimal_position_for_n(9)
+        assert position == NumberLine(0, 2, 1, 9).lookup_optimal_position()[0]
+        assert position == pytest.approx(AnalyticNumberLine(0, 2, 1, 9).optimal_position(), abs=1e-14)
+        assert error <= 2 * OPTIMUM_LOOKUP_ERROR + sys.float_info.epsilon
+
+    def test_optimal_position_for_n_falls_back_to_simulation(self):
+        position, error = optimal_position_for_n(4, tolerance=0.0, sig_fig=2, iterations=2000,
+                                                 repetitions=3, seed=5)
+        assert 0.005 <= error < 0.2
+        assert abs(position - AnalyticNumberLine(0, 2, 1, 4).optimal_position()) < 0.2
+        position, error = optimal_position_for_n(3, sig_fig=1, iterations=20, repetitions=1,
+                                                 seed=1, geometry='square')
+        assert len(position) == 2 and error == 0.05
+
+    def test_derive_seed(self):
+        assert derive_seed(None, 1, 2) is None
+        assert derive_seed(5, 1, 2) == derive_seed(5, 1, 2)
+        assert derive_seed(5, 1, 2) != derive_seed(5, 2, 1)
+
+    def test_square_sweep(self):
+        superset = SweepExecutor(1).run(range(1, 3), 1, 20, 2, seed=3, geometry='square',
+                                        common_random_numbers=True)
+        # Distances from the center of the square reach at most its half diagonal
+        assert all(0 <= value <= 2 ** 0.5 for subset in superset for value in subset)
+
+    def test_simulation_options_forwarded(self):
+        superset = SweepExecutor(1).run(
+            range(3, 5), 2, 1, 1, 'analytic', search='golden_section')
+        assert len(superset) == 2
+
+    def test_result_callback(self):
+        results = []
+        executor = SweepExecutor(
+            1, result_callback=lambda idx, repetition, value, estimate: results.append((idx, repetition)))
+        executor.run(range(1, 3), 1, 10, 2)
+        assert sorted(results) == [(0, 0), (0, 1), (1, 0), (1, 1)]
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_sweep_keeps_fitted_estimates(self, workers):
+        executor = SweepExecutor(workers)
+        executor.run(range(3, 5), 2, 1, 2, 'analytic')
+        assert [len(subset) for subset in executor.estimates] == [2, 2]
+        # Exact curves fit within the grid's last figure of the analytic optimum, without error
+        for n_value, estimates in zip((3, 4), executor.estimates):
+            optimum = AnalyticNumberLine(0, 2, 1, n_value).optimal_position() - 1
+            for distance, error in estimates:
+                assert error == 0.0
+                assert distance == pytest.approx(optimum, abs=0.01)
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_cancelled_sweep(self, workers):
+        cancel_event = threading.Event()
+        cancel_event.set()
+        executor = SweepExecutor(workers, cancel_event=cancel_event)
+        superset = executor.run(range(1, 4), 1, 10, 2)
+        assert len(superset) == 3
+        assert all(value is None for subset in superset for value in subset)
+
+    def test_seeded_sweep_independent_of_workers(self):
+        serial = SweepExecutor(1).run(range(3, 5), 2, 500, 2, seed=11)
+        parallel = SweepExecutor(2).run(range(3, 5), 2, 500, 2, seed=11)
+        assert parallel == serial
+
+    def test_warm_start_matches_cold_sweep(self):
+        cold = SweepExecutor(1).run(range(1, 13), 3, 1, 1, 'analytic')
+        warm = SweepExecutor(1).run(
+            range(1, 13), 3, 1, 1, 'analytic', warm_start=True)
+        assert [subset[0] for subset in warm] == pytest.approx(
+            [subset[0] for subset in cold])
+
+    def test_warm_start_bracket(self):
+        assert warm_start_bracket([None], None, 2) is None
+        low, high = warm_start_bracket([0.5, 0.5], [0.4, 0.4], 2)
+        # The bracket follows the drift from the previous n
+        assert low == pytest.approx(1.49)
+        assert high == pytest.approx(1.61)
+
+    def test_parallel_matches_serial(self):
+        serial = SweepExecutor(1).run(range(1, 6), 3, 1, 2, 'analytic')
+        parallel = SweepExecutor(2).run(range(1, 6), 3, 1, 2, 'analytic')
+        assert parallel == serial
+
+    def test_store_resumes_sweep(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "run.jsonl")
+            with ResultStore(path, {'seed': 11}) as store:
+                # A sentinel no real unit could produce marks the unit as skipped
+                store.record(3, 1, -1.0)
+                progress = []
+                superset = SweepExecutor(1, progress.append, store=store).run(
+                    range(3, 5), 2, 10, 2, seed=11)
+            assert superset[0][1] == -1.0
+            assert len(progress) == 4
+            # The resumed unit says nothing about how long units take
+            assert progress[0].eta is None
+            _, completed = read_checkpoint(path)
+            assert len(completed) == 4
+
+    def test_store_resumes_estimates(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "run.jsonl")
+            with ResultStore(path, {'seed': 11}) as store:
+                SweepExecutor(1, store=store).run(range(3, 4), 2, 10, 1, seed=11)
+                estimate = store.estimates[(3, 0)]
+            with ResultStore(path, {'seed': 11}) as store:
+                executor = SweepExecutor(1, store=store)
+                executor.run(range(3, 4), 2, 10, 1, seed=11)
+            assert executor.estimates == [[estimate]]
+
+
+class TestDistributed:
+    def _start_workers(self, coordinator, count):
+        host, port = coordinator.address
+        completed = []
+        threads = [threading.Thread(target=lambda: completed.append(run_worker(host, port, 1)))
+                   for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        return threads, completed
+
+    def test_matches_local_sweep(self):
+        local = SweepExecutor(1).run(range(3, 6), 2, 50, 2, seed=11)
+        coordinator = SweepCoordinator()
+        threads, completed = self._start_workers(coordinator, 3)
+        distributed = SweepExecutor(1, executor=coordinator).run(range(3, 6), 2, 50, 2, seed=11)
+        for thread in threads:
+            thread.join(10)
+        assert distributed == local
+        # Every worker is told the sweep is over and the units were shared out
+        assert sum(completed) == 6 and len(completed) == 3
+
+    def test_lost_worker_units_are_reassigned(self):
+        coordinator = SweepCoordinator()
+        # A worker that takes a unit and dies before answering
+        with socket.create_connection(coordinator.address) as connection:
+            reader, writer = connection.makefile('rb'), connection.makefile('wb')
+            future = coordinator.submit(_run_unit,
+                                        3, 0, 1, 10, 'brute_force', 'line', 1, 7, {})
+            _send(writer, {'type': 'ready'})
+            message = _receive(reader)
+            assert message['type'] == 'unit'
+            # Units travel by parameter name
+            assert message['unit']['n_value'] == 3 and message['unit']['threads'] == 1
+            reader.close()
+            writer.close()
+        threads, completed = self._start_workers(coordinator, 1)
+        # The fitted estimate travels back with the value
+        assert future.result(10)[:2] == _run_unit(3, 0, 1, 10, 'brute_force', 'line', 1, 7, {})[:2]
+        coordinator.shutdown()
+        threads[0].join(10)
+        assert completed == [1]
+
+    def test_unresponsive_worker_times_out(self):
+        local = SweepExecutor(1).run(range(2, 4), 1, 10, 1, seed=5)
+        coordinator = SweepCoordinator(unit_timeout=0.5)
+        with socket.create_connection(coordinator.address) as connection:
+            reader, writer = connection.makefile('rb'), connection.makefile('wb')
+            _send(writer, {'type': 'ready'})
+            threads, _ = self._start_workers(coordinator, 1)
+            superset = SweepExecutor(1, executor=coordinator).run(range(2, 4), 1, 10, 1, seed=5)
+            threads[0].join(10)
+            # The stalled worker's unit was handed out again and its late answer changes nothing
+            assert superset == local
+
+    def test_late_error_from_timed_out_worker_is_ignored(self):
+        coordinator = SweepCoordinator(unit_timeout=0.3)
+        slow = socket.create_connection(coordinator.address)
+        slow_reader, slow_writer = slow.makefile('rb'), slow.makefile('wb')
+        _send(slow_writer, {'type': 'ready'})
+        future = coordinator.submit(_run_unit, 3, 0, 1, 10, 'brute_force', 'line', 1, 7, {})
+        unit_id = _receive(slow_reader)['unit_id']
+        # The unit times out and goes to a second worker, which holds it without answering
+        second = socket.create_connection(coordinator.address)
+        second_reader, second_writer = second.makefile('rb'), second.makefile('wb')
+        _send(second_writer, {'type': 'ready'})
+        assert _receive(second_reader)['unit_id'] == unit_id
+        _send(slow_writer, {'type': 'error', 'unit_id': unit_id, 'message': "too late"})
+        time.sleep(0.2)
+        assert not future.done()
+        # The second worker still holds the unit, so losing it puts the unit back in the queue
+        for stream in (second_reader, second_writer, second, slow_reader, slow_writer, slow):
+            stream.close()
+        threads, _ = self._start_workers(coordinator, 1)
+        assert future.result(10)[0] == run_simulation_for_n(
+            3, 1, 10, 1, seed=derive_seed(7, 3, 0))[0]
+        coordinator.shutdown()
+        threads[0].join(10)
+
+    def test_worker_errors_fail_the_sweep(self):
+        coordinator = SweepCoordinator()
+        threads, _ = self._start_workers(coordinator, 1)
+        with pytest.raises(RuntimeError, match="Worker failed"):
+            SweepExecutor(1, executor=coordinator).run(range(1, 2), 1, 10, 1, 'no_such_engine')
+        threads[0].join(10)
+
+    def test_units_fail_without_workers(self):
+        coordinator = SweepCoordinator(no_worker_timeout=0.2)
+        with pytest.raises(RuntimeError, match="No worker connected"):
+            SweepExecutor(1, executor=coordinator).run(range(2, 4), 1, 10, 1, seed=5)
+        # Shutting down has nothing left to wait for
+        coordinator.shutdown()
+
+    def test_departed_workers_start_the_clock(self):
+        coordinator = SweepCoordinator(no_worker_timeout=0.5)
+        with socket.create_connection(coordinator.address) as connection:
+            reader, writer = connection.makefile('rb'), connection.makefile('wb')
+            _send(writer, {'type': 'ready'})
+            future = coordinator.submit(_run_unit, 3, 0, 1, 10, 'brute_force', 'line', 1, 7, {})
+            assert _receive(reader)['type'] == 'unit'
+            # Held by a connected worker, the unit waits past the timeout
+            time.sleep(1.0)
+            assert not future.done()
+            reader.close()
+            writer.close()
+        assert isinstance(future.exception(10), RuntimeError)
+        coordinator.shutdown()
+
+    def test_rejects_unserialisable_units(self):
+        coordinator = SweepCoordinator()
+        with pytest.raises(ValueError):
+            coordinator.submit(print, 1)
+        with pytest.raises(ValueError):
+            coordinator.submit(_run_unit, 3, 0, 1, 10, 'brute_force', 'line', 1, 7, {'search': object()})
+        with pytest.raises(ValueError):
+            coordinator.submit(_run_unit, 3, 0)
+        coordinator.shutdown()
+
+    def test_cli_with_worker_processes(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            port_holder = socket.socket()
+            port_holder.bind(('127.0.0.1', 0))
+            port = port_holder.getsockname()[1]
+            port_holder.close()
+            workers = [subprocess.Popen([sys.executable, "-m", "distributed", f"127.0.0.1:{port}",
+                                         "--threads", "1"],
+                                        cwd=os.path.dirname(os.path.abspath(__file__)),
+                                        stdout=subprocess.PIPE, text=True)
+                       for _ in range(2)]
+            assert cli.main(["--n-from", "2", "--n-to", "4", "--iterations", "10",
+                             "--repetitions", "2", "--sig-figs", "2", "--seed", "3",
+                             "--coordinate", f"127.0.0.1:{port}", "--output", temp_dir]) == 0
+            outputs = [worker.communicate(timeout=30)[0] for worker in workers]
+            assert all("Worker finished" in output for output in outputs)
+            dataset = import_results(os.path.join(temp_dir, os.listdir(temp_dir)[0]))[1]
+            assert [list(subset) for subset in dataset] == SweepExecutor(1).run(
+                range(2, 5), 2, 10, 2, seed=3)
+
+
+class TestScheduler:
+    def test_unit_cost_grows_with_n(self):
+        assert unit_cost(2, 3, 1000) < unit_cost(20, 3, 1000)
+        assert unit_cost(20, 3, 1000) < unit_cost(20, 4, 1000) < unit_cost(20, 4, 2000)
+        assert unit_cost(2, 3, 1000, 'order_statistics') == unit_cost(20, 3, 1000, 'order_statistics')
+        assert unit_cost(2, 3, 1000, 'analytic') == unit_cost(50, 3, 1, 'analytic')
+        # Exact square draws double with every point, heuristic ones are far cheaper past the limit
+        assert unit_cost(8, 1, 1, geometry='square') > 2 * unit_cost(7, 1, 1, geometry='square')
+        assert unit_cost(9, 1, 1, geometry='square') < unit_cost(8, 1, 1, geometry='square')
+
+    def test_longest_first(self):
+        costs = {(0, 0): 1.0, (0, 1): 1.0, (1, 0): 5.0, (2, 0): 3.0}
+        assert longest_first(list(costs), costs) == [(1, 0), (2, 0), (0, 0), (0, 1)]
+
+    def test_progress_tracker(self):
+        tracker = ProgressTracker({'a': 1.0, 'b': 3.0})
+        tracker.start -= 2.0
+        progress = tracker.finish('a', computed=False)
+        assert progress.fraction == pytest.approx(0.25)
+        assert progress.eta is None
+        progress = tracker.finish('b')
+        assert (progress.completed, progress.total) == (2, 2)
+        assert progress.eta == pytest.approx(0.0)
+
+    def test_eta_extrapolates_computed_cost(self):
+        tracker = ProgressTracker({'a': 1.0, 'b': 3.0})
+        tracker.start -= 2.0
+        # One unit of cost took about two seconds, so three are left to take about six
+        assert tracker.finish('a').eta == pytest.approx(6.0, rel=0.01)
+
+    def test_pool_submits_costliest_first(self):
+        class RecordingExecutor(ThreadPoolExecutor):
+            def __init__(self, max_workers):
+                super().__init__(max_workers)
+                self.submitted = []
+
+            def submit(self, fn, *args):
+                self.submitted.append(args[0])
+                return super().submit(fn, *args)
+
+        executor = RecordingExecutor(1)
+        SweepExecutor(1, executor=executor).run(range(1, 4), 1, 10, 2)
+        assert executor.submitted == [3, 3, 2, 2, 1, 1]
+
+    def test_square_exact_limit_comes_from_the_engine(self):
+        assert square_exact_limit() == create_field(1, geometry='square').get_exact_limit()
+
+    def test_cost_model_follows_timings(self):
+        model = CostModel(3, 1000)
+        assert model.estimate(10) == unit_cost(10, 3, 1000)
+        # One timing scales the prior, a second fits its exponent too
+        model.observe(2, 1.0)
+        assert model.estimate(10) == pytest.approx(unit_cost(10, 3, 1000) / unit_cost(2, 3, 1000))
+        model.observe(12, 2.0)
+        model.observe(12, 4.0)
+        assert model.estimate(12) == 3.0
+        # Doubling the prior's cost tripled the seconds
+        exponent = math.log(3.0) / math.log(2.0)
+        assert model.estimate(32) == pytest.approx(
+            (unit_cost(32, 3, 1000) / unit_cost(2, 3, 1000)) ** exponent)
+
+    def test_cost_model_bounds_the_exponent(self):
+        model = CostModel(3, 1000)
+        model.observe(2, 1.0)
+        model.observe(3, 1000.0)
+        # The fit passes through the timings' geometric mean at the largest exponent allowed
+        costs = [unit_cost(n_value, 3, 1000) for n_value in (2, 3, 30)]
+        assert model.estimate(30) == pytest.approx(
+            math.sqrt(1000.0) * (costs[2] / math.sqrt(costs[0] * costs[1])) ** 2)
+
+    def test_progress_tracker_reprices(self):
+        tracker = ProgressTracker({'a': 1.0, 'b': 3.0})
+        tracker.finish('a')
+        tracker.reprice({'a': 3.0, 'b': 1.0})
+        assert tracker.finish('b').fraction == 1.0
+        assert tracker.computed_cost == 4.0
+
+    def test_resumed_timings_order_units(self):
+        class RecordingExecutor(ThreadPoolExecutor):
+            def __init__(self, max_workers):
+                super().__init__(max_workers)
+                self.submitted = []
+
+            def submit(self, fn, *args):
+                self.submitted.append(args[0])
+                return super().submit(fn, *args)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "run.jsonl")
+            with ResultStore(path, {'seed': 3}) as store:
+                # n=1 took far longer than the prior expects, so its last unit goes first
+                store.record(1, 0, 0.5, seconds=100.0)
+                store.record(2, 0, 0.5, seconds=1.0)
+                executor = RecordingExecutor(1)
+                SweepExecutor(1, store=store, executor=executor).run(range(1, 4), 1, 10, 2, seed=3)
+            assert executor.submitted == [1, 3, 3, 2]
+            with ResultStore(path, {'seed': 3}) as store:
+                assert len(store.seconds) == 6
+
+    def test_format_duration(self):
+        assert format_duration(12.4) == "12s"
+        assert format_duration(200) == "3m 20s"
+        assert format_duration(3900) == "1h 05m"
+
+
+class TestResultCache:
+    def test_round_trip_across_instances(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            key = ResultCache(temp_dir).unit_key(
+                3, 0, 2, 100, 'brute_force', 7, {})
+            ResultCache(temp_dir).put(key, 0.25)
+            assert ResultCache(temp_dir).get(key) == 0.25
+            ResultCache(temp_dir).put(key, 0.25, (0.2, 0.01))
+            assert ResultCache(temp_dir).lookup(key) == (0.25, (0.2, 0.01))
+
+    def test_key_covers_parameters(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache = ResultCache(temp_dir)
+            key = cache.unit_key(3, 0, 2, 100, 'brute_force', 7, {})
+            assert key == cache.unit_key(3, 0, 2, 100, 'brute_force', 7, {})
+            assert key != cache.unit_key(3, 0, 2, 100, 'brute_force', 8, {})
+            assert key != cache.unit_key(
+                3, 0, 2, 100, 'brute_force', 7, {'search': 'golden_section'})
+
+    def test_key_covers_engine_build(self, monkeypatch):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache = ResultCache(temp_dir)
+            key = cache.unit_key(3, 0, 2, 100, 'brute_force', 7, {})
+            monkeypatch.setattr('cache.ENGINE_VERSION', 'rebuilt')
+            assert key != cache.unit_key(3, 0, 2, 100, 'brute_force', 7, {})
+
+    def test_uncacheable_units(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache = ResultCache(temp_dir)
+            assert cache.unit_key(3, 0, 2, 100, 'brute_force', None, {}) is None
+            assert cache.unit_key(3, 0, 2, 100, 'analytic', None, {}) is not None
+            assert cache.unit_key(3, 0, 2, 100, 'brute_force', 7,
+                                  {'search': object()}) is None
+
+    def test_evicts_least_recently_used(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Each entry file takes 14 bytes, leaving room for two
+            cache = ResultCache(temp_dir, max_bytes=30)
+            for key in ('a', 'b', 'c'):
+                cache.put(key, 0.5)
+                assert cache.get('a') == 0.5
+            assert 'a' in cache and 'b' not in cache and 'c' in cache
+            assert len(os.listdir(temp_dir)) == 2
+
+    def test_sweep_only_computes_missing_units(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            first = SweepExecutor(1, cache=ResultCache(temp_dir)).run(
+                range(3, 5), 2, 50, 2, seed=4)
+            overlapping = SweepExecutor(1, cache=ResultCache(temp_dir)).run(
+                range(3, 6), 2, 50, 2, seed=4)
+            assert overlapping[:2] == first
+            assert len(ResultCache(temp_dir)) == 6
+
+
+class TestResults:
+    def test_json_round_trip(self):
+        metadata = {'n_left_bound': 1, 'n_right_bound': 2}
+        dataset = [[0.1, 0.2], [0.3, 0.4]]
+        with tempfile.TemporaryDirectory() as temp_dir:
+            filename = export_json(temp_dir, metadata, dataset)
+            assert import_json(os.path.join(temp_dir, filename)) == (
+                metadata, dataset)
+
+    def test_export_rejects_missing_directory(self):
+        with pytest.raises(ValueError):
+            export_json("./does-not-exist", {}, [])
+        with pytest.raises(ValueError):
+            export_binary("./does-not-exist", {}, [])
+
+    def test_binary_round_trip(self):
+        metadata = {'n_left_bound': 1, 'n_right_bound': 3, 'seed': 2**63}
+        # Cancelled runs leave ragged rows, which come back without their padding
+        dataset = [[0.1, 0.2], [0.3], []]
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, export_binary(
+                temp_dir, metadata, dataset))
+            imported_metadata, imported = import_binary(path)
+            assert isinstance(imported, MappedDataset)
+            assert imported_metadata == metadata
+            assert list(imported) == dataset
+            assert import_results(path)[1][0] == [0.1, 0.2]
+
+    def test_binary_dataset_is_memory_mapped(self):
+        dataset = [[0.5, 0.75], [1.0, 1.25]]
+        with tempfile.TemporaryDirectory() as temp_dir:
+            filename = export_binary(temp_dir, {}, dataset)
+            _, columns = map_binary(os.path.join(temp_dir, filename))
+            assert isinstance(columns['dataset'], np.memmap)
+            assert np.array_equal(columns['dataset'], dataset)
+            assert columns['dataset'].offset % 64 == 0
+            del columns
+
+    def test_binary_rejects_other_files(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, export_json(temp_dir, {}, []))
+            with pytest.raises(ValueError):
+                import_binary(path)
+
+    def test_mapped_dataset_exports_as_json(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, export_binary(
+                temp_dir, {}, [[0.25, 0.5]]))
+            metadata, dataset = import_binary(path)
+            filename = export_json(temp_dir, metadata, dataset)
+            assert import_json(os.path.join(temp_dir, filename))[
+                1] == [[0.25, 0.5]]
+
+    def test_checkpoint_round_trip(self):
+        metadata = {'n_left_bound': 2, 'n_right_bound': 3,
+                    'repetitions': 2, 'seed': 5}
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "run.jsonl")
+            with ResultStore(path, metadata) as store:
+                store.record(2, 0, 0.25)
+                store.record(3, 1, 0.5)
+            assert read_checkpoint(path) == (
+                metadata, {(2, 0): 0.25, (3, 1): 0.5})
+            assert import_checkpoint(path) == (metadata, [[0.25], [0.5]])
+            with ResultStore(path, metadata) as store:
+                assert store.seconds == {}
+                store.record(2, 1, 0.75, seconds=1.5)
+            with ResultStore(path, metadata) as store:
+                assert store.seconds == {(2, 1): 1.5}
+                assert store.estimates == {}
+                store.record(3, 0, 0.5, estimate=(0.45, 0.02))
+            with ResultStore(path, metadata) as store:
+                assert store.estimates == {(3, 0): (0.45, 0.02)}
+
+    def test_checkpoint_import_covers_resumed_units(self):
+        metadata = {'n_left_bound': 2, 'n_right_bound': 3, 'repetitions': 1, 'seed': 5}
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "run.jsonl")
+            with ResultStore(path, metadata) as store:
+                store.record(2, 0, 0.25)
+            # Resumed with a wider sweep, which the header still predates
+            with ResultStore(path, dict(metadata, n_right_bound=4, repetitions=2)) as store:
+                store.record(4, 1, 0.5)
+            imported_metadata, dataset = import_checkpoint(path)
+            assert dataset == [[0.25], [], [0.5]]
+            assert (imported_metadata['n_right_bound'], imported_metadata['repetitions']) == (4, 2)
+
+    def test_checkpoint_skips_truncated_line(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "run.jsonl")
+            with ResultStore(path, {'seed': 5}) as store:
+                store.record(1, 0, 0.25)
+            with open(path, 'a') as f:
+                f.write('{"n": 1, "repeti')
+            with ResultStore(path, {'seed': 5}) as store:
+                assert store.completed == {(1, 0): 0.25}
+
+    def test_checkpoint_rejects_mismatched_run(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "run.jsonl")
+            ResultStore(path, {'seed': 5, 'iterations': 10}).close()
+            with pytest.raises(ValueError):
+                ResultStore(path, {'seed': 6, 'iterations': 10})
+
+
+class TestCli:
+    def test_main_writes_results(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            assert cli.main(["--n-from", "2", "--n-to", "4", "--iterations", "10",
+                             "--repetitions", "2", "--sig-figs", "2", "--seed", "3",
+                             "--output", temp_dir]) == 0
+            exported_files = os.listdir(temp_dir)
+            assert len(exported_files) == 1
+            metadata, dataset = import_results(
+                os.path.join(temp_dir, exported_files[0]))
+            assert metadata['seed'] == 3
+            assert len(dataset) == 3
+
+    def test_checkpoint_resumes_sweep(self):
+        arguments = ["--n-from", "2", "--n-to", "3", "--iterations", "10",
+                     "--repetitions", "2", "--sig-figs", "2"]
+        with tempfile.TemporaryDirectory() as temp_dir:
+            checkpoint = os.path.join(temp_dir, "run.jsonl")
+            output = os.path.join(temp_dir, "exports")
+            cli.main(arguments + ["--checkpoint", checkpoint, "--output", output])
+            with open(checkpoint, 'r') as f:
+                line_count = len(f.readlines())
+            # The rerun picks the seed up from the checkpoint and has no unit left to run
+            cli.main(arguments + ["--checkpoint", checkpoint, "--output", output])
+            with open(checkpoint, 'r') as f:
+                assert len(f.readlines()) == line_count == 5
+            datasets = [list(import_results(os.path.join(output, filename))[1])
+                        for filename in os.listdir(output)]
+            assert datasets[0] == datasets[1]
+
+    def test_rejects_square_control_variate(self):
+        with pytest.raises(SystemExit):
+            cli.main(["--geometry", "square", "--variance-reduction", "control_variate"])
+
+    def test_rejects_inverted_range(self):
+        with pytest.raises(SystemExit):
+            cli.main(["--n-from", "5", "--n-to", "2"])
+
+    def test_does_not_import_gui_modules(self):
+        code = "import sys, cli; print('tkinter' in sys.modules or 'matplotlib' in sys.modules)"
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+        assert output.stdout.strip() == "False"
+
+
+class TestBenchmark:
+    def test_compare_with_baseline(self):
+        baseline = {'fast': {'best': 1.0}, 'slow': {'best': 1.0}, 'retired': {'best': 1.0}}
+        results = {'fast': {'best': 1.1}, 'slow': {'best': 1.5}, 'new': {'best': 9.0}}
+        regressions = benchmark.compare_with_baseline(results, baseline, tolerance=0.15)
+        assert [name for name, *_ in regressions] == ['slow']
+        assert regressions[0][3] == pytest.approx(1.5)
+
+    def test_engines_match_analytic_distribution(self):
+        checks = benchmark.check_distributions(iterations=5000, seed=4)
+        assert len(checks) == 2 * 4 * len(benchmark.DISTRIBUTION_N_VALUES) * \
+            len(benchmark.DISTRIBUTION_POSITIONS)
+        assert all(check['passed'] for check in checks)
+
+    def test_main_writes_results(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output = os.path.join(temp_dir, "first.json")
+            arguments = ["--engines", "analytic", "--quick", "--repeat", "1",
+                         "--skip-distributions"]
+            assert benchmark.main(arguments + ["--output", output]) == 0
+            with open(output, 'r') as f:
+                report = json.load(f)
+            assert set(report['benchmarks']) == {
+                'regenerate_data_x1000/analytic', '_gather/analytic',
+                '_funnel_to_p_value/analytic', 'standard/analytic/workers=1'}
+            # A baseline that could not have been beaten flags every benchmark
+            for timing in report['benchmarks'].values():
+                timing['best'] = 1e-12
+            baseline = os.path.join(temp_dir, "baseline.json")
+            with open(baseline, 'w') as f:
+                json.dump(report, f)
+            assert benchmark.main(arguments + ["--output", output, "--baseline", baseline]) == 1
+
+
+class TestBuildOptimumTable:
+    def test_table_is_current(self):
+        # The shipped table was generated from the same exact optima the analytic engine computes
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "optimum_table.rs")
+            assert build_optimum_table.main(["--output", path]) == 0
+            with open(path, 'r') as f:
+                generated = f.read()
+        with open(build_optimum_table.OUTPUT_PATH, 'r') as f:
+            shipped = f.read()
+        # Platforms may round the last bit of a power differently, within the stated error
+        pattern = re.compile(r'(?:^    |= )([0-9.e+-]+)[,;]$', re.M)
+        shipped_values = [float(value) for value in pattern.findall(shipped)]
+        generated_values = [float(value) for value in pattern.findall(generated)]
+        assert len(shipped_values) == build_optimum_table.TABLE_LENGTH + 3
+        assert shipped_values == pytest.approx(
+            generated_values, abs=build_optimum_table.TABLE_ERROR)
+
+    def test_asymptotic_model_converges(self):
+        for n_value in [64, 256, 4096]:
+            assert build_optimum_table.asymptotic_unit_optimum(n_value) == pytest.approx(
+                build_optimum_table.exact_unit_optimum(n_value), abs=1e-15)
+        assert build_optimum_table.check_points()[-1] == build_optimum_table.CHECK_LIMIT
+
+
+class TestInstrumentation:
+    def test_disabled_spans_record_nothing(self):
+        tracer = instrumentation.Tracer()
+        with tracer.span('idle'):
+            tracer.count('samples_drawn', 10)
+        assert tracer.summary() == {} and tracer.counters == {}
+
+    def test_chrome_trace_of_a_simulation(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "trace.json")
+            instrumentation.enable(path)
+            try:
+                simulation = Simulation(NumberLine(0, 2, 1, 3, seed=1), 20, 1, 2)
+                simulation.run()
+                counters = dict(instrumentation.TRACER.counters)
+                summary = instrumentation.TRACER.summary()
+            finally:
+                instrumentation.disable()
+            with open(path, 'r') as f:
+                events = json.load(f)
+        assert counters['samples_drawn'] == simulation.samples_used
+        assert summary['funnel_level'][0] == 2
+        assert summary['rust.traversal_moments'][0] == 2
+        names = {event['name'] for event in events if event['ph'] == 'X'}
+        assert {'search', 'funnel_level', 'rust.traversal_moments'} <= names
+
+    def test_json_lines_trace(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "trace.jsonl")
+            tracer = instrumentation.Tracer()
+            tracer.enable(path)
+            with tracer.span('outer', level=1):
+                tracer.count('candidates_evaluated', 3)
+            tracer.disable()
+            with open(path, 'r') as f:
+                events = [json.loads(line) for line in f]
+        assert [event['ph'] for event in events] == ['C', 'X']
+        assert events[1]['args'] == {'level': 1}
+
+    def test_json_lines_trace_replaces_earlier_run(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "trace.jsonl")
+            tracer = instrumentation.Tracer()
+            for name in ('first', 'second'):
+                tracer.enable(path)
+                with tracer.span(name):
+                    pass
+                tracer.disable()
+            with open(path, 'r') as f:
+                events = [json.loads(line) for line in f]
+        assert [event['name'] for event in events] == ['second']
+
+    def test_chrome_trace_streams_to_disk(self, monkeypatch):
+        monkeypatch.setattr(instrumentation, 'FLUSH_EVENTS', 5)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "trace.json")
+            tracer = instrumentation.Tracer()
+            tracer.enable(path)
+            for _ in range(12):
+                tracer.count('samples_drawn')
+            assert len(tracer.events) < 5
+            # Written events form an array missing only its closing bracket
+            with open(path, 'r') as f:
+                assert len(json.loads(f.read() + ']')) == 10
+            tracer.disable()
+            with open(path, 'r') as f:
+                events = json.load(f)
+        assert [event['args']['samples_drawn'] for event in events] == list(range(1, 13))
+
+    def test_cli_trace(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "trace.json")
+            cli.main(["--n-from", "2", "--n-to", "3", "--iterations", "10", "--repetitions", "1",
+                      "--sig-figs", "1", "--seed", "1", "--output", temp_dir, "--trace", path])
+            with open(path, 'r') as f:
+                events = json.load(f)
+        assert sum(event['name'] == 'unit' for event in events) == 2
+        assert not instrumentation.TRACER.enabled
+
 
 class TestUserInterface:
     @pytest.fixture
@@ -67,11 +1321,73 @@ class TestUserInterface:
     def test_lock_metadata(self, ui):
         ui._lock_metadata()
         assert 'n_left_bound' in ui.metadata
+        assert isinstance(ui.metadata['seed'], int)
+
+    def test_lock_metadata_keeps_entered_seed(self, ui):
+        ui.seed_var.set("123")
+        ui._lock_metadata()
+        assert ui.metadata['seed'] == 123
 
     def test_run_simulation_with_single_plot(self, ui):
         ui._run_simulation_with_single_plot()
         assert True
 
+    def test_background_run_reports_through_queue(self, ui):
+        ui.n_right_bound.set(2)
+        ui.repetitions_var.set(2)
+        ui.iteration_var.set(10)
+        ui._run_simulation_with_single_plot()
+        ui.worker.join()
+        ui._poll_run_queue()
+        assert [len(subset) for subset in ui.optimal_distance_from_center_superset] == [2, 2]
+        assert not ui._is_run_in_progress()
+
+    def test_only_runs_given_a_seed_are_cached(self, ui):
+        ui.iteration_var.set(10)
+        ui._run_simulation_with_single_plot()
+        ui.worker.join()
+        ui._poll_run_queue()
+        assert ui.cache is None
+        ui.seed_var.set("5")
+        ui._run_simulation_with_single_plot()
+        ui.worker.join()
+        ui._poll_run_queue()
+        assert ui.cache is not None
+
+    def test_cancel_run(self, ui):
+        ui.n_right_bound.set(5)
+        ui._run_simulation_with_single_plot()
+        ui._cancel_run()
+        ui.worker.join()
+        ui._poll_run_queue()
+        assert ui.cancel_event.is_set()
+        assert len(ui.optimal_distance_from_center_superset) == 5
+
+    def test_stats_widgets_are_reused(self, ui):
+        time.sleep(0.1)
+        ui.optimal_distance_from_center_superset = [[1, 2, 3], [4, 5, 6]]
+        ui._calculate_stats_for_superset()
+        labels = ui.stats_rows[0]
+        ui.optimal_distance_from_center_superset = [[1, 2, 4]]
+        ui._calculate_stats_for_superset()
+        assert ui.stats_rows[0] is labels
+        assert len(ui.stats_inner_frame.winfo_children()) == 8
+        assert labels[1]['text'] == f"Mean: {round(7 / 3, 2)}"
+
+    def test_streamed_results_update_stats(self, ui):
+        ui.n_right_bound.set(2)
+        ui.repetitions_var.set(3)
+        ui.iteration_var.set(10)
+        ui._run_simulation_with_single_plot()
+        ui.worker.join()
+        ui._poll_run_queue()
+        assert [stats.count for stats in ui.superset_stats] == [3, 3]
+        assert ui.superset_stats[1].mean == pytest.approx(
+            statistics.mean(ui.optimal_distance_from_center_superset[1]))
+        assert ui.plot.count == 6
+        assert len(ui.superset_estimates) == 2
+        assert ui.stats_rows[1][3]['text'] == ui._fit_text(1)
+
     def test_plot_optimal_distances(self, ui):
         # Do not remove sleep, resolves test errors with tkinter
         time.sleep(0.1)
@@ -110,6 +1426,33 @@ class TestUserInterface:
         assert True
 
 
+class TestOptimaPlot:
+    def test_streamed_points(self):
+        plot = OptimaPlot()
+        plot.reset(range(2, 5))
+        for value in range(600):
+            plot.add(2 + value % 3, [value / 600])
+        plot.refresh([2, 3, 4], [0.4, 0.5, 0.6])
+        offsets = plot._scatter.get_offsets()
+        assert offsets.shape == (600, 2)
+        assert offsets[4].tolist() == [3, 4 / 600]
+        assert plot._means.get_ydata() == [0.4, 0.5, 0.6]
+        assert plot.axes.get_xlim() == (1.5, 4.5)
+
+    def test_buffer_grows_and_figure_is_reused(self):
+        plot = OptimaPlot()
+        plot.reset(range(1, 3))
+        figure = plot.figure
+        plot.add(1, np.linspace(0, 1, 5000))
+        plot.refresh()
+        assert len(plot._scatter.get_offsets()) == 5000
+        plot.reset(range(1, 3))
+        plot.add(2, [0.5])
+        plot.refresh()
+        assert plot.figure is figure
+        assert len(plot._scatter.get_offsets()) == 1
+
+
 class TestProgramTimer:
     def test_start(self):
         timer = ProgramTimer()
@@ -139,6 +1482,23 @@ class TestProgramTimer:
         timer.report_step("Test")
         assert True
 
+    def test_console_report_is_opt_in(self, capsys):
+        ProgramTimer().report_step("Quiet")
+        assert capsys.readouterr().out == ""
+        ProgramTimer([ReportTarget.CONSOLE]).report_step("Loud")
+        assert "Step Loud report" in capsys.readouterr().out
+
+    def test_file_report_keeps_log_open(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "timer.log")
+            timer = ProgramTimer([ReportTarget.FILE], log_path=path)
+            timer.report_step("First")
+            timer.report_step("Second")
+            timer.close()
+            with open(path, 'r') as f:
+                log = f.read()
+        assert "Step First report" in log and "Step Second report" in log
+
 
 class TestProgressBar:
     @pytest.fixture
@@ -154,6 +1514,11 @@ class TestProgressBar:
         progress_bar.increment_progress()
         assert True
 
+    def test_show_sweep_progress(self, progress_bar):
+        progress_bar.update_progress(max_count=10)
+        progress_bar.show_sweep_progress(SweepProgress(2, 10, 0.5, 3.0, 3.0))
+        assert progress_bar.progress_label['text'] == '50% (3s left)'
+
     def test_clear_progress(self, progress_bar):
         progress_bar.clear_progress()
         assert True
@@ -1,20 +1,37 @@
-import json
 import os
-import uuid
-import statistics
+import queue
+import random
+import threading
 import time
 
-import matplotlib.pyplot as plt
-from matplotlib.ticker import MaxNLocator
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 
-from placement_optimization_sim import NumberLine
-from utils import ProgressBar
-from simulation import Simulation
+from instrumentation import span
+from utils import OptimaPlot, ProgressBar
+from stats import RunningStats, pooled_estimate
+from search import SEARCH_STRATEGIES
+from simulation import ENGINES, GEOMETRIES
+from sweep import SweepExecutor, run_simulation_for_n
+from cache import ResultCache
+from results import (EXPORT_FORMATS, BINARY_EXTENSION, ResultStore, import_results,
+                     new_checkpoint_path)
 
 # Inversely affects scroll speed.
 SCROLL_SCALAR = 120
+# How often the Tk thread drains messages from a background run.
+POLL_INTERVAL_MS = 100
+# Minimum time between progress messages sent by a background run.
+PROGRESS_INTERVAL_SECONDS = 0.25
+# Minimum time between redraws of the plot while results stream in.
+PLOT_INTERVAL_SECONDS = 0.5
+# Next to this module rather than in whatever directory the app was started from
+DATA_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+# Every run streams its finished units here, so a crashed sweep can be imported and resumed.
+CHECKPOINT_DIRECTORY = os.path.join(DATA_DIRECTORY, "checkpoints")
+# Units of runs given a seed are cached here, so reruns and overlapping sweeps only compute what is
+# missing.
+CACHE_DIRECTORY = os.path.join(DATA_DIRECTORY, "cache")
 
 
 class UserInterface:
@@ -23,7 +40,23 @@ class UserInterface:
         self.root.title("Simulation Control Panel")
         self.program_timer = program_timer
         self.optimal_distance_from_center_superset = []
+        # Welford accumulators of each n value's results, fed as results stream in
+        self.superset_stats = []
+        # Each n value's fitted (distance, standard_error) estimates, empty for imported results
+        self.superset_estimates = []
+        # (n, mean, stdev, fitted optimum) labels of the statistics table, reused from run to run
+        self.stats_rows = []
+        self.plot = OptimaPlot()
+        self.run_n_values = range(0)
+        self.last_plot_refresh = 0.0
         self.metadata = {}
+        self.worker = None
+        self.run_queue = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.store = None
+        self.cache = None
+        # Set by importing a checkpoint, the next run with matching parameters resumes into it
+        self.resume_checkpoint = None
 
         self.n_left_bound = tk.IntVar(value=1)
         self.n_right_bound = tk.IntVar(value=1)
@@ -32,6 +65,14 @@ class UserInterface:
         self.repetitions_var = tk.IntVar(value=3)
         self.mean_decimal_places = tk.IntVar(value=2)
         self.stdev_decimal_places = tk.IntVar(value=2)
+        self.engine_var = tk.StringVar(value=ENGINES[0])
+        self.geometry_var = tk.StringVar(value=GEOMETRIES[0])
+        self.workers_var = tk.IntVar(value=1)
+        # Left blank, each run draws a fresh seed and records it in the metadata
+        self.seed_var = tk.StringVar(value="")
+        self.search_var = tk.StringVar(value='grid')
+        self.export_format_var = tk.StringVar(value='binary')
+        self.warm_start_var = tk.BooleanVar(value=False)
 
         self._setup_ui()
         self.program_timer.reset_counter("UI Init")
@@ -72,6 +113,18 @@ class UserInterface:
         self._create_label_and_entry(
             "n-values from:", self.n_left_bound, 0, 0, focus=True)
         self._create_label_and_entry("to", self.n_right_bound, 0, 2)
+        self._create_label_and_combobox(
+            "Engine", self.engine_var, ENGINES, 1, 0)
+        self._create_label_and_entry("Workers", self.workers_var, 1, 2)
+        self._create_label_and_combobox(
+            "Geometry", self.geometry_var, GEOMETRIES, 1, 4)
+        self._create_label_and_entry("Seed", self.seed_var, 2, 3)
+        self._create_label_and_combobox(
+            "Search", self.search_var, list(SEARCH_STRATEGIES), 3, 3)
+        ttk.Checkbutton(self.root, text="Warm start", variable=self.warm_start_var).grid(
+            row=0, column=4, padx=10, pady=5)
+        self._create_label_and_combobox(
+            "Export Format", self.export_format_var, list(EXPORT_FORMATS), 4, 3)
         self._create_label_and_entry(
             "Significant Figures", self.sig_fig_var, 2, 0, 10)
         self._create_label_and_entry(
@@ -103,6 +156,10 @@ class UserInterface:
 
         self.progress_bar = ProgressBar(self.root, bar_row=6, label_row=6)
 
+        self.cancel_button = ttk.Button(
+            self.root, text="Cancel", command=self._cancel_run, state="disabled")
+        self.cancel_button.grid(row=6, column=4, padx=10, pady=10)
+
         self.quit_button = ttk.Button(
             self.root, text="Quit", command=self._quit_app)
         self.quit_button.grid(row=5, column=4, padx=10, pady=10)
@@ -123,10 +180,11 @@ class UserInterface:
             int(-1*(event.delta/SCROLL_SCALAR)), "units")
 
     def _on_enter_key(self, event):
-        self._try_run_simulation_with_single_plot()
+        if not self._is_run_in_progress():
+            self._try_run_simulation_with_single_plot()
 
     def _try_export(self):
-        if self.metadata and self.optimal_distance_from_center_superset:
+        if self.metadata and len(self.optimal_distance_from_center_superset) > 0:
             self._export_data("./exports")
         else:
             messagebox.showwarning(
@@ -135,7 +193,8 @@ class UserInterface:
     def _try_import(self):
         file_path = filedialog.askopenfilename(
             title="Select file",
-            filetypes=(("JSON files", "*.json"), ("All files", "*.*"))
+            filetypes=(("Simulation files", f"*.{BINARY_EXTENSION} *.json"),
+                       ("Checkpoints", "*.jsonl"), ("All files", "*.*"))
         )
         if file_path:
             self._import_data(file_path)
@@ -164,49 +223,84 @@ class UserInterface:
         if focus:
             entry.focus_set()
 
+    def _create_label_and_combobox(self, text, variable, values, row, col):
+        label = ttk.Label(self.root, text=text)
+        label.grid(row=row, column=col, padx=10, pady=5)
+        combobox = ttk.Combobox(
+            self.root, textvariable=variable, values=values, state="readonly", width=18)
+        combobox.grid(row=row, column=col + 1, padx=10, pady=5)
+
     def _validate_entry_data(self, err_msg_list=[]) -> list[str]:
         left_bound = self.n_left_bound.get()
         right_bound = self.n_right_bound.get()
         if left_bound > right_bound:
             err_msg_list.append(
                 "n-value error: left bound greater than right bound")
+        seed = self.seed_var.get().strip()
+        if seed and not (seed.isdigit() and int(seed) < 2**64):
+            err_msg_list.append(
+                "seed error: seed must be blank or a non-negative 64-bit integer")
+        if self.geometry_var.get() == 'square':
+            if self.engine_var.get() != 'brute_force':
+                err_msg_list.append(
+                    "geometry error: the square only supports the brute_force engine")
+            if self.warm_start_var.get() or self.search_var.get() == 'golden_section':
+                err_msg_list.append(
+                    "geometry error: warm starts and golden-section search only apply to the line")
 
         return err_msg_list
 
     def _calculate_stats_for_superset(self):
-        if not self.optimal_distance_from_center_superset:
+        if len(self.optimal_distance_from_center_superset) == 0:
             messagebox.showwarning(
                 title="Recalculate Error", message="No dataset available to run calculations on. Run a simulation first.")
             return
-        for idx, subset in enumerate(self.optimal_distance_from_center_superset):
-            left_bound = self.n_left_bound.get()
-            n = left_bound + idx
-            self._calculate_and_display_stats(subset, n, n+2)
-
-    def _calculate_and_display_stats(self, subset, n_value, row_idx):
-
-        mean_decimal_places = self.mean_decimal_places.get()
-        stdev_decimal_places = self.stdev_decimal_places.get()
-
-        # Calculate statistics
-        mean = statistics.mean(subset)
-        stdev = statistics.stdev(subset)
-
-        # Round statistics to user-specified precision
-        mean = round(mean, mean_decimal_places)
-        stdev = round(stdev, stdev_decimal_places)
-
-        # Create labels for each n value
-        n_label = tk.Label(self.stats_inner_frame, text=f"n={n_value} ")
-        n_label.grid(row=row_idx, column=0, padx=10, pady=5)
-
-        mean_label = tk.Label(self.stats_inner_frame,
-                              text=f"Mean: {mean}")
-        mean_label.grid(row=row_idx, column=1, padx=10, pady=5)
-
-        stdev_label = tk.Label(self.stats_inner_frame,
-                               text=f"Std Dev: {stdev}")
-        stdev_label.grid(row=row_idx, column=2, padx=10, pady=5)
+        self._synchronize_stats()
+        for idx in range(len(self.optimal_distance_from_center_superset)):
+            self._display_stats(idx)
+        # Rows left over from a longer sweep are hidden, kept for the next one
+        for row in self.stats_rows[len(self.optimal_distance_from_center_superset):]:
+            for label in row:
+                label.grid_remove()
+
+    def _synchronize_stats(self):
+        # Rebuilds the accumulators of any n value whose results did not stream in, e.g. imports
+        superset = self.optimal_distance_from_center_superset
+        del self.superset_stats[len(superset):]
+        while len(self.superset_stats) < len(superset):
+            self.superset_stats.append(RunningStats())
+        for idx, subset in enumerate(superset):
+            if self.superset_stats[idx].count != len(subset):
+                self.superset_stats[idx] = RunningStats()
+                for value in subset:
+                    self.superset_stats[idx].push(value)
+
+    def _display_stats(self, idx):
+        while len(self.stats_rows) <= idx:
+            self.stats_rows.append(tuple(tk.Label(self.stats_inner_frame) for _ in range(4)))
+        stats = self.superset_stats[idx]
+        # Cancelled runs can leave n values with too few results for a standard deviation
+        if stats.count < 2:
+            for label in self.stats_rows[idx]:
+                label.grid_remove()
+            return
+        n_value = self.n_left_bound.get() + idx
+        mean = round(stats.mean, self.mean_decimal_places.get())
+        stdev = round(stats.stdev(), self.stdev_decimal_places.get())
+        texts = (f"n={n_value} ", f"Mean: {mean}", f"Std Dev: {stdev}", self._fit_text(idx))
+        for column, (label, text) in enumerate(zip(self.stats_rows[idx], texts)):
+            label.config(text=text)
+            label.grid(row=idx + 2, column=column, padx=10, pady=5)
+
+    def _fit_text(self, idx):
+        # The fitted optimum pooled over the repetitions that had one, with its standard error
+        estimates = self.superset_estimates[idx] if idx < len(self.superset_estimates) else []
+        pooled = pooled_estimate(estimates)
+        if pooled is None:
+            return ""
+        mean = round(pooled[0], self.mean_decimal_places.get())
+        error = round(pooled[1], self.stdev_decimal_places.get())
+        return f"Fit: {mean} ± {error}"
 
     def _try_run_simulation_with_single_plot(self):
         err_msg_list = self._validate_entry_data()
@@ -220,65 +314,188 @@ class UserInterface:
                                    f"{err_block}\n\nResolve input errors and press run.")
 
     def _lock_metadata(self):
+        seed = self.seed_var.get().strip()
         self.metadata = {
             'n_left_bound': self.n_left_bound.get(),
             'n_right_bound': self.n_right_bound.get(),
             'sig_fig': self.sig_fig_var.get(),
             'iterations': self.iteration_var.get(),
             'repetitions': self.repetitions_var.get(),
+            'engine': self.engine_var.get(),
+            'geometry': self.geometry_var.get(),
+            'workers': self.workers_var.get(),
+            'seed': int(seed) if seed else random.getrandbits(64),
+            'search': self.search_var.get(),
+            'common_random_numbers': False,
+            'adaptive': False,
+            'variance_reduction': 'none',
+            'warm_start': self.warm_start_var.get(),
             'mean_decimal_places': self.mean_decimal_places.get(),
             'stdev_decimal_places': self.stdev_decimal_places.get(),
             'gmt-timestamp': time.gmtime()
         }
 
     def _run_simulation_with_single_plot(self):
-        self.optimal_distance_from_center_superset = self._run_simulation_across_n_values()
-        self.program_timer.report_step("Simulation Complete")
+        # The sweep runs on a worker thread, reporting back through run_queue, which the Tk
+        # thread drains every POLL_INTERVAL_MS so the window stays responsive
+        if self._is_run_in_progress():
+            return
+        parameters = self._collect_run_parameters()
+        parameters['store'] = self.store = self._open_checkpoint()
+        # A seed drawn for this run alone is never asked for again, so its units would only fill
+        # the cache. Analytic results do not depend on the seed at all.
+        if self.seed_var.get().strip() or parameters['engine'] == 'analytic':
+            if self.cache is None:
+                self.cache = ResultCache(CACHE_DIRECTORY)
+            parameters['cache'] = self.cache
+        total = len(parameters['n_values']) * parameters['repetitions']
+        self.progress_bar.update_progress(max_count=total)
+        self.progress_bar.clear_progress()
+        self.optimal_distance_from_center_superset = [
+            [] for _ in parameters['n_values']]
+        self.superset_stats = [RunningStats() for _ in parameters['n_values']]
+        self.superset_estimates = [[] for _ in parameters['n_values']]
+        self.run_n_values = parameters['n_values']
+        self.plot.reset(self.run_n_values)
+
+        self.run_queue = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.run_button.state(['disabled'])
+        self.cancel_button.state(['!disabled'])
+        self.program_timer.reset_counter("sim sweep")
+
+        self.worker = threading.Thread(
+            target=self._run_in_background, args=(parameters, total), daemon=True)
+        self.worker.start()
+        self.root.after(POLL_INTERVAL_MS, self._poll_run_queue)
+
+    def _open_checkpoint(self):
+        path, self.resume_checkpoint = self.resume_checkpoint, None
+        if path is not None:
+            try:
+                return ResultStore(path, self.metadata)
+            except ValueError as err:
+                messagebox.showwarning(
+                    title="Checkpoint not resumed", message=f"{err}, starting a new checkpoint instead.")
+        return ResultStore(new_checkpoint_path(CHECKPOINT_DIRECTORY), self.metadata)
+
+    def _is_run_in_progress(self):
+        return self.worker is not None and self.worker.is_alive()
+
+    def _run_in_background(self, parameters, total):
+        # Runs on the worker thread, so it must only talk to the Tk thread through run_queue
+        last_report = 0.0
+
+        def on_progress(progress):
+            nonlocal last_report
+            now = time.perf_counter()
+            if progress.completed == total or now - last_report >= PROGRESS_INTERVAL_SECONDS:
+                last_report = now
+                self.run_queue.put(('progress', progress))
+
+        def on_result(idx, repetition, value, estimate):
+            self.run_queue.put(('result', idx, value, estimate))
+
+        try:
+            superset = self._run_simulation_across_n_values(
+                parameters, on_progress, on_result, self.cancel_event)
+        except Exception as err:
+            self.run_queue.put(('error', err))
+            return
+        self.run_queue.put(('done', superset))
+
+    def _poll_run_queue(self):
+        progress = None
+        finished = None
+        updated = set()
+        while finished is None:
+            try:
+                message = self.run_queue.get_nowait()
+            except queue.Empty:
+                break
+            if message[0] == 'result':
+                _, idx, value, estimate = message
+                self.optimal_distance_from_center_superset[idx].append(value)
+                self.superset_stats[idx].push(value)
+                if estimate is not None:
+                    self.superset_estimates[idx].append(estimate)
+                self.plot.add(self.run_n_values[idx], [value])
+                updated.add(idx)
+            elif message[0] == 'progress':
+                progress = message[1]
+            else:
+                finished = message
+
+        # One widget update per poll, however many messages arrived
+        if progress is not None:
+            with span('ui.progress'):
+                self.progress_bar.show_sweep_progress(progress)
+        if updated:
+            for idx in sorted(updated):
+                self._display_stats(idx)
+            now = time.perf_counter()
+            if finished is None and now - self.last_plot_refresh >= PLOT_INTERVAL_SECONDS:
+                self.last_plot_refresh = now
+                with span('ui.plot_refresh', points=self.plot.count):
+                    self._refresh_plot()
+        if finished is not None:
+            self._finish_run(*finished)
+        else:
+            self.root.after(POLL_INTERVAL_MS, self._poll_run_queue)
+
+    def _finish_run(self, status, payload):
+        self.store.close()
+        self.run_button.state(['!disabled'])
+        self.cancel_button.state(['disabled'])
+        if status == 'error':
+            messagebox.showerror(title="Simulation Failed", message=str(payload))
+            return
+
+        # Units of a cancelled run that never ran are left as None
+        self.optimal_distance_from_center_superset = [
+            [value for value in subset if value is not None] for subset in payload]
+        if self.cancel_event.is_set():
+            self.program_timer.report_step("Simulation Cancelled")
+        else:
+            self.program_timer.report_step("Simulation Complete")
         self._plot_optimal_distances()
 
+    def _cancel_run(self):
+        self.cancel_event.set()
+        self.cancel_button.state(['disabled'])
+
     def _plot_optimal_distances(self):
-        fig, ax = plt.subplots()
-        self.left_bound = self.n_left_bound.get()
-        for i, subset in enumerate(self.optimal_distance_from_center_superset):
-            n_value = self.left_bound + i
-            x_values = [n_value] * len(subset)
-            ax.scatter(x_values, subset, label=f'n={n_value}')
-        self._calculate_stats_for_superset()
-
-        ax.set_xlabel('n value')
-        ax.set_ylabel('Optimal distance from center')
-        ax.set_title('Optimal Distances from Center for Different n Values')
-        ax.legend()
-        ax.xaxis.set_major_locator(MaxNLocator(integer=True))
-        plt.show()
+        # Refills the persistent figure from the whole superset, one set_offsets for every point
+        with span('ui.plot', n_values=len(self.optimal_distance_from_center_superset)):
+            self.left_bound = self.n_left_bound.get()
+            superset = self.optimal_distance_from_center_superset
+            self.plot.reset(range(self.left_bound, self.left_bound + max(len(superset), 1)))
+            for i, subset in enumerate(superset):
+                self.plot.add(self.left_bound + i, subset)
+            self._calculate_stats_for_superset()
+            self._refresh_plot()
+
+    def _refresh_plot(self):
+        n_values = [self.n_left_bound.get() + idx for idx, stats in enumerate(self.superset_stats)
+                    if stats.count]
+        means = [stats.mean for stats in self.superset_stats if stats.count]
+        self.plot.refresh(n_values, means)
 
     def _export_data(self, directory: str):
-        # Sanitize and validate the directory path
-        if not os.path.isdir(directory):
-            raise ValueError("Invalid directory path")
-
-        timestamp = time.strftime("%Y-%m-%d_%H%M%S")
-        unique_id = uuid.uuid4()
-        filename = f"simulation__{timestamp}__{unique_id}.json"
-        path = os.path.join(directory, filename)
-
-        data = {
-            'meta': self.metadata,
-            'dataset': self.optimal_distance_from_center_superset
-        }
-        json_data = json.dumps(data, indent=4)
-
-        with open(path, 'x') as f:
-            f.write(json_data)
-            messagebox.showinfo(title="Export completed",
-                                message=f"Exportd as:\n{filename}.")
+        export = EXPORT_FORMATS[self.export_format_var.get()]
+        filename = export(
+            directory, self.metadata, self.optimal_distance_from_center_superset)
+        messagebox.showinfo(title="Export completed",
+                            message=f"Exportd as:\n{filename}.")
 
     def _import_data(self, path: str):
-        with open(path, 'r') as f:
-            data = json.load(f)
-            self.metadata = data.get('meta', {})
-            self.optimal_distance_from_center_superset = data.get(
-                'dataset', [])
+        # Binary archives come back memory-mapped, so rows are read from disk as the plot walks
+        # them rather than copied into lists up front; plotting still reads every row
+        self.metadata, self.optimal_distance_from_center_superset = import_results(
+            path)
+        self.superset_estimates = []
+        if path.endswith(".jsonl"):
+            self.resume_checkpoint = path
 
         self._synchronize_panel_with_metadata()
         self._plot_optimal_distances()
@@ -289,42 +506,57 @@ class UserInterface:
         self.sig_fig_var.set(self.metadata.get('sig_fig', 3))
         self.iteration_var.set(self.metadata.get('iterations', 1000))
         self.repetitions_var.set(self.metadata.get('repetitions', 3))
+        self.engine_var.set(self.metadata.get('engine', ENGINES[0]))
+        self.geometry_var.set(self.metadata.get('geometry', GEOMETRIES[0]))
+        self.workers_var.set(self.metadata.get('workers', 1))
+        self.seed_var.set(self.metadata.get('seed', ""))
+        self.search_var.set(self.metadata.get('search', 'grid'))
+        self.warm_start_var.set(self.metadata.get('warm_start', False))
         self.mean_decimal_places.set(
             self.metadata.get('mean_decimal_places', 2))
         self.stdev_decimal_places.set(
             self.metadata.get('stdev_decimal_places', 2))
 
-    def _run_simulation_across_n_values(self):
-        optimal_distance_from_center_superset = []
-        left_bound = self.n_left_bound.get()
-        right_bound = self.n_right_bound.get() + 1
-
-        repetitions = self.repetitions_var.get()
-        max_progress_count = (right_bound - left_bound) * repetitions
-        self.progress_bar.update_progress(max_count=max_progress_count)
-        self.progress_bar.clear_progress()
-
-        # ! Target for multithreading
-        for n_value in range(left_bound, right_bound):
-            self.program_timer.reset_counter(f"sim n={n_value}")
-            optimal_dist = self._run_simulation_for_n(n_value)
-            optimal_distance_from_center_superset.append(optimal_dist)
-            self.program_timer.report_step(f"sim n={n_value}")
+    def _collect_run_parameters(self):
+        # Read on the Tk thread, as worker threads must never touch Tk variables
+        return {
+            'n_values': range(self.n_left_bound.get(), self.n_right_bound.get() + 1),
+            'sig_fig': self.sig_fig_var.get(),
+            'iterations': self.iteration_var.get(),
+            'repetitions': self.repetitions_var.get(),
+            'engine': self.engine_var.get(),
+            'geometry': self.geometry_var.get(),
+            'workers': self.workers_var.get(),
+            'seed': self.metadata.get('seed'),
+            'search': self.search_var.get(),
+            'warm_start': self.warm_start_var.get(),
+        }
 
-        return optimal_distance_from_center_superset
+    def _run_simulation_across_n_values(self, parameters=None, progress_callback=None, result_callback=None, cancel_event=None):
+        # Without parameters this runs synchronously on the Tk thread, driving the progress bar itself
+        if parameters is None:
+            parameters = self._collect_run_parameters()
+            max_progress_count = len(
+                parameters['n_values']) * parameters['repetitions']
+            self.progress_bar.update_progress(max_count=max_progress_count)
+            self.progress_bar.clear_progress()
+            progress_callback = progress_callback or self.progress_bar.show_sweep_progress
+
+        executor = SweepExecutor(
+            parameters['workers'], progress_callback, result_callback, cancel_event,
+            parameters.get('store'), parameters.get('cache'))
+        return executor.run(
+            parameters['n_values'], parameters['sig_fig'], parameters['iterations'],
+            parameters['repetitions'], parameters['engine'], parameters['seed'],
+            parameters['warm_start'], parameters['geometry'], search=parameters['search'])
 
     def _run_simulation_for_n(self, n_value):
-        sig_fig = self.sig_fig_var.get()
-        iteration_count = self.iteration_var.get()
-        repetitions_count = self.repetitions_var.get()
-        number_line = NumberLine(
-            start=0.0, end=2.0, starting_position=1.0, number_of_points=n_value)
-        simulation = Simulation(
-            number_line, iteration_count, repetitions_count, sig_fig, self.progress_bar.increment_progress)
-        simulation.run()
-        distances_from_center = [abs(x - 1)
-                                 for x in simulation.optimal_p_values]
-        return distances_from_center
+        return run_simulation_for_n(
+            n_value, self.sig_fig_var.get(), self.iteration_var.get(), self.repetitions_var.get(),
+            self.engine_var.get(), self.progress_bar.increment_progress,
+            geometry=self.geometry_var.get(), search=self.search_var.get())
 
     def _quit_app(self):
+        self.cancel_event.set()
+        self.program_timer.close()
         self.root.quit()
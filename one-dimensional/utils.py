@@ -3,67 +3,91 @@ import time
 import tkinter as tk
 from tkinter import ttk
 
+import numpy as np
+
+import instrumentation
+
 
 class ReportTarget(Enum):
     CONSOLE = 0
     FILE = 1
 
 
+# Step timings on perf_counter_ns, each step also landing in the trace as an instant event when
+# instrumentation is enabled. Reports go only to the targets asked for, none by default. The
+# report file is opened once and flushed on close.
 class ProgramTimer:
-    def __init__(self, targets=[ReportTarget.CONSOLE]):
-        self.init_time = time.time()
-        self.counter = time.time()
+    def __init__(self, targets=(), log_path="./timer.log"):
+        self.init_time = time.perf_counter_ns()
+        self.counter = self.init_time
         self.start_time = None
         self.targets = targets
+        self.log_path = log_path
+        self._log_file = None
 
     def start(self):
-        self.start_time = time.time()
+        self.start_time = time.perf_counter_ns()
 
     def get_time_since_start(self):
-        return time.time() - self.start_time
+        return _seconds_since(self.start_time)
 
     def get_time_since_init(self):
-        return time.time() - self.init_time
+        return _seconds_since(self.init_time)
 
     def get_counter_time(self):
-        return time.time() - self.counter
+        return _seconds_since(self.counter)
 
     def reset_counter(self, step=None):
-        print(f"Counter reset on {step}")
-        self.counter = time.time()
+        instrumentation.instant('counter_reset', step=step)
+        if ReportTarget.CONSOLE in self.targets:
+            print(f"Counter reset on {step}")
+        self.counter = time.perf_counter_ns()
 
     def report_step(self, step):
-
-        report = self._generate_report(step)
+        now_time = time.perf_counter_ns()
+        times = {
+            'since_init': _seconds_since(self.init_time, now_time),
+            'since_start': _seconds_since(self.start_time or now_time, now_time),
+            'since_counter': _seconds_since(self.counter, now_time),
+        }
+        instrumentation.instant('step', step=step, **times)
+        report = self._generate_report(step, times)
 
         if ReportTarget.CONSOLE in self.targets:
             self._console_log_report(report)
         if ReportTarget.FILE in self.targets:
             self._file_log_report(report)
 
-    def _generate_report(self, step: str) -> str:
-        now_time = time.time()
-        i_time = now_time - self.init_time
-        s_time = now_time - (self.start_time or now_time)
-        c_time = now_time - self.counter
+    def close(self):
+        if self._log_file is not None:
+            self._log_file.close()
+            self._log_file = None
+
+    def _generate_report(self, step: str, times: dict) -> str:
         report = f"\nStep {step} report:"
-        report += f"\nTime since init: {i_time:.2f}"
-        report += f"\nTime since start: {s_time:.2f}"
-        report += f"\nTime since counter reset: {c_time:.2f}\n"
+        report += f"\nTime since init: {times['since_init']:.2f}"
+        report += f"\nTime since start: {times['since_start']:.2f}"
+        report += f"\nTime since counter reset: {times['since_counter']:.2f}\n"
         return report
 
     def _console_log_report(self, report: str):
         print(report)
 
     def _file_log_report(self, report: str):
-        with open("./timer.log", "a") as f:
-            print(f.write(report))
+        if self._log_file is None:
+            self._log_file = open(self.log_path, "a")
+        self._log_file.write(report)
+
+
+def _seconds_since(start_ns, now_ns=None):
+    return ((now_ns or time.perf_counter_ns()) - start_ns) / 1e9
 
 
 class ProgressBar:
     def __init__(self, master, max_count=100, current_count=0, bar_row=0, label_row=0, bar_col=0, label_col=3):
         self.max_count = max_count
         self.current_count = current_count
+        self.eta = None
         self.master = master
 
         self.progress_bar = ttk.Progressbar(
@@ -93,13 +117,116 @@ class ProgressBar:
         self.current_count += 1
         self._update()
 
+    def show_sweep_progress(self, progress):
+        # Fills by the share of a sweep's estimated time done, rather than of its units, and
+        # shows the time left once there is an estimate
+        self.eta = progress.eta
+        self.current_count = progress.fraction * self.max_count
+        self._update()
+
     def clear_progress(self):
         self.current_count = 0
+        self.eta = None
         self._update()
 
     def _update(self):
         percent = self._get_current_percent()
         self.progress_bar['maximum'] = self.max_count
         self.progress_bar['value'] = self.current_count
-        self.progress_label.config(text=f'{percent}%')
+        text = f'{percent}%'
+        if self.eta is not None and self.current_count < self.max_count:
+            text += f' ({format_duration(self.eta)} left)'
+        self.progress_label.config(text=text)
         self.master.update_idletasks()
+
+
+# The optimal distances of a sweep as one scatter collection, coloured by n, in a figure kept open
+# across runs. Results are appended to a growing buffer and handed to the collection with
+# set_offsets on refresh, so streaming results in redraws the existing artists instead of building
+# a new figure. The running mean of each n is drawn over the points.
+class OptimaPlot:
+    def __init__(self):
+        self.figure = None
+        self.axes = None
+        self.count = 0
+        self._points = np.empty((1024, 2))
+        self._dirty = False
+
+    def is_open(self):
+        # Closing the window drops the figure, the next reset opening a new one
+        import matplotlib.pyplot as plt
+        return self.figure is not None and plt.fignum_exists(self.figure.number)
+
+    def reset(self, n_values):
+        # Clears the points and frames the axes for a sweep over n_values
+        if not self.is_open():
+            self._create_figure()
+        self.count = 0
+        self._dirty = True
+        self._means.set_data([], [])
+        self.axes.set_xlim(n_values[0] - 0.5, n_values[-1] + 0.5)
+        self._scatter.set_clim(n_values[0], max(n_values[-1], n_values[0] + 1))
+        self._low, self._high = np.inf, -np.inf
+
+    def add(self, n_value, values):
+        values = np.asarray(values, dtype=float)
+        if values.size == 0:
+            return
+        end = self.count + values.size
+        if end > len(self._points):
+            # Doubling keeps appends amortised constant
+            grown = np.empty((max(end, 2 * len(self._points)), 2))
+            grown[:self.count] = self._points[:self.count]
+            self._points = grown
+        self._points[self.count:end, 0] = n_value
+        self._points[self.count:end, 1] = values
+        self.count = end
+        self._low = min(self._low, values.min())
+        self._high = max(self._high, values.max())
+        self._dirty = True
+
+    def refresh(self, n_values=None, means=None):
+        # Hands the new points to the figure, redrawing once the Tk loop is idle
+        if not self.is_open():
+            return
+        if means is not None:
+            self._means.set_data(n_values, means)
+        if self._dirty:
+            points = self._points[:self.count]
+            self._scatter.set_offsets(points)
+            self._scatter.set_array(points[:, 0])
+            if self.count:
+                margin = max(self._high - self._low, 1e-3) * 0.05
+                self.axes.set_ylim(self._low - margin, self._high + margin)
+            self._dirty = False
+        self.figure.canvas.draw_idle()
+
+    def _create_figure(self):
+        # Imported on first plot, matplotlib being the slowest import in the program
+        import matplotlib.pyplot as plt
+        from matplotlib.ticker import MaxNLocator
+
+        self.figure, self.axes = plt.subplots()
+        self._scatter = self.axes.scatter(np.empty(0), np.empty(0), c=np.empty(0), s=12,
+                                          cmap='viridis')
+        self._means, = self.axes.plot([], [], color='black', marker='_', markersize=16,
+                                      linestyle='none', label='running mean')
+        self.figure.colorbar(self._scatter, ax=self.axes, label='n value')
+        self.axes.set_xlabel('n value')
+        self.axes.set_ylabel('Optimal distance from center')
+        self.axes.set_title('Optimal Distances from Center for Different n Values')
+        self.axes.legend()
+        self.axes.xaxis.set_major_locator(MaxNLocator(integer=True))
+        self.figure.show()
+
+
+def format_duration(seconds):
+    # 1h 05m, 3m 20s or 12s
+    seconds = int(round(seconds))
+    hours, remainder = divmod(seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    if hours:
+        return f"{hours}h {minutes:02d}m"
+    if minutes:
+        return f"{minutes}m {seconds:02d}s"
+    return f"{seconds}s"
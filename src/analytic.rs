@@ -0,0 +1,258 @@
+use numpy::{IntoPyArray, PyArray1};
+use pyo3::exceptions::PyValueError;
+use pyo3::prelude::*;
+
+use crate::field::upper_half;
+use crate::optimum::tabulated_optimum;
+use crate::sampling::{check_iterations, VarianceReduction};
+
+/// Computes the expected traversal exactly from the joint density of the min and max instead of sampling
+#[pyclass]
+pub struct AnalyticNumberLine {
+    start: f64,
+    end: f64,
+    starting_position: f64,
+    number_of_points: usize,
+    /// Recorded for parity with the sampling engines, there being no variance to reduce
+    variance_reduction: VarianceReduction,
+}
+
+#[pymethods]
+impl AnalyticNumberLine {
+    #[new]
+    fn new(start: f64, end: f64, starting_position: f64, number_of_points: usize) -> PyResult<Self> {
+        if number_of_points == 0 {
+            return Err(PyValueError::new_err("number_of_points must be greater than zero"));
+        }
+        Ok(AnalyticNumberLine {
+            start,
+            end,
+            starting_position,
+            number_of_points,
+            variance_reduction: VarianceReduction::default(),
+        })
+    }
+
+    /// Expected traversal from the current starting position, the limit every sampled value averages towards
+    fn regenerate_data(&self) -> f64 {
+        self.expected_traversal(self.starting_position)
+    }
+
+    /// Exact counterpart of NumberLine.mean_traversal, the iteration count only being validated
+    fn mean_traversal(&self, iterations: usize) -> PyResult<f64> {
+        check_iterations(iterations)?;
+        Ok(self.expected_traversal(self.starting_position))
+    }
+
+    /// Exact counterpart of NumberLine.mean_traversals, the iteration count only being validated
+    fn mean_traversals<'py>(
+        &self,
+        py: Python<'py>,
+        starting_positions: Vec<f64>,
+        iterations: usize,
+    ) -> PyResult<Bound<'py, PyArray1<f64>>> {
+        check_iterations(iterations)?;
+        let expectations: Vec<f64> = starting_positions
+            .iter()
+            .map(|&position| self.expected_traversal(position))
+            .collect();
+        Ok(expectations.into_pyarray_bound(py))
+    }
+
+    /// Exact counterpart of NumberLine.traversal_curve, identical to mean_traversals as there is no sampling noise
+    fn traversal_curve<'py>(
+        &self,
+        py: Python<'py>,
+        starting_positions: Vec<f64>,
+        iterations: usize,
+    ) -> PyResult<Bound<'py, PyArray1<f64>>> {
+        self.mean_traversals(py, starting_positions, iterations)
+    }
+
+    /// Exact counterpart of NumberLine.traversal_moments, every variance being zero
+    #[pyo3(signature = (starting_positions, iterations, shared=true))]
+    fn traversal_moments<'py>(
+        &self,
+        py: Python<'py>,
+        starting_positions: Vec<f64>,
+        iterations: usize,
+        shared: bool,
+    ) -> PyResult<(Bound<'py, PyArray1<f64>>, Bound<'py, PyArray1<f64>>)> {
+        // Nothing is drawn, so shared and independent moments coincide
+        let _ = shared;
+        let variances = vec![0.0; starting_positions.len()];
+        let means = self.mean_traversals(py, starting_positions, iterations)?;
+        Ok((means, variances.into_pyarray_bound(py)))
+    }
+
+    /// Precomputed optimal position in the upper half of the line with a bound on its absolute error, or
+    /// None when no precomputed answer is within tolerance and the optimum has to be simulated. Without a
+    /// tolerance every precomputed answer is accepted, its bound at most OPTIMUM_LOOKUP_ERROR times the length
+    /// plus the rounding of the position.
+    #[pyo3(signature = (tolerance=None))]
+    fn lookup_optimal_position(&self, tolerance: Option<f64>) -> Option<(f64, f64)> {
+        tabulated_optimum(self.start, self.end, self.number_of_points, tolerance.unwrap_or(f64::INFINITY))
+    }
+
+    /// Images of the positions in the upper half of the line, as NumberLine.canonical_positions
+    fn canonical_positions(&self, positions: Vec<f64>) -> Vec<f64> {
+        positions
+            .iter()
+            .map(|&position| upper_half(self.start, self.end, position))
+            .collect()
+    }
+
+    /// Expected traversal distance from the given starting position
+    fn expected_traversal(&self, position: f64) -> f64 {
+        let length = self.end - self.start;
+        expected_unit_traversal((position - self.start) / length, self.number_of_points) * length
+    }
+
+    /// Optimal starting position in the upper half of the line, its mirror image being equally optimal
+    fn optimal_position(&self) -> f64 {
+        let length = self.end - self.start;
+        self.end - optimal_unit_position(self.number_of_points) * length
+    }
+
+    fn set_starting_position(&mut self, new_starting_position: f64) {
+        self.starting_position = new_starting_position;
+    }
+    fn get_starting_position(&self) -> f64 {
+        self.starting_position
+    }
+    fn get_end(&self) -> f64 {
+        self.end
+    }
+    fn get_dimensions(&self) -> usize {
+        1
+    }
+    fn set_variance_reduction(&mut self, variance_reduction: &str) -> PyResult<()> {
+        self.variance_reduction = VarianceReduction::from_name(variance_reduction)?;
+        Ok(())
+    }
+    fn get_variance_reduction(&self) -> &'static str {
+        self.variance_reduction.name()
+    }
+}
+
+/// Expected traversal on the unit interval from position p for n uniform points.
+///
+/// Integrating P(|p - min| > t, |max - p| > t) over t gives, for p <= 1/2 and q = 1 - p,
+/// E[min(|p - min|, |max - p|)] = p + (2p^(n+1) + 2q^(n+1) - 1 - 2^n p^(n+1)) / (n + 1),
+/// to which the expected range (n - 1) / (n + 1) is added. Positions past 1/2 are mirrored.
+fn expected_unit_traversal(p: f64, n: usize) -> f64 {
+    let p = p.clamp(0.0, 1.0);
+    let p = f64::min(p, 1.0 - p);
+    let q = 1.0 - p;
+    let n = n as f64;
+    let nearest_extreme = p
+        + (2.0 * p.powf(n + 1.0) + 2.0 * q.powf(n + 1.0) - 1.0 - (2.0 * p).powf(n + 1.0) / 2.0)
+            / (n + 1.0);
+    let range = (n - 1.0) / (n + 1.0);
+    nearest_extreme + range
+}
+
+/// Derivative of expected_unit_traversal for p <= 1/2: 1 + 2p^n - 2q^n - 2^n p^n
+fn expected_unit_traversal_slope(p: f64, n: usize) -> f64 {
+    let n = n as f64;
+    1.0 + 2.0 * p.powf(n) - 2.0 * (1.0 - p).powf(n) - (2.0 * p).powf(n)
+}
+
+/// Distance of the optimal starting position from the nearest end of the unit interval.
+///
+/// The slope starts at -1 and returns to 0 at the midpoint, so the minimum is either an interior
+/// root where the slope turns positive or the midpoint itself. Roots are bracketed on a grid and
+/// bisected down to machine precision.
+pub fn optimal_unit_position(n: usize) -> f64 {
+    const GRID_CELLS: usize = 256;
+    let mut best_position = 0.5;
+    let mut best_traversal = expected_unit_traversal(0.5, n);
+    for cell in 0..GRID_CELLS {
+        let mut low = 0.5 * cell as f64 / GRID_CELLS as f64;
+        let mut high = 0.5 * (cell + 1) as f64 / GRID_CELLS as f64;
+        if !(expected_unit_traversal_slope(low, n) < 0.0 && expected_unit_traversal_slope(high, n) > 0.0) {
+            continue;
+        }
+        loop {
+            let middle = 0.5 * (low + high);
+            if middle <= low || middle >= high {
+                break;
+            }
+            if expected_unit_traversal_slope(middle, n) < 0.0 {
+                low = middle;
+            } else {
+                high = middle;
+            }
+        }
+        let traversal = expected_unit_traversal(low, n);
+        if traversal < best_traversal {
+            best_position = low;
+            best_traversal = traversal;
+        }
+    }
+    best_position
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    /// Expected traversal by midpoint integration of the joint density n(n-1)(b-a)^(n-2) of the min a and max b
+    fn integrated_unit_traversal(p: f64, n: usize) -> f64 {
+        const STEPS: usize = 800;
+        let step = 1.0 / STEPS as f64;
+        let mut total = 0.0;
+        for i in 0..STEPS {
+            let a = (i as f64 + 0.5) * step;
+            for j in i + 1..STEPS {
+                let b = (j as f64 + 0.5) * step;
+                let density = (n * (n - 1)) as f64 * (b - a).powi(n as i32 - 2);
+                let traversal = f64::min((p - a).abs(), (b - p).abs()) + b - a;
+                total += density * traversal * step * step;
+            }
+        }
+        total
+    }
+
+    #[test]
+    fn expected_traversal_of_one_point() {
+        for p in [0.0, 0.1, 0.3, 0.5, 0.8] {
+            let expected = (p * p + (1.0 - p) * (1.0 - p)) / 2.0;
+            assert!((expected_unit_traversal(p, 1) - expected).abs() < 1e-12);
+        }
+    }
+
+    #[test]
+    fn expected_traversal_matches_integration() {
+        for n in [2, 3, 6] {
+            for p in [0.05, 0.2, 0.45, 0.7] {
+                let integrated = integrated_unit_traversal(p, n);
+                assert!((expected_unit_traversal(p, n) - integrated).abs() < 1e-3, "n={} p={}", n, p);
+            }
+        }
+    }
+
+    #[test]
+    fn slope_matches_finite_differences() {
+        for n in [3, 10, 40] {
+            for p in [0.01, 0.1, 0.3, 0.49] {
+                let h = 1e-6;
+                let difference = (expected_unit_traversal(p + h, n) - expected_unit_traversal(p - h, n)) / (2.0 * h);
+                assert!((expected_unit_traversal_slope(p, n) - difference).abs() < 1e-6);
+            }
+        }
+    }
+
+    #[test]
+    fn optimal_positions() {
+        assert_eq!(optimal_unit_position(1), 0.5);
+        assert_eq!(optimal_unit_position(2), 0.5);
+        assert!((optimal_unit_position(3) - (1.5f64.sqrt() - 1.0)).abs() < 1e-15);
+        for n in [5, 20, 300] {
+            let optimum = optimal_unit_position(n);
+            let h = 1e-4 / n as f64;
+            assert!(expected_unit_traversal(optimum, n) <= expected_unit_traversal(optimum - h, n));
+            assert!(expected_unit_traversal(optimum, n) <= expected_unit_traversal(optimum + h, n));
+        }
+    }
+}
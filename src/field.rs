@@ -0,0 +1,45 @@
+use rand::Rng;
+
+/// A geometry that random point sets are scattered over, scoring the traversal from a starting position.
+///
+/// Everything a traversal needs is drawn into a reusable sample once per point set, so scoring many
+/// starting positions against the same draw only repeats the per-position work.
+pub trait Field: Sync {
+    /// Coordinates of one starting position
+    type Position: Sync;
+    /// Scratch space for one draw, created once per block and refilled for every iteration
+    type Sample;
+
+    fn new_sample(&self) -> Self::Sample;
+
+    /// Draws a fresh point set into the sample
+    fn draw<R: Rng>(&self, rng: &mut R, sample: &mut Self::Sample);
+
+    /// Shortest distance from the position that visits every point of the drawn set
+    fn traversal(&self, sample: &Self::Sample, position: &Self::Position) -> f64;
+
+    /// The position reflected through the centre of the field. Reflecting every drawn point instead
+    /// gives an equally likely draw whose traversal from a position equals this one's from the
+    /// reflected position, so antithetic pairs cost one traversal rather than one draw.
+    fn reflect(&self, position: &Self::Position) -> Self::Position;
+
+    /// A statistic of the draw with a known expectation of zero, correlated with the traversal,
+    /// for fields that have one
+    fn control(&self, _sample: &Self::Sample) -> Option<f64> {
+        None
+    }
+
+    /// The position's image in the field's fundamental region. Positions related by a symmetry of the
+    /// field share an image and every traversal statistic, so a search only needs to score one of them.
+    fn canonical(&self, position: &Self::Position) -> Self::Position;
+}
+
+/// Mirrors a coordinate about the middle of [start, end] onto the upper half, leaving upper ones untouched
+pub fn upper_half(start: f64, end: f64, coordinate: f64) -> f64 {
+    let middle = 0.5 * (start + end);
+    if coordinate >= middle {
+        coordinate
+    } else {
+        2.0 * middle - coordinate
+    }
+}
@@ -0,0 +1,382 @@
+use numpy::{IntoPyArray, PyArray1};
+use pyo3::exceptions::PyValueError;
+use pyo3::prelude::*;
+use rand::Rng;
+
+use crate::field::{upper_half, Field};
+use crate::optimum::tabulated_optimum;
+use crate::sampling::{check_iterations, Sampling, VarianceReduction};
+
+/// Strategy used to draw the extremes of each point set
+#[derive(Clone, Copy, PartialEq)]
+enum Sampler {
+    /// Generates all n points and folds them for the min and max
+    BruteForce,
+    /// Draws the joint min and max of n uniforms directly from their inverse CDFs
+    OrderStatistics,
+}
+
+impl Sampler {
+    fn from_name(name: &str) -> PyResult<Self> {
+        match name {
+            "brute_force" => Ok(Sampler::BruteForce),
+            "order_statistics" => Ok(Sampler::OrderStatistics),
+            _ => Err(PyValueError::new_err(format!("unknown sampler '{}'", name))),
+        }
+    }
+
+    fn name(&self) -> &'static str {
+        match self {
+            Sampler::BruteForce => "brute_force",
+            Sampler::OrderStatistics => "order_statistics",
+        }
+    }
+}
+
+/// The segment [start, end] with n uniform points, whose traversal depends only on their extremes
+struct Segment {
+    start: f64,
+    end: f64,
+    number_of_points: usize,
+    sampler: Sampler,
+}
+
+/// Scratch points for the brute force sampler and the extremes of the latest draw
+struct SegmentSample {
+    points: Vec<f64>,
+    min_point: f64,
+    max_point: f64,
+}
+
+impl Field for Segment {
+    type Position = f64;
+    type Sample = SegmentSample;
+
+    /// The points are left empty when only the extremes are drawn
+    fn new_sample(&self) -> SegmentSample {
+        let points = match self.sampler {
+            Sampler::BruteForce => vec![0.0; self.number_of_points],
+            Sampler::OrderStatistics => Vec::new(),
+        };
+        SegmentSample {
+            points,
+            min_point: 0.0,
+            max_point: 0.0,
+        }
+    }
+
+    fn draw<R: Rng>(&self, rng: &mut R, sample: &mut SegmentSample) {
+        let (min_point, max_point) = self.draw_extremes(rng, &mut sample.points);
+        sample.min_point = min_point;
+        sample.max_point = max_point;
+    }
+
+    fn traversal(&self, sample: &SegmentSample, position: &f64) -> f64 {
+        traversal_from_extremes(sample.min_point, sample.max_point, *position)
+    }
+
+    fn reflect(&self, position: &f64) -> f64 {
+        self.start + self.end - position
+    }
+
+    /// The range of the draw less its expectation (n - 1) / (n + 1) * length
+    fn control(&self, sample: &SegmentSample) -> Option<f64> {
+        let n = self.number_of_points as f64;
+        let expected_range = (n - 1.0) / (n + 1.0) * (self.end - self.start);
+        Some(sample.max_point - sample.min_point - expected_range)
+    }
+
+    /// The segment's mirror symmetry leaves its upper half as the fundamental region
+    fn canonical(&self, position: &f64) -> f64 {
+        upper_half(self.start, self.end, *position)
+    }
+}
+
+impl Segment {
+    /// Draws the min and max of one set of number_of_points uniform points
+    fn draw_extremes<R: Rng>(&self, rng: &mut R, points: &mut [f64]) -> (f64, f64) {
+        match self.sampler {
+            Sampler::BruteForce => {
+                for point in points.iter_mut() {
+                    *point = rng.gen_range(self.start..self.end);
+                }
+                find_extremes(points)
+            }
+            Sampler::OrderStatistics => {
+                let n = self.number_of_points as f64;
+                // The max of n uniforms has CDF x^n, and the remaining n - 1 points are uniform below it
+                let max_fraction = (1.0 - rng.gen::<f64>()).powf(1.0 / n);
+                let min_fraction = if self.number_of_points > 1 {
+                    max_fraction * (1.0 - (1.0 - rng.gen::<f64>()).powf(1.0 / (n - 1.0)))
+                } else {
+                    max_fraction
+                };
+                let length = self.end - self.start;
+                (
+                    self.start + min_fraction * length,
+                    self.start + max_fraction * length,
+                )
+            }
+        }
+    }
+}
+
+#[pyclass]
+pub struct NumberLine {
+    segment: Segment,
+    starting_position: f64,
+    sampling: Sampling,
+}
+
+#[pymethods]
+impl NumberLine {
+    #[new]
+    #[pyo3(signature = (start, end, starting_position, number_of_points, sampler="brute_force", threads=0, seed=None, variance_reduction="none"))]
+    fn new(
+        start: f64,
+        end: f64,
+        starting_position: f64,
+        number_of_points: usize,
+        sampler: &str,
+        threads: usize,
+        seed: Option<u64>,
+        variance_reduction: &str,
+    ) -> PyResult<Self> {
+        let mut sampling = Sampling::new(threads, seed)?;
+        sampling.set_reduction(VarianceReduction::from_name(variance_reduction)?);
+        Ok(NumberLine {
+            segment: Segment {
+                start,
+                end,
+                number_of_points,
+                sampler: Sampler::from_name(sampler)?,
+            },
+            starting_position,
+            sampling,
+        })
+    }
+
+    fn regenerate_data(&self) -> f64 {
+        self.sampling.single(&self.segment, &self.starting_position)
+    }
+
+    /// Averages the traversal distance from the current starting position across a batch of iterations
+    fn mean_traversal(&self, py: Python<'_>, iterations: usize) -> PyResult<f64> {
+        check_iterations(iterations)?;
+        let positions = [self.starting_position];
+        let draw = self.sampling.next_draw();
+        Ok(py.allow_threads(|| {
+            self.sampling
+                .independent_means(&self.segment, &positions, iterations, draw)
+        })[0])
+    }
+
+    /// Averages the traversal distance for each starting position, drawing fresh points per position
+    fn mean_traversals<'py>(
+        &self,
+        py: Python<'py>,
+        starting_positions: Vec<f64>,
+        iterations: usize,
+    ) -> PyResult<Bound<'py, PyArray1<f64>>> {
+        check_iterations(iterations)?;
+        let draw = self.sampling.next_draw();
+        let means = py.allow_threads(|| {
+            self.sampling
+                .independent_means(&self.segment, &starting_positions, iterations, draw)
+        });
+        Ok(means.into_pyarray_bound(py))
+    }
+
+    /// Averages the traversal distance for each starting position, scoring every position against the same point sets
+    fn traversal_curve<'py>(
+        &self,
+        py: Python<'py>,
+        starting_positions: Vec<f64>,
+        iterations: usize,
+    ) -> PyResult<Bound<'py, PyArray1<f64>>> {
+        check_iterations(iterations)?;
+        let draw = self.sampling.next_draw();
+        let means = py.allow_threads(|| {
+            self.sampling
+                .shared_means(&self.segment, &starting_positions, iterations, draw)
+        });
+        Ok(means.into_pyarray_bound(py))
+    }
+
+    /// Mean and sample variance of the traversal for each starting position, drawn on shared point sets unless shared is false
+    #[pyo3(signature = (starting_positions, iterations, shared=true))]
+    fn traversal_moments<'py>(
+        &self,
+        py: Python<'py>,
+        starting_positions: Vec<f64>,
+        iterations: usize,
+        shared: bool,
+    ) -> PyResult<(Bound<'py, PyArray1<f64>>, Bound<'py, PyArray1<f64>>)> {
+        check_iterations(iterations)?;
+        Ok(self
+            .sampling
+            .moment_arrays(py, &self.segment, &starting_positions, iterations, shared))
+    }
+
+    /// Raw over reduced per-draw variance of the traversal from each position, the factor by which the
+    /// set variance reduction cuts the iterations needed for a given precision
+    fn variance_reduction_factors<'py>(
+        &self,
+        py: Python<'py>,
+        starting_positions: Vec<f64>,
+        iterations: usize,
+    ) -> PyResult<Bound<'py, PyArray1<f64>>> {
+        check_iterations(iterations)?;
+        Ok(self
+            .sampling
+            .reduction_factors(py, &self.segment, &starting_positions, iterations))
+    }
+
+    /// Precomputed optimal position in the upper half of the line with a bound on its absolute error, or
+    /// None when no precomputed answer is within tolerance and the optimum has to be simulated. Without a
+    /// tolerance every precomputed answer is accepted, its bound at most OPTIMUM_LOOKUP_ERROR times the length
+    /// plus the rounding of the position.
+    #[pyo3(signature = (tolerance=None))]
+    fn lookup_optimal_position(&self, tolerance: Option<f64>) -> Option<(f64, f64)> {
+        tabulated_optimum(self.segment.start, self.segment.end, self.segment.number_of_points, tolerance.unwrap_or(f64::INFINITY))
+    }
+
+    /// Images of the positions in the upper half of the line, which every search can be confined to
+    fn canonical_positions(&self, positions: Vec<f64>) -> Vec<f64> {
+        positions
+            .iter()
+            .map(|position| self.segment.canonical(position))
+            .collect()
+    }
+
+    fn set_sampler(&mut self, sampler: &str) -> PyResult<()> {
+        self.segment.sampler = Sampler::from_name(sampler)?;
+        Ok(())
+    }
+    fn get_sampler(&self) -> &'static str {
+        self.segment.sampler.name()
+    }
+    /// One of none, antithetic, control_variate or antithetic_control_variate, applied to every batch
+    fn set_variance_reduction(&mut self, variance_reduction: &str) -> PyResult<()> {
+        self.sampling
+            .set_reduction(VarianceReduction::from_name(variance_reduction)?);
+        Ok(())
+    }
+    fn get_variance_reduction(&self) -> &'static str {
+        self.sampling.reduction().name()
+    }
+    fn set_threads(&mut self, threads: usize) -> PyResult<()> {
+        self.sampling.set_threads(threads)
+    }
+    fn get_threads(&self) -> usize {
+        self.sampling.threads()
+    }
+    /// Reseeds the line, so the batches that follow repeat those drawn after any earlier use of the same seed
+    fn set_seed(&mut self, seed: u64) {
+        self.sampling.set_seed(seed);
+    }
+    fn get_seed(&self) -> u64 {
+        self.sampling.seed()
+    }
+    fn set_starting_position(&mut self, new_starting_position: f64) {
+        self.starting_position = new_starting_position;
+    }
+    fn get_starting_position(&self) -> f64 {
+        self.starting_position
+    }
+    fn get_end(&self) -> f64 {
+        self.segment.end
+    }
+    /// Coordinates per position, positions of a line being plain floats
+    fn get_dimensions(&self) -> usize {
+        1
+    }
+}
+
+/// Generates n random points across a range of start to end inclusive and finds optimal traversal path from starting_position
+#[pyfunction]
+fn generate_data(start: f64, end: f64, n: usize, starting_position: f64) -> f64 {
+    let mut rng = rand::thread_rng();
+    let points: Vec<f64> = (0..n).map(|_| rng.gen_range(start..end)).collect();
+    let traversal_distance = find_best_path(&points, starting_position);
+    traversal_distance
+}
+
+/// Finds the best path given a set of points and a starting position.
+fn find_best_path(points: &[f64], starting_position: f64) -> f64 {
+    let (min_point, max_point) = find_extremes(points);
+    traversal_from_extremes(min_point, max_point, starting_position)
+}
+
+/// Finds the min and max points, the only values the traversal depends on
+fn find_extremes(points: &[f64]) -> (f64, f64) {
+    // Use iterators to find the min and max points
+    let min_point = points.iter().cloned().fold(f64::INFINITY, f64::min);
+    let max_point = points.iter().cloned().fold(f64::NEG_INFINITY, f64::max);
+    (min_point, max_point)
+}
+
+/// Visits the nearer extreme first, then sweeps across to the other
+fn traversal_from_extremes(min_point: f64, max_point: f64, starting_position: f64) -> f64 {
+    let left_dist = (starting_position - min_point).abs();
+    let right_dist = (max_point - starting_position).abs();
+
+    let first_traversal = f64::min(left_dist, right_dist);
+    let second_traversal = max_point - min_point;
+
+    first_traversal + second_traversal
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use rand::SeedableRng;
+    use rand_chacha::ChaCha8Rng;
+
+    fn mean_extremes(sampler: Sampler, n: usize, draws: usize) -> (f64, f64) {
+        let segment = Segment { start: 0.0, end: 2.0, number_of_points: n, sampler };
+        let mut sample = segment.new_sample();
+        let mut rng = ChaCha8Rng::seed_from_u64(n as u64);
+        let (mut min_total, mut max_total) = (0.0, 0.0);
+        for _ in 0..draws {
+            segment.draw(&mut rng, &mut sample);
+            assert!(0.0 <= sample.min_point && sample.min_point <= sample.max_point && sample.max_point <= 2.0);
+            min_total += sample.min_point;
+            max_total += sample.max_point;
+        }
+        (min_total / draws as f64, max_total / draws as f64)
+    }
+
+    #[test]
+    fn samplers_agree_on_the_extremes() {
+        // The min and max of n uniforms on [0, 2] average 2 / (n + 1) and 2n / (n + 1)
+        for n in [1, 2, 5, 40] {
+            let expected = (2.0 / (n + 1) as f64, 2.0 * n as f64 / (n + 1) as f64);
+            for sampler in [Sampler::BruteForce, Sampler::OrderStatistics] {
+                let (min_mean, max_mean) = mean_extremes(sampler, n, 200_000);
+                assert!((min_mean - expected.0).abs() < 0.01, "n={} min {}", n, min_mean);
+                assert!((max_mean - expected.1).abs() < 0.01, "n={} max {}", n, max_mean);
+            }
+        }
+    }
+
+    #[test]
+    fn traversal_visits_the_nearer_extreme_first() {
+        assert_eq!(traversal_from_extremes(0.5, 1.5, 1.25), 1.25);
+        assert_eq!(traversal_from_extremes(0.5, 1.5, 0.0), 1.5);
+        assert!((find_best_path(&[1.0, 0.2, 1.9], 1.0) - 2.5).abs() < 1e-12);
+    }
+
+    #[test]
+    fn control_has_zero_mean() {
+        let segment = Segment { start: 0.0, end: 2.0, number_of_points: 4, sampler: Sampler::OrderStatistics };
+        let mut sample = segment.new_sample();
+        let mut rng = ChaCha8Rng::seed_from_u64(9);
+        let mut total = 0.0;
+        for _ in 0..200_000 {
+            segment.draw(&mut rng, &mut sample);
+            total += segment.control(&sample).unwrap();
+        }
+        assert!((total / 200_000.0).abs() < 0.005);
+    }
+}
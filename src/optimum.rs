@@ -0,0 +1,89 @@
+use crate::optimum_table::{ASYMPTOTIC_CHECK_LIMIT, ASYMPTOTIC_ERROR, OPTIMUM_TABLE, TABLE_ERROR};
+
+/// Bound on the absolute error of every precomputed optimum on the unit interval, table and model alike
+pub const LOOKUP_ERROR: f64 = if TABLE_ERROR > ASYMPTOTIC_ERROR { TABLE_ERROR } else { ASYMPTOTIC_ERROR };
+
+/// Distance of the optimal starting position from the nearest end of the unit interval for n points,
+/// with a bound on its absolute error, or None when no precomputed answer is within tolerance. A
+/// tolerance of at least LOOKUP_ERROR accepts every precomputed answer.
+///
+/// Past the table the optimum is the root of 2(1 - p)^n = 1, the other terms of the slope having
+/// vanished, so it comes from p = 1 - 2^(-1/n) up to the largest n the model was checked against.
+pub fn tabulated_unit_optimum(n: usize, tolerance: f64) -> Option<(f64, f64)> {
+    if n == 0 {
+        return None;
+    }
+    let (position, error) = if n <= OPTIMUM_TABLE.len() {
+        (OPTIMUM_TABLE[n - 1], TABLE_ERROR)
+    } else if n <= ASYMPTOTIC_CHECK_LIMIT {
+        (asymptotic_unit_optimum(n), ASYMPTOTIC_ERROR)
+    } else {
+        return None;
+    };
+    (error <= tolerance).then_some((position, error))
+}
+
+/// 1 - 2^(-1/n), without the cancellation of subtracting from 1
+fn asymptotic_unit_optimum(n: usize) -> f64 {
+    -(-std::f64::consts::LN_2 / n as f64).exp_m1()
+}
+
+/// The lookup on the segment [start, end]: the optimal position in its upper half and its error bound,
+/// the tolerance being in the segment's units
+pub fn tabulated_optimum(start: f64, end: f64, n: usize, tolerance: f64) -> Option<(f64, f64)> {
+    let length = end - start;
+    tabulated_unit_optimum(n, tolerance / length).map(|(position, error)| {
+        let position = end - position * length;
+        // Rounding the position onto the segment adds up to half an ulp
+        (position, error * length + 0.5 * f64::EPSILON * position.abs())
+    })
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use crate::analytic::optimal_unit_position;
+
+    #[test]
+    fn table_matches_exact_optima() {
+        for n in 1..=OPTIMUM_TABLE.len() {
+            let (position, error) = tabulated_unit_optimum(n, LOOKUP_ERROR).unwrap();
+            assert!((position - optimal_unit_position(n)).abs() <= error, "n={}", n);
+        }
+    }
+
+    #[test]
+    fn asymptotic_model_matches_exact_optima() {
+        for n in [257, 300, 1000, 12345, 1 << 16, ASYMPTOTIC_CHECK_LIMIT] {
+            let (position, error) = tabulated_unit_optimum(n, LOOKUP_ERROR).unwrap();
+            assert_eq!(error, ASYMPTOTIC_ERROR);
+            assert!((position - optimal_unit_position(n)).abs() <= error, "n={}", n);
+        }
+    }
+
+    #[test]
+    fn lookup_error_bounds_every_answer() {
+        assert!(LOOKUP_ERROR >= TABLE_ERROR && LOOKUP_ERROR >= ASYMPTOTIC_ERROR);
+        for n in [1, 256, 257, ASYMPTOTIC_CHECK_LIMIT] {
+            assert!(tabulated_unit_optimum(n, LOOKUP_ERROR).is_some(), "n={}", n);
+        }
+    }
+
+    #[test]
+    fn lookups_outside_the_table() {
+        assert_eq!(tabulated_unit_optimum(0, 1.0), None);
+        assert_eq!(tabulated_unit_optimum(ASYMPTOTIC_CHECK_LIMIT + 1, 1.0), None);
+        assert_eq!(tabulated_unit_optimum(5, TABLE_ERROR / 2.0), None);
+    }
+
+    #[test]
+    fn lookups_scale_to_the_segment() {
+        let (unit, unit_error) = tabulated_unit_optimum(7, 1.0).unwrap();
+        let (position, error) = tabulated_optimum(0.0, 2.0, 7, 1.0).unwrap();
+        assert_eq!(position, 2.0 - 2.0 * unit);
+        assert!(error >= 2.0 * unit_error);
+        // The tolerance is in the segment's units, twice the unit interval's here
+        assert!(tabulated_optimum(0.0, 2.0, 7, 2.0 * TABLE_ERROR).is_some());
+        assert!(tabulated_optimum(0.0, 2.0, 7, 1.5 * TABLE_ERROR).is_none());
+    }
+}
@@ -0,0 +1,270 @@
+// Generated by one-dimensional/build_optimum_table.py, do not edit by hand
+
+/// Distance of the optimal starting position from the nearest end of the unit interval, for n = 1, 2, ...
+pub const OPTIMUM_TABLE: [f64; 256] = [
+    0.5,
+    0.5,
+    0.22474487139158908,
+    0.16109267731304283,
+    0.1296407938058713,
+    0.10911682139216754,
+    0.09427741498951596,
+    0.08299602234542297,
+    0.07412529125739425,
+    0.06696700863615705,
+    0.06106908934598814,
+    0.056125687318621165,
+    0.051922485660840394,
+    0.04830484698938081,
+    0.04515839608958344,
+    0.042396719301426355,
+    0.03995331314520672,
+    0.03777616310585491,
+    0.03582400205750497,
+    0.03406367107515445,
+    0.03246822147610834,
+    0.031015526098737534,
+    0.029687247250201828,
+    0.02846805884639408,
+    0.02734505258771452,
+    0.026307279302565878,
+    0.02534539087756887,
+    0.02445135794742675,
+    0.023618245281778194,
+    0.022840031565754038,
+    0.022111463664567232,
+    0.02142793791229985,
+    0.02078540275399859,
+    0.02018027839056374,
+    0.01960939006022649,
+    0.019069912331085067,
+    0.01855932234140606,
+    0.018075360354729064,
+    0.017615996328735836,
+    0.017179401454748888,
+    0.016763923826512317,
+    0.016368067555809936,
+    0.015990474778403593,
+    0.015629910094144325,
+    0.015285247065568719,
+    0.01495545646412616,
+    0.01463959600569803,
+    0.014336801359812468,
+    0.014046278251899911,
+    0.013767295506640853,
+    0.013499178904123386,
+    0.013241305740134766,
+    0.012993099998201363,
+    0.01275402805459308,
+    0.012523594848892705,
+    0.012301340462298083,
+    0.012086837053893516,
+    0.011879686111948283,
+    0.011679515983086862,
+    0.011485979647103906,
+    0.011298752709394677,
+    0.01111753158657286,
+    0.010942031863926671,
+    0.010771986806024479,
+    0.010607146004063372,
+    0.010447274145535312,
+    0.010292149893498748,
+    0.010141564864229511,
+    0.00999532269332287,
+    0.009853238181443402,
+    0.009715136511911414,
+    0.009580852533173699,
+    0.00945023009996787,
+    0.009323121467653295,
+    0.009199386734770665,
+    0.009078893329407978,
+    0.008961515535408193,
+    0.008847134054860315,
+    0.008735635603671021,
+    0.008626912537337881,
+    0.00852086250432199,
+    0.008417388124676904,
+    0.008316396691811332,
+    0.008217799895465948,
+    0.008121513564164629,
+    0.008027457425561378,
+    0.007935554883249095,
+    0.00784573280872508,
+    0.007757921347327168,
+    0.007672053737056539,
+    0.007588066139301241,
+    0.007505897480557355,
+    0.007425489304323462,
+    0.007346785632413365,
+    0.00726973283499649,
+    0.0071942795087311375,
+    0.007120376362407754,
+    0.007047976109570474,
+    0.006977033367622509,
+    0.0069075045629641285,
+    0.0068393478417466125,
+    0.0067725229858586755,
+    0.006706991333789658,
+    0.006642715706043078,
+    0.006579660334798343,
+    0.0065177907975409455,
+    0.006457073954401704,
+    0.006397477888966441,
+    0.006338971852333174,
+    0.006281526210211107,
+    0.0062251123928703245,
+    0.006169702847763914,
+    0.006115270994658861,
+    0.006061791183120612,
+    0.006009238652209092,
+    0.005957589492253279,
+    0.005906820608580665,
+    0.005856909687084798,
+    0.005807835161524443,
+    0.005759576182452652,
+    0.005712112587682283,
+    0.005665424874199909,
+    0.00561949417144586,
+    0.005574302215883453,
+    0.005529831326785584,
+    0.005486064383171506,
+    0.005442984801829308,
+    0.005400576516366773,
+    0.005358823957233583,
+    0.005317712032662902,
+    0.0052772261104834794,
+    0.005237352000757533,
+    0.0051980759391977984,
+    0.005159384571326753,
+    0.005121264937337611,
+    0.005083704457621018,
+    0.005046690918925011,
+    0.00501021246111416,
+    0.004974257564499596,
+    0.004938815037710042,
+    0.004903874006078335,
+    0.0048694239005172,
+    0.004835454446860121,
+    0.004801955655646284,
+    0.004768917812326523,
+    0.004736331467870724,
+    0.004704187429758143,
+    0.004672476753331877,
+    0.004641190733500388,
+    0.004610320896770992,
+    0.004579858993598084,
+    0.004549796991033805,
+    0.004520127065665458,
+    0.004490841596828054,
+    0.00446193316007809,
+    0.004433394520919232,
+    0.004405218628765806,
+    0.004377398611135896,
+    0.004349927768062921,
+    0.00432279956671594,
+    0.004296007636220566,
+    0.004269545762670746,
+    0.0042434078843244785,
+    0.004217588086974088,
+    0.004192080599485115,
+    0.004166879789495758,
+    0.004141980159270642,
+    0.00411737634170256,
+    0.004093063096455574,
+    0.004069035306243972,
+    0.004045287973241717,
+    0.004021816215616758,
+    0.003998615264185267,
+    0.003975680459181341,
+    0.0039530072471364855,
+    0.0039305911778662606,
+    0.003908427901558375,
+    0.0038865131659581715,
+    0.0038648428136494606,
+    0.0038434127794247375,
+    0.0038222190877435502,
+    0.0038012578502727985,
+    0.003780525263509415,
+    0.0037600176064792046,
+    0.0037397312385105126,
+    0.0037196625970797315,
+    0.003699808195725407,
+    0.0036801646220293027,
+    0.003660728535660962,
+    0.003641496666484223,
+    0.0036224658127233522,
+    0.0036036328391853556,
+    0.0035849946755386886,
+    0.003566548314644147,
+    0.0035482908109381595,
+    0.0035302192788637106,
+    0.0035123308913508895,
+    0.0034946228783421796,
+    0.0034770925253624907,
+    0.00345973717213216,
+    0.0034425542112208047,
+    0.003425541086741812,
+    0.0034086952930846843,
+    0.003392014373685026,
+    0.0033754959198302736,
+    0.003359137569500292,
+    0.0033429370062410535,
+    0.0033268919580718426,
+    0.0033110001964223312,
+    0.003295259535100958,
+    0.0032796678292927313,
+    0.003264222974584341,
+    0.0032489229060176923,
+    0.0032337655971695356,
+    0.0032187490592566204,
+    0.003203871340265729,
+    0.0031891305241081302,
+    0.003174524729796679,
+    0.003160052110645572,
+    0.003145710853492411,
+    0.0031314991779405887,
+    0.0031174153356225416,
+    0.0031034576094827733,
+    0.0030896243130799634,
+    0.0030759137899078466,
+    0.003062324412733852,
+    0.0030488545829551734,
+    0.003035502729972161,
+    0.003022267310577475,
+    0.003009146808361673,
+    0.0029961397331342288,
+    0.0029832446203590934,
+    0.002970460030604804,
+    0.002957784549009468,
+    0.002945216784758064,
+    0.002932755370574191,
+    0.002920398962224124,
+    0.002908146238033093,
+    0.0028959958984147716,
+    0.0028839466654107526,
+    0.002871997282243577,
+    0.002860146512878747,
+    0.0028483931415990704,
+    0.002836735972589099,
+    0.0028251738295287927,
+    0.0028137055551986086,
+    0.0028023300110930345,
+    0.0027910460770437795,
+    0.002779852650852288,
+    0.0027687486479304746,
+    0.0027577330009510015,
+    0.002746804659504442,
+    0.0027359625897663276,
+    0.0027252057741704023,
+    0.002714533211090553,
+    0.002703943914529827,
+];
+
+/// Bound on the absolute error of every table entry
+pub const TABLE_ERROR: f64 = 2.220446049250313e-16;
+
+/// Bound on the absolute error of 1 - 2^(-1/n) past the table, as measured up to ASYMPTOTIC_CHECK_LIMIT
+pub const ASYMPTOTIC_ERROR: f64 = 2.7777259659078624e-16;
+
+/// Largest n the asymptotic model was checked against, lookups past it falling back to simulating
+pub const ASYMPTOTIC_CHECK_LIMIT: usize = 1048576;
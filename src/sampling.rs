@@ -0,0 +1,436 @@
+use std::sync::atomic::{AtomicU64, Ordering};
+use std::sync::Arc;
+
+use numpy::{IntoPyArray, PyArray1};
+use pyo3::exceptions::PyValueError;
+use pyo3::prelude::*;
+use rand::{Rng, SeedableRng};
+use rand_chacha::ChaCha8Rng;
+use rayon::prelude::*;
+
+use crate::field::Field;
+use crate::stats::{Controlled, Welford};
+
+/// Iterations handled by one parallel task, each task drawing from its own rng substream
+const BLOCK_SIZE: usize = 4096;
+
+/// Substream key for batches where every position shares the same point sets
+const SHARED_STREAM: u64 = u64::MAX;
+
+/// Variance reduction applied to every batch mean and moment, each draw still costing one point set
+#[derive(Clone, Copy, PartialEq, Default)]
+pub struct VarianceReduction {
+    /// Averages the traversal over each draw and its reflection through the centre of the field
+    pub antithetic: bool,
+    /// Regresses out the field's control variate
+    pub control_variate: bool,
+}
+
+impl VarianceReduction {
+    pub fn from_name(name: &str) -> PyResult<Self> {
+        let (antithetic, control_variate) = match name {
+            "none" => (false, false),
+            "antithetic" => (true, false),
+            "control_variate" => (false, true),
+            "antithetic_control_variate" => (true, true),
+            _ => {
+                return Err(PyValueError::new_err(format!(
+                    "unknown variance reduction '{}'",
+                    name
+                )))
+            }
+        };
+        Ok(VarianceReduction {
+            antithetic,
+            control_variate,
+        })
+    }
+
+    pub fn name(&self) -> &'static str {
+        match (self.antithetic, self.control_variate) {
+            (false, false) => "none",
+            (true, false) => "antithetic",
+            (false, true) => "control_variate",
+            (true, true) => "antithetic_control_variate",
+        }
+    }
+
+    pub fn is_active(&self) -> bool {
+        self.antithetic || self.control_variate
+    }
+}
+
+/// Seeded, block-parallel batches of draws over any field, shared by every sampling engine
+pub struct Sampling {
+    /// 0 runs batches on every core, 1 keeps them on the calling thread
+    threads: usize,
+    pool: Option<Arc<rayon::ThreadPool>>,
+    seed: u64,
+    /// Batches drawn since the seed was set, keeping successive batches on distinct substreams
+    draws: AtomicU64,
+    reduction: VarianceReduction,
+}
+
+impl Sampling {
+    pub fn new(threads: usize, seed: Option<u64>) -> PyResult<Self> {
+        Ok(Sampling {
+            threads,
+            pool: build_pool(threads)?,
+            seed: seed.unwrap_or_else(|| rand::thread_rng().gen()),
+            draws: AtomicU64::new(0),
+            reduction: VarianceReduction::default(),
+        })
+    }
+
+    pub fn reduction(&self) -> VarianceReduction {
+        self.reduction
+    }
+
+    pub fn set_reduction(&mut self, reduction: VarianceReduction) {
+        self.reduction = reduction;
+    }
+
+    pub fn threads(&self) -> usize {
+        self.threads
+    }
+
+    pub fn set_threads(&mut self, threads: usize) -> PyResult<()> {
+        self.pool = build_pool(threads)?;
+        self.threads = threads;
+        Ok(())
+    }
+
+    pub fn seed(&self) -> u64 {
+        self.seed
+    }
+
+    /// Reseeds, so the batches that follow repeat those drawn after any earlier use of the same seed
+    pub fn set_seed(&mut self, seed: u64) {
+        self.seed = seed;
+        self.draws.store(0, Ordering::Relaxed);
+    }
+
+    /// Claims the substream index for the next batch
+    pub fn next_draw(&self) -> u64 {
+        self.draws.fetch_add(1, Ordering::Relaxed)
+    }
+
+    /// Traversal of one fresh point set from a single position
+    pub fn single<F: Field>(&self, field: &F, position: &F::Position) -> f64 {
+        let mut rng = self.substream(self.next_draw(), 0, 0);
+        let mut sample = field.new_sample();
+        field.draw(&mut rng, &mut sample);
+        field.traversal(&sample, position)
+    }
+
+    /// Means with every position drawing its own point sets, each (position, block) pair being one task
+    pub fn independent_means<F: Field>(
+        &self,
+        field: &F,
+        positions: &[F::Position],
+        iterations: usize,
+        draw: u64,
+    ) -> Vec<f64> {
+        if self.reduction.is_active() {
+            return means_of(&self.reduced_moments(field, positions, iterations, false, draw));
+        }
+        let blocks = split_into_blocks(iterations);
+        let tasks: Vec<(usize, usize, usize)> = (0..positions.len())
+            .flat_map(|idx| {
+                blocks
+                    .iter()
+                    .enumerate()
+                    .map(move |(block, &count)| (idx, block, count))
+            })
+            .collect();
+        let block_totals = self.map_tasks(&tasks, |&(idx, block, count)| {
+            let mut rng = self.substream(draw, idx as u64, block as u64);
+            sum_block(field, &mut rng, &positions[idx..idx + 1], count)[0]
+        });
+        let mut totals = vec![0.0; positions.len()];
+        for (&(idx, _, _), block_total) in tasks.iter().zip(block_totals) {
+            totals[idx] += block_total;
+        }
+        totals.into_iter().map(|total| total / iterations as f64).collect()
+    }
+
+    /// Means with every position scored against the same point sets, each block being one task
+    pub fn shared_means<F: Field>(
+        &self,
+        field: &F,
+        positions: &[F::Position],
+        iterations: usize,
+        draw: u64,
+    ) -> Vec<f64> {
+        if self.reduction.is_active() {
+            return means_of(&self.reduced_moments(field, positions, iterations, true, draw));
+        }
+        let blocks: Vec<(usize, usize)> = split_into_blocks(iterations).into_iter().enumerate().collect();
+        let block_totals = self.map_tasks(&blocks, |&(block, count)| {
+            let mut rng = self.substream(draw, SHARED_STREAM, block as u64);
+            sum_block(field, &mut rng, positions, count)
+        });
+        let mut totals = vec![0.0; positions.len()];
+        for block_total in block_totals {
+            for (total, value) in totals.iter_mut().zip(block_total) {
+                *total += value;
+            }
+        }
+        totals.into_iter().map(|total| total / iterations as f64).collect()
+    }
+
+    /// Running moments per position, each (position, block) or shared block being one task merged in block order
+    pub fn moments<F: Field>(
+        &self,
+        field: &F,
+        positions: &[F::Position],
+        iterations: usize,
+        shared: bool,
+        draw: u64,
+    ) -> Vec<Welford> {
+        let blocks = split_into_blocks(iterations);
+        let tasks = block_tasks(&blocks, positions.len(), shared);
+        let block_moments = self.map_tasks(&tasks, |&(idx, block, count)| match idx {
+            Some(idx) => {
+                let mut rng = self.substream(draw, idx as u64, block as u64);
+                moments_block(field, &mut rng, &positions[idx..idx + 1], count)
+            }
+            None => {
+                let mut rng = self.substream(draw, SHARED_STREAM, block as u64);
+                moments_block(field, &mut rng, positions, count)
+            }
+        });
+        let mut moments = vec![Welford::default(); positions.len()];
+        for (&(idx, _, _), block_moment) in tasks.iter().zip(block_moments) {
+            match idx {
+                Some(idx) => moments[idx].merge(&block_moment[0]),
+                None => {
+                    for (moment, other) in moments.iter_mut().zip(block_moment.iter()) {
+                        moment.merge(other);
+                    }
+                }
+            }
+        }
+        moments
+    }
+
+    /// Moments of the reduced estimator per position, drawn like moments() from the same substreams
+    pub fn reduced_moments<F: Field>(
+        &self,
+        field: &F,
+        positions: &[F::Position],
+        iterations: usize,
+        shared: bool,
+        draw: u64,
+    ) -> Vec<Controlled> {
+        let blocks = split_into_blocks(iterations);
+        let tasks = block_tasks(&blocks, positions.len(), shared);
+        let reduction = self.reduction;
+        let block_moments = self.map_tasks(&tasks, |&(idx, block, count)| match idx {
+            Some(idx) => {
+                let mut rng = self.substream(draw, idx as u64, block as u64);
+                reduced_block(field, &mut rng, &positions[idx..idx + 1], count, reduction)
+            }
+            None => {
+                let mut rng = self.substream(draw, SHARED_STREAM, block as u64);
+                reduced_block(field, &mut rng, positions, count, reduction)
+            }
+        });
+        let mut moments = vec![Controlled::default(); positions.len()];
+        for (&(idx, _, _), block_moment) in tasks.iter().zip(block_moments) {
+            match idx {
+                Some(idx) => moments[idx].merge(&block_moment[0]),
+                None => {
+                    for (moment, other) in moments.iter_mut().zip(block_moment.iter()) {
+                        moment.merge(other);
+                    }
+                }
+            }
+        }
+        moments
+    }
+
+    /// The (means, per-draw variances) arrays of every traversal_moments, of the reduced estimator
+    /// when a variance reduction is set
+    pub fn moment_arrays<'py, F: Field>(
+        &self,
+        py: Python<'py>,
+        field: &F,
+        positions: &[F::Position],
+        iterations: usize,
+        shared: bool,
+    ) -> Arrays<'py> {
+        let draw = self.next_draw();
+        let (means, variances): (Vec<f64>, Vec<f64>) = if self.reduction.is_active() {
+            let moments = py.allow_threads(|| self.reduced_moments(field, positions, iterations, shared, draw));
+            moments.iter().map(|moment| (moment.mean(), moment.variance())).unzip()
+        } else {
+            let moments = py.allow_threads(|| self.moments(field, positions, iterations, shared, draw));
+            moments.iter().map(|moment| (moment.mean, moment.variance())).unzip()
+        };
+        (means.into_pyarray_bound(py), variances.into_pyarray_bound(py))
+    }
+
+    /// Raw over reduced per-draw variance for each position on shared point sets, 1 without a reduction
+    pub fn reduction_factors<'py, F: Field>(
+        &self,
+        py: Python<'py>,
+        field: &F,
+        positions: &[F::Position],
+        iterations: usize,
+    ) -> Bound<'py, PyArray1<f64>> {
+        let draw = self.next_draw();
+        let moments = py.allow_threads(|| self.reduced_moments(field, positions, iterations, true, draw));
+        let factors: Vec<f64> = moments.iter().map(|moment| moment.reduction_factor()).collect();
+        factors.into_pyarray_bound(py)
+    }
+
+    /// Independent rng for one block of one batch, identified by (draw, position, block) and never by thread.
+    ///
+    /// The seed keys a ChaCha8 generator and the mixed identifiers select its 64-bit stream, so identical
+    /// seeds reproduce every block bit for bit however the blocks are spread across threads.
+    fn substream(&self, draw: u64, position: u64, block: u64) -> ChaCha8Rng {
+        let mut rng = ChaCha8Rng::seed_from_u64(self.seed);
+        rng.set_stream(splitmix64(splitmix64(splitmix64(draw) ^ position) ^ block));
+        rng
+    }
+
+    /// Maps tasks on the configured thread pool, results keeping the order of the tasks
+    fn map_tasks<T, R, F>(&self, tasks: &[T], f: F) -> Vec<R>
+    where
+        T: Sync,
+        R: Send,
+        F: Fn(&T) -> R + Sync + Send,
+    {
+        match &self.pool {
+            _ if self.threads == 1 => tasks.iter().map(f).collect(),
+            Some(pool) => pool.install(|| tasks.par_iter().map(f).collect()),
+            None => tasks.par_iter().map(f).collect(),
+        }
+    }
+}
+
+/// Sums the traversals of count point sets for each position, reusing one sample throughout
+fn sum_block<F: Field, R: Rng>(field: &F, rng: &mut R, positions: &[F::Position], count: usize) -> Vec<f64> {
+    let mut sample = field.new_sample();
+    let mut totals = vec![0.0; positions.len()];
+    for _ in 0..count {
+        field.draw(rng, &mut sample);
+        for (total, position) in totals.iter_mut().zip(positions.iter()) {
+            *total += field.traversal(&sample, position);
+        }
+    }
+    totals
+}
+
+/// Welford accumulation of the traversals of count point sets for each position
+fn moments_block<F: Field, R: Rng>(
+    field: &F,
+    rng: &mut R,
+    positions: &[F::Position],
+    count: usize,
+) -> Vec<Welford> {
+    let mut sample = field.new_sample();
+    let mut moments = vec![Welford::default(); positions.len()];
+    for _ in 0..count {
+        field.draw(rng, &mut sample);
+        for (moment, position) in moments.iter_mut().zip(positions.iter()) {
+            moment.push(field.traversal(&sample, position));
+        }
+    }
+    moments
+}
+
+/// Reduced moments of count point sets for each position, antithetic pairs reflecting the position
+/// rather than redrawing
+fn reduced_block<F: Field, R: Rng>(
+    field: &F,
+    rng: &mut R,
+    positions: &[F::Position],
+    count: usize,
+    reduction: VarianceReduction,
+) -> Vec<Controlled> {
+    let mut sample = field.new_sample();
+    let reflected: Vec<F::Position> = positions.iter().map(|position| field.reflect(position)).collect();
+    let mut moments = vec![Controlled::default(); positions.len()];
+    for _ in 0..count {
+        field.draw(rng, &mut sample);
+        let control = if reduction.control_variate {
+            field.control(&sample).unwrap_or(0.0)
+        } else {
+            0.0
+        };
+        for ((moment, position), mirror) in moments.iter_mut().zip(positions.iter()).zip(reflected.iter()) {
+            let raw = field.traversal(&sample, position);
+            let value = if reduction.antithetic {
+                0.5 * (raw + field.traversal(&sample, mirror))
+            } else {
+                raw
+            };
+            moment.push(raw, value, control);
+        }
+    }
+    moments
+}
+
+/// Block tasks of a batch: one per block when positions share point sets, else one per (position, block)
+fn block_tasks(blocks: &[usize], positions: usize, shared: bool) -> Vec<(Option<usize>, usize, usize)> {
+    if shared {
+        blocks
+            .iter()
+            .enumerate()
+            .map(|(block, &count)| (None, block, count))
+            .collect()
+    } else {
+        (0..positions)
+            .flat_map(|idx| {
+                blocks
+                    .iter()
+                    .enumerate()
+                    .map(move |(block, &count)| (Some(idx), block, count))
+            })
+            .collect()
+    }
+}
+
+fn means_of(moments: &[Controlled]) -> Vec<f64> {
+    moments.iter().map(|moment| moment.mean()).collect()
+}
+
+type Arrays<'py> = (Bound<'py, PyArray1<f64>>, Bound<'py, PyArray1<f64>>);
+
+/// Builds a dedicated pool for an explicit thread count, 0 and 1 needing none
+fn build_pool(threads: usize) -> PyResult<Option<Arc<rayon::ThreadPool>>> {
+    if threads <= 1 {
+        return Ok(None);
+    }
+    rayon::ThreadPoolBuilder::new()
+        .num_threads(threads)
+        .build()
+        .map(|pool| Some(Arc::new(pool)))
+        .map_err(|err| PyValueError::new_err(err.to_string()))
+}
+
+/// SplitMix64 finaliser, scattering neighbouring identifiers across the stream space
+fn splitmix64(value: u64) -> u64 {
+    let mut z = value.wrapping_add(0x9E37_79B9_7F4A_7C15);
+    z = (z ^ (z >> 30)).wrapping_mul(0xBF58_476D_1CE4_E5B9);
+    z = (z ^ (z >> 27)).wrapping_mul(0x94D0_49BB_1331_11EB);
+    z ^ (z >> 31)
+}
+
+/// Splits iterations into BLOCK_SIZE chunks, the last holding the remainder
+fn split_into_blocks(iterations: usize) -> Vec<usize> {
+    let mut blocks = vec![BLOCK_SIZE; iterations / BLOCK_SIZE];
+    if iterations % BLOCK_SIZE > 0 {
+        blocks.push(iterations % BLOCK_SIZE);
+    }
+    blocks
+}
+
+pub fn check_iterations(iterations: usize) -> PyResult<()> {
+    if iterations == 0 {
+        return Err(PyValueError::new_err("iterations must be greater than zero"));
+    }
+    Ok(())
+}
@@ -0,0 +1,486 @@
+use numpy::{IntoPyArray, PyArray1};
+use pyo3::exceptions::PyValueError;
+use pyo3::prelude::*;
+use rand::Rng;
+
+use crate::field::{upper_half, Field};
+use crate::sampling::{check_iterations, Sampling, VarianceReduction};
+
+/// Point counts up to which paths are solved exactly unless told otherwise
+const DEFAULT_EXACT_LIMIT: usize = 8;
+
+/// Largest exact limit accepted, the Held-Karp table of each sample holding 2^n * n lengths
+const MAX_EXACT_LIMIT: usize = 16;
+
+type Point = (f64, f64);
+
+/// The square [start, end]^2 with n uniform points, the traversal from P being the shortest open path
+/// from P through every point
+struct Square {
+    start: f64,
+    end: f64,
+    number_of_points: usize,
+    exact_limit: usize,
+}
+
+/// Points of the latest draw, with the length of the shortest path through all of them from each one.
+///
+/// Whatever the starting position, the best path heads to some point j first and then covers the rest
+/// from there, so the traversal from P is the min over j of |P - p_j| + path_from[j]. The per-draw work
+/// is done once and every position only costs n distances.
+struct SquareSample {
+    points: Vec<Point>,
+    distances: Vec<f64>,
+    path_from: Vec<f64>,
+    /// Held-Karp table for exact draws, indexed by (visited set, last point)
+    table: Vec<f64>,
+    /// Visiting order and visited flags scratch for heuristic draws
+    order: Vec<usize>,
+    visited: Vec<bool>,
+}
+
+impl Field for Square {
+    type Position = Point;
+    type Sample = SquareSample;
+
+    fn new_sample(&self) -> SquareSample {
+        let n = self.number_of_points;
+        let table_size = if self.is_exact() { (1usize << n) * n } else { 0 };
+        SquareSample {
+            points: vec![(0.0, 0.0); n],
+            distances: vec![0.0; n * n],
+            path_from: vec![0.0; n],
+            table: vec![0.0; table_size],
+            order: Vec::with_capacity(n),
+            visited: Vec::with_capacity(n),
+        }
+    }
+
+    fn draw<R: Rng>(&self, rng: &mut R, sample: &mut SquareSample) {
+        let n = self.number_of_points;
+        for point in sample.points.iter_mut() {
+            *point = (
+                rng.gen_range(self.start..self.end),
+                rng.gen_range(self.start..self.end),
+            );
+        }
+        for i in 0..n {
+            for j in 0..n {
+                sample.distances[i * n + j] = distance(sample.points[i], sample.points[j]);
+            }
+        }
+        if self.is_exact() {
+            exact_paths(n, &sample.distances, &mut sample.table, &mut sample.path_from);
+        } else {
+            heuristic_paths(n, &sample.distances, &mut sample.order, &mut sample.visited, &mut sample.path_from);
+        }
+    }
+
+    fn traversal(&self, sample: &SquareSample, position: &Point) -> f64 {
+        if self.number_of_points == 0 {
+            return 0.0;
+        }
+        sample
+            .points
+            .iter()
+            .zip(sample.path_from.iter())
+            .map(|(&point, &rest)| distance(*position, point) + rest)
+            .fold(f64::INFINITY, f64::min)
+    }
+
+    fn reflect(&self, position: &Point) -> Point {
+        let middle = self.start + self.end;
+        (middle - position.0, middle - position.1)
+    }
+
+    /// The square's eight symmetries leave the triangle middle <= y <= x <= end as the fundamental
+    /// region: both coordinates are mirrored onto the upper half, then swapped below the diagonal
+    fn canonical(&self, position: &Point) -> Point {
+        let x = upper_half(self.start, self.end, position.0);
+        let y = upper_half(self.start, self.end, position.1);
+        if y > x {
+            (y, x)
+        } else {
+            (x, y)
+        }
+    }
+}
+
+impl Square {
+    fn is_exact(&self) -> bool {
+        self.number_of_points <= self.exact_limit
+    }
+}
+
+#[pyclass]
+pub struct Square2D {
+    square: Square,
+    starting_position: Point,
+    sampling: Sampling,
+}
+
+#[pymethods]
+impl Square2D {
+    #[new]
+    #[pyo3(signature = (start, end, starting_position, number_of_points, exact_limit=DEFAULT_EXACT_LIMIT, threads=0, seed=None, variance_reduction="none"))]
+    fn new(
+        start: f64,
+        end: f64,
+        starting_position: Point,
+        number_of_points: usize,
+        exact_limit: usize,
+        threads: usize,
+        seed: Option<u64>,
+        variance_reduction: &str,
+    ) -> PyResult<Self> {
+        check_exact_limit(exact_limit)?;
+        let mut sampling = Sampling::new(threads, seed)?;
+        sampling.set_reduction(check_variance_reduction(variance_reduction)?);
+        Ok(Square2D {
+            square: Square {
+                start,
+                end,
+                number_of_points,
+                exact_limit,
+            },
+            starting_position,
+            sampling,
+        })
+    }
+
+    fn regenerate_data(&self) -> f64 {
+        self.sampling.single(&self.square, &self.starting_position)
+    }
+
+    /// Averages the traversal distance from the current starting position across a batch of iterations
+    fn mean_traversal(&self, py: Python<'_>, iterations: usize) -> PyResult<f64> {
+        check_iterations(iterations)?;
+        let positions = [self.starting_position];
+        let draw = self.sampling.next_draw();
+        Ok(py.allow_threads(|| {
+            self.sampling
+                .independent_means(&self.square, &positions, iterations, draw)
+        })[0])
+    }
+
+    /// Averages the traversal distance for each (x, y) starting position, drawing fresh points per position
+    fn mean_traversals<'py>(
+        &self,
+        py: Python<'py>,
+        starting_positions: Vec<Point>,
+        iterations: usize,
+    ) -> PyResult<Bound<'py, PyArray1<f64>>> {
+        check_iterations(iterations)?;
+        let draw = self.sampling.next_draw();
+        let means = py.allow_threads(|| {
+            self.sampling
+                .independent_means(&self.square, &starting_positions, iterations, draw)
+        });
+        Ok(means.into_pyarray_bound(py))
+    }
+
+    /// Averages the traversal distance for each (x, y) starting position against the same point sets,
+    /// the path solving being shared by every position
+    fn traversal_curve<'py>(
+        &self,
+        py: Python<'py>,
+        starting_positions: Vec<Point>,
+        iterations: usize,
+    ) -> PyResult<Bound<'py, PyArray1<f64>>> {
+        check_iterations(iterations)?;
+        let draw = self.sampling.next_draw();
+        let means = py.allow_threads(|| {
+            self.sampling
+                .shared_means(&self.square, &starting_positions, iterations, draw)
+        });
+        Ok(means.into_pyarray_bound(py))
+    }
+
+    /// Mean and sample variance of the traversal for each (x, y) starting position, drawn on shared point sets unless shared is false
+    #[pyo3(signature = (starting_positions, iterations, shared=true))]
+    fn traversal_moments<'py>(
+        &self,
+        py: Python<'py>,
+        starting_positions: Vec<Point>,
+        iterations: usize,
+        shared: bool,
+    ) -> PyResult<(Bound<'py, PyArray1<f64>>, Bound<'py, PyArray1<f64>>)> {
+        check_iterations(iterations)?;
+        Ok(self
+            .sampling
+            .moment_arrays(py, &self.square, &starting_positions, iterations, shared))
+    }
+
+    /// Raw over reduced per-draw variance of the traversal from each position, the factor by which the
+    /// set variance reduction cuts the iterations needed for a given precision
+    fn variance_reduction_factors<'py>(
+        &self,
+        py: Python<'py>,
+        starting_positions: Vec<Point>,
+        iterations: usize,
+    ) -> PyResult<Bound<'py, PyArray1<f64>>> {
+        check_iterations(iterations)?;
+        Ok(self
+            .sampling
+            .reduction_factors(py, &self.square, &starting_positions, iterations))
+    }
+
+    /// Images of the (x, y) positions in the fundamental triangle of the square's symmetries
+    fn canonical_positions(&self, positions: Vec<Point>) -> Vec<Point> {
+        positions
+            .iter()
+            .map(|position| self.square.canonical(position))
+            .collect()
+    }
+
+    /// Point counts up to this are solved exactly, larger ones by nearest neighbour and 2-opt
+    fn set_exact_limit(&mut self, exact_limit: usize) -> PyResult<()> {
+        check_exact_limit(exact_limit)?;
+        self.square.exact_limit = exact_limit;
+        Ok(())
+    }
+    fn get_exact_limit(&self) -> usize {
+        self.square.exact_limit
+    }
+    /// none or antithetic, the square having no control variate
+    fn set_variance_reduction(&mut self, variance_reduction: &str) -> PyResult<()> {
+        self.sampling
+            .set_reduction(check_variance_reduction(variance_reduction)?);
+        Ok(())
+    }
+    fn get_variance_reduction(&self) -> &'static str {
+        self.sampling.reduction().name()
+    }
+    fn set_threads(&mut self, threads: usize) -> PyResult<()> {
+        self.sampling.set_threads(threads)
+    }
+    fn get_threads(&self) -> usize {
+        self.sampling.threads()
+    }
+    /// Reseeds the square, so the batches that follow repeat those drawn after any earlier use of the same seed
+    fn set_seed(&mut self, seed: u64) {
+        self.sampling.set_seed(seed);
+    }
+    fn get_seed(&self) -> u64 {
+        self.sampling.seed()
+    }
+    fn set_starting_position(&mut self, new_starting_position: Point) {
+        self.starting_position = new_starting_position;
+    }
+    fn get_starting_position(&self) -> Point {
+        self.starting_position
+    }
+    /// Far bound of both axes
+    fn get_end(&self) -> f64 {
+        self.square.end
+    }
+    /// Coordinates per position, positions of a square being (x, y) tuples
+    fn get_dimensions(&self) -> usize {
+        2
+    }
+}
+
+fn check_exact_limit(exact_limit: usize) -> PyResult<()> {
+    if exact_limit > MAX_EXACT_LIMIT {
+        return Err(PyValueError::new_err(format!(
+            "exact_limit must not exceed {}",
+            MAX_EXACT_LIMIT
+        )));
+    }
+    Ok(())
+}
+
+fn check_variance_reduction(name: &str) -> PyResult<VarianceReduction> {
+    let reduction = VarianceReduction::from_name(name)?;
+    if reduction.control_variate {
+        return Err(PyValueError::new_err("the square has no control variate"));
+    }
+    Ok(reduction)
+}
+
+fn distance(a: Point, b: Point) -> f64 {
+    (a.0 - b.0).hypot(a.1 - b.1)
+}
+
+/// Shortest path through every point ending at each point, by Held-Karp over the visited subsets.
+///
+/// Paths read the same in reverse, so the shortest path ending at j is also the shortest starting there.
+fn exact_paths(n: usize, distances: &[f64], table: &mut [f64], path_from: &mut [f64]) {
+    if n == 0 {
+        return;
+    }
+    let full = (1usize << n) - 1;
+    table.fill(f64::INFINITY);
+    for last in 0..n {
+        table[(1 << last) * n + last] = 0.0;
+    }
+    // Every extension sets a new bit, so sets are complete before anything is extended from them
+    for set in 1..full {
+        for last in 0..n {
+            let length = table[set * n + last];
+            if set & (1 << last) == 0 || !length.is_finite() {
+                continue;
+            }
+            let mut remaining = full & !set;
+            while remaining != 0 {
+                let next = remaining.trailing_zeros() as usize;
+                remaining &= remaining - 1;
+                let extended = (set | (1 << next)) * n + next;
+                let candidate = length + distances[last * n + next];
+                if candidate < table[extended] {
+                    table[extended] = candidate;
+                }
+            }
+        }
+    }
+    path_from.copy_from_slice(&table[full * n..(full + 1) * n]);
+}
+
+/// Nearest neighbour path from each point, shortened by 2-opt moves that keep its first point fixed
+fn heuristic_paths(
+    n: usize,
+    distances: &[f64],
+    order: &mut Vec<usize>,
+    visited: &mut Vec<bool>,
+    path_from: &mut [f64],
+) {
+    visited.resize(n, false);
+    for first in 0..n {
+        order.clear();
+        order.push(first);
+        visited.fill(false);
+        visited[first] = true;
+        for _ in 1..n {
+            let last = order[order.len() - 1];
+            let next = (0..n)
+                .filter(|&idx| !visited[idx])
+                .min_by(|&a, &b| distances[last * n + a].total_cmp(&distances[last * n + b]))
+                .unwrap();
+            visited[next] = true;
+            order.push(next);
+        }
+        two_opt(n, distances, order);
+        path_from[first] = order
+            .windows(2)
+            .map(|pair| distances[pair[0] * n + pair[1]])
+            .sum();
+    }
+}
+
+/// Reverses any stretch of an open path that shortens it, until no such stretch is left
+fn two_opt(n: usize, distances: &[f64], order: &mut [usize]) {
+    let length = order.len();
+    let mut improved = true;
+    while improved {
+        improved = false;
+        for i in 1..length.saturating_sub(1) {
+            for k in i + 1..length {
+                // Reversing order[i..=k] swaps the edges into and out of it, an open end costing nothing
+                let (before, first, last) = (order[i - 1], order[i], order[k]);
+                let (removed_tail, added_tail) = match order.get(k + 1) {
+                    Some(&after) => (distances[last * n + after], distances[first * n + after]),
+                    None => (0.0, 0.0),
+                };
+                let removed = distances[before * n + first] + removed_tail;
+                let added = distances[before * n + last] + added_tail;
+                if added < removed - 1e-12 {
+                    order[i..=k].reverse();
+                    improved = true;
+                }
+            }
+        }
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use rand::SeedableRng;
+    use rand_chacha::ChaCha8Rng;
+
+    fn random_distances(rng: &mut ChaCha8Rng, n: usize) -> Vec<f64> {
+        let points: Vec<Point> = (0..n).map(|_| (rng.gen::<f64>(), rng.gen::<f64>())).collect();
+        let mut distances = vec![0.0; n * n];
+        for i in 0..n {
+            for j in 0..n {
+                distances[i * n + j] = distance(points[i], points[j]);
+            }
+        }
+        distances
+    }
+
+    fn path_length(n: usize, distances: &[f64], order: &[usize]) -> f64 {
+        order.windows(2).map(|pair| distances[pair[0] * n + pair[1]]).sum()
+    }
+
+    /// Shortest path from each point by trying every order of the others
+    fn brute_force_paths(n: usize, distances: &[f64]) -> Vec<f64> {
+        fn shortest(n: usize, distances: &[f64], order: &mut Vec<usize>, left: &mut Vec<usize>) -> f64 {
+            if left.is_empty() {
+                return path_length(n, distances, order);
+            }
+            let mut best = f64::INFINITY;
+            for idx in 0..left.len() {
+                let next = left.remove(idx);
+                order.push(next);
+                best = best.min(shortest(n, distances, order, left));
+                order.pop();
+                left.insert(idx, next);
+            }
+            best
+        }
+        (0..n)
+            .map(|first| {
+                let mut left: Vec<usize> = (0..n).filter(|&idx| idx != first).collect();
+                shortest(n, distances, &mut vec![first], &mut left)
+            })
+            .collect()
+    }
+
+    #[test]
+    fn exact_paths_match_brute_force() {
+        let mut rng = ChaCha8Rng::seed_from_u64(1);
+        for n in 1..=7 {
+            let distances = random_distances(&mut rng, n);
+            let mut table = vec![0.0; (1 << n) * n];
+            let mut path_from = vec![0.0; n];
+            exact_paths(n, &distances, &mut table, &mut path_from);
+            for (exact, expected) in path_from.iter().zip(brute_force_paths(n, &distances)) {
+                assert!((exact - expected).abs() < 1e-12, "n={} {} vs {}", n, exact, expected);
+            }
+        }
+    }
+
+    #[test]
+    fn two_opt_uncrosses_a_path() {
+        // Corners of the unit square visited 0 -> 2 -> 1 -> 3 cross in the middle
+        let corners = [(0.0, 0.0), (1.0, 0.0), (0.0, 1.0), (1.0, 1.0)];
+        let mut distances = vec![0.0; 16];
+        for i in 0..4 {
+            for j in 0..4 {
+                distances[i * 4 + j] = distance(corners[i], corners[j]);
+            }
+        }
+        let mut order = vec![0, 3, 1, 2];
+        two_opt(4, &distances, &mut order);
+        assert_eq!(order[0], 0);
+        assert!((path_length(4, &distances, &order) - 3.0).abs() < 1e-12);
+    }
+
+    #[test]
+    fn heuristic_paths_bound_the_exact_ones() {
+        let mut rng = ChaCha8Rng::seed_from_u64(2);
+        for n in [2, 5, 8] {
+            let distances = random_distances(&mut rng, n);
+            let mut table = vec![0.0; (1 << n) * n];
+            let mut exact = vec![0.0; n];
+            exact_paths(n, &distances, &mut table, &mut exact);
+            let mut heuristic = vec![0.0; n];
+            heuristic_paths(n, &distances, &mut Vec::new(), &mut Vec::new(), &mut heuristic);
+            for (h, e) in heuristic.iter().zip(exact.iter()) {
+                // Never shorter than optimal, and 2-opt keeps small sets close to it
+                assert!(*h >= e - 1e-12 && *h <= 1.25 * e + 1e-12, "n={} {} vs {}", n, h, e);
+            }
+        }
+    }
+}
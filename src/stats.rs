@@ -0,0 +1,188 @@
+/// Running count, mean and sum of squared deviations, mergeable across blocks
+#[derive(Clone, Copy, Default)]
+pub struct Welford {
+    count: f64,
+    pub mean: f64,
+    m2: f64,
+}
+
+impl Welford {
+    pub fn push(&mut self, value: f64) {
+        self.count += 1.0;
+        let delta = value - self.mean;
+        self.mean += delta / self.count;
+        self.m2 += delta * (value - self.mean);
+    }
+
+    /// Chan et al. pairwise combination of two sets of moments
+    pub fn merge(&mut self, other: &Welford) {
+        if other.count == 0.0 {
+            return;
+        }
+        let count = self.count + other.count;
+        let delta = other.mean - self.mean;
+        self.mean += delta * other.count / count;
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count;
+        self.count = count;
+    }
+
+    pub fn variance(&self) -> f64 {
+        if self.count > 1.0 {
+            self.m2 / (self.count - 1.0)
+        } else {
+            0.0
+        }
+    }
+}
+
+/// Moments of a variance-reduced estimator, mergeable across blocks.
+///
+/// Each draw contributes its plain traversal, the value the estimator averages (the traversal or
+/// the mean of an antithetic pair) and a control variate with a known zero mean. The control is
+/// regressed out at the end with the coefficient estimated from the same draws.
+#[derive(Clone, Copy, Default)]
+pub struct Controlled {
+    pub raw: Welford,
+    count: f64,
+    value_mean: f64,
+    control_mean: f64,
+    value_m2: f64,
+    control_m2: f64,
+    cross: f64,
+}
+
+impl Controlled {
+    pub fn push(&mut self, raw: f64, value: f64, control: f64) {
+        self.raw.push(raw);
+        self.count += 1.0;
+        let value_delta = value - self.value_mean;
+        let control_delta = control - self.control_mean;
+        self.value_mean += value_delta / self.count;
+        self.control_mean += control_delta / self.count;
+        self.value_m2 += value_delta * (value - self.value_mean);
+        self.control_m2 += control_delta * (control - self.control_mean);
+        self.cross += value_delta * (control - self.control_mean);
+    }
+
+    pub fn merge(&mut self, other: &Controlled) {
+        if other.count == 0.0 {
+            return;
+        }
+        self.raw.merge(&other.raw);
+        let count = self.count + other.count;
+        let value_delta = other.value_mean - self.value_mean;
+        let control_delta = other.control_mean - self.control_mean;
+        let weight = self.count * other.count / count;
+        self.value_m2 += other.value_m2 + value_delta * value_delta * weight;
+        self.control_m2 += other.control_m2 + control_delta * control_delta * weight;
+        self.cross += other.cross + value_delta * control_delta * weight;
+        self.value_mean += value_delta * other.count / count;
+        self.control_mean += control_delta * other.count / count;
+        self.count = count;
+    }
+
+    /// Regression coefficient of the value on the control, 0 without a varying control
+    fn beta(&self) -> f64 {
+        if self.control_m2 > 0.0 {
+            self.cross / self.control_m2
+        } else {
+            0.0
+        }
+    }
+
+    pub fn mean(&self) -> f64 {
+        self.value_mean - self.beta() * self.control_mean
+    }
+
+    /// Per-draw variance of the reduced estimator, comparable with the raw variance draw for draw
+    pub fn variance(&self) -> f64 {
+        if self.count > 1.0 {
+            (self.value_m2 - self.beta() * self.cross).max(0.0) / (self.count - 1.0)
+        } else {
+            0.0
+        }
+    }
+
+    /// Raw over reduced variance, the factor by which fewer draws reach the same precision
+    pub fn reduction_factor(&self) -> f64 {
+        let variance = self.variance();
+        if variance > 0.0 {
+            self.raw.variance() / variance
+        } else if self.raw.variance() > 0.0 {
+            f64::INFINITY
+        } else {
+            1.0
+        }
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    fn values(count: usize) -> Vec<(f64, f64)> {
+        // A deterministic (value, control) sequence with a linear part and a residual
+        (0..count)
+            .map(|idx| {
+                let control = ((idx * 37) % 101) as f64 / 101.0 - 0.5;
+                let residual = ((idx * 53) % 17) as f64 / 17.0 - 0.5;
+                (2.0 + 3.0 * control + 0.1 * residual, control)
+            })
+            .collect()
+    }
+
+    #[test]
+    fn welford_matches_two_pass() {
+        let data: Vec<f64> = values(200).iter().map(|&(value, _)| value).collect();
+        let mut welford = Welford::default();
+        data.iter().for_each(|&value| welford.push(value));
+        let mean = data.iter().sum::<f64>() / data.len() as f64;
+        let variance = data.iter().map(|value| (value - mean).powi(2)).sum::<f64>() / (data.len() - 1) as f64;
+        assert!((welford.mean - mean).abs() < 1e-12);
+        assert!((welford.variance() - variance).abs() < 1e-12);
+    }
+
+    #[test]
+    fn controlled_without_control_is_plain() {
+        let mut controlled = Controlled::default();
+        let mut welford = Welford::default();
+        for (value, _) in values(100) {
+            controlled.push(value, value, 0.0);
+            welford.push(value);
+        }
+        assert!((controlled.mean() - welford.mean).abs() < 1e-12);
+        assert!((controlled.variance() - welford.variance()).abs() < 1e-12);
+        assert_eq!(controlled.reduction_factor(), 1.0);
+    }
+
+    #[test]
+    fn controlled_regresses_out_the_control() {
+        let data = values(1000);
+        let mut controlled = Controlled::default();
+        data.iter().for_each(|&(value, control)| controlled.push(value, value, control));
+        // Only the residual's variance is left, a small fraction of the raw one
+        let residual_mean = data.iter().map(|&(value, control)| value - 3.0 * control).sum::<f64>() / 1000.0;
+        let control_mean = data.iter().map(|&(_, control)| control).sum::<f64>() / 1000.0;
+        assert!((controlled.beta() - 3.0).abs() < 0.01);
+        assert!((controlled.mean() - (residual_mean + (3.0 - controlled.beta()) * control_mean)).abs() < 1e-9);
+        assert!(controlled.variance() < 0.01 * controlled.raw.variance());
+        assert!(controlled.reduction_factor() > 100.0);
+    }
+
+    #[test]
+    fn controlled_merge_matches_sequential_pushes() {
+        let data = values(300);
+        let mut whole = Controlled::default();
+        let mut left = Controlled::default();
+        let mut right = Controlled::default();
+        for (idx, &(value, control)) in data.iter().enumerate() {
+            whole.push(value + control, value, control);
+            let half = if idx < 120 { &mut left } else { &mut right };
+            half.push(value + control, value, control);
+        }
+        left.merge(&right);
+        assert!((left.mean() - whole.mean()).abs() < 1e-12);
+        assert!((left.variance() - whole.variance()).abs() < 1e-12);
+        assert!((left.raw.variance() - whole.raw.variance()).abs() < 1e-12);
+    }
+}